@@ -3,6 +3,29 @@ ASGI config for Schedule project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Deployment (the async booking endpoints under /api/async/ only pay off here):
+
+    uvicorn Schedule.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+    # or: gunicorn Schedule.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Sync DRF views keep working under ASGI, each request in a thread. Use
+CONN_MAX_AGE = 0 (the default) and, for PostgreSQL, a connection pool
+(DATABASES["default"]["OPTIONS"]["pool"] = True, or pgbouncer) instead of
+persistent connections. Compare with the WSGI path using
+``manage.py loadtest_api``.
+
+The availability change feed (/api/async/availability/changes/) is a
+long-poll endpoint: each waiting request holds an HTTP connection for up to
+AVAILABILITY_EVENTS["POLL_TIMEOUT"] seconds, which only scales under ASGI.
+Waiting requests do not query the database themselves; one poller per
+process checks for new events every POLL_INTERVAL seconds and wakes them.
+Old events are removed by ``manage.py prune_availability_events`` (cron).
+
+If BOT_WEBHOOK_BOTS is set (e.g. "patient,doctor"), Telegram webhooks for
+those bots are served on /webhook/<bot>/ by Schedule.bot_webhook, and all
+other requests go to Django. BOT_WEBHOOK_SECRET is then required: startup
+fails without it.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +36,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Schedule.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+if os.getenv('BOT_WEBHOOK_BOTS'):
+    from Schedule.bot_webhook import BotWebhookApp
+
+    application = BotWebhookApp(django_application)
+else:
+    application = django_application
@@ -0,0 +1,207 @@
+"""
+Webhook-режим Telegram-ботов.
+
+ASGI-приложение принимает апдейты на /webhook/<бот>/ и сразу отвечает
+Telegram, а обработку отдаёт пулу воркеров. У каждого воркера своя
+очередь, и апдейты одного чата всегда попадают в одну и ту же очередь,
+поэтому внутри чата порядок сохраняется, а разные чаты обрабатываются
+параллельно. При переполненной очереди отвечаем 503 — Telegram повторит
+доставку позже.
+
+Настройки окружения:
+  BOT_WEBHOOK_BOTS       — какие боты обслуживать: patient, doctor (через запятую);
+  BOT_WEBHOOK_BASE_URL   — публичный адрес; если задан, webhook регистрируется при старте;
+  BOT_WEBHOOK_SECRET     — секрет из заголовка X-Telegram-Bot-Api-Secret-Token,
+                           обязателен: без него любой мог бы прислать поддельный апдейт;
+  BOT_WEBHOOK_WORKERS    — число воркеров (по умолчанию 8);
+  BOT_WEBHOOK_QUEUE_SIZE — длина очереди одного воркера (по умолчанию 1000).
+Для нескольких реплик FSM должен жить в Redis (FSM_STORAGE=redis):
+тогда и состояние, и блокировки пользователя общие.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/webhook/"
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+
+def load_bots(names):
+    """Пары (bot, dispatcher) для перечисленных ботов."""
+    bots = {}
+    if "patient" in names:
+        from patient_bot.patient_bot import create_bot, create_dispatcher
+
+        bots["patient"] = (create_bot(), create_dispatcher())
+    if "doctor" in names:
+        from doctor_bot.main import bot, dp
+
+        bots["doctor"] = (bot, dp)
+    return bots
+
+
+def chat_key(update: Update):
+    """Ключ очередности: чат апдейта, иначе пользователь, иначе сам апдейт."""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat:
+        return context.chat.id
+    if context.user:
+        return context.user.id
+    return update.update_id
+
+
+class ChatOrderedWorkerPool:
+    """Пул воркеров, где задачи с одним ключом выполняются строго по очереди."""
+
+    def __init__(self, handler, workers: int = 8, queue_size: int = 1000):
+        self.handler = handler
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.tasks = []
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self._work(queue)) for queue in self.queues]
+
+    def submit(self, key, *args) -> bool:
+        """Ставит задачу в очередь; False, если очередь переполнена."""
+        queue = self.queues[hash(key) % len(self.queues)]
+        try:
+            queue.put_nowait(args)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            args = await queue.get()
+            try:
+                await self.handler(*args)
+            except Exception:
+                logger.exception("Ошибка обработки апдейта")
+            finally:
+                queue.task_done()
+
+    async def stop(self):
+        """Дожидается обработки уже принятых апдейтов и останавливает воркеры."""
+        await asyncio.gather(*(queue.join() for queue in self.queues))
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class BotWebhookApp:
+    """
+    ASGI-приложение webhook-ов; остальные запросы передаются в fallback
+    (обычно Django). Сам обрабатывает lifespan: запускает воркеры,
+    startup/shutdown диспетчеров и регистрирует webhook.
+    """
+
+    def __init__(self, fallback=None, bots=None, workers=None, queue_size=None,
+                 secret=None, base_url=None):
+        self.fallback = fallback
+        self.bot_names = bots or [
+            name.strip() for name in os.getenv("BOT_WEBHOOK_BOTS", "").split(",")
+            if name.strip()
+        ]
+        self.workers = workers or int(os.getenv("BOT_WEBHOOK_WORKERS", "8"))
+        self.queue_size = queue_size or int(os.getenv("BOT_WEBHOOK_QUEUE_SIZE", "1000"))
+        self.secret = secret or os.getenv("BOT_WEBHOOK_SECRET")
+        self.base_url = (base_url or os.getenv("BOT_WEBHOOK_BASE_URL", "")).rstrip("/")
+        self.bots = {}
+        self.pool = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http" and scope["path"].startswith(WEBHOOK_PATH):
+            await self._webhook(scope, receive, send)
+        elif self.fallback is not None:
+            await self.fallback(scope, receive, send)
+        else:
+            await self._respond(send, 404)
+
+    async def startup(self):
+        if not self.secret:
+            # Боты доверяют from_user.id апдейта, поэтому без секрета
+            # webhook позволил бы действовать от имени любого пользователя
+            raise RuntimeError("BOT_WEBHOOK_SECRET не задан, webhook ботов не запущен")
+        self.bots = load_bots(self.bot_names)
+        self.pool = ChatOrderedWorkerPool(self._process, self.workers, self.queue_size)
+        self.pool.start()
+        for name, (bot, dp) in self.bots.items():
+            await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+            if self.base_url:
+                await bot.set_webhook(
+                    f"{self.base_url}{WEBHOOK_PATH}{name}/", secret_token=self.secret
+                )
+            logger.info(f"Webhook бота {name} запущен, воркеров: {self.workers}")
+
+    async def shutdown(self):
+        if self.pool is not None:
+            await self.pool.stop()
+        for bot, dp in self.bots.values():
+            await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot], **dp.workflow_data)
+            await bot.session.close()
+
+    async def _process(self, name, update):
+        bot, dp = self.bots[name]
+        await dp.feed_update(bot, update)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.exception("Не удалось запустить webhook ботов")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _webhook(self, scope, receive, send):
+        name = scope["path"][len(WEBHOOK_PATH):].strip("/")
+        if name not in self.bots:
+            return await self._respond(send, 404)
+        if scope["method"] != "POST":
+            return await self._respond(send, 405)
+        token = dict(scope["headers"]).get(SECRET_HEADER, b"")
+        if not self.secret or not hmac.compare_digest(token, self.secret.encode()):
+            return await self._respond(send, 401)
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        bot, _ = self.bots[name]
+        try:
+            update = Update.model_validate(json.loads(body), context={"bot": bot})
+        except ValueError:
+            return await self._respond(send, 400)
+
+        if not self.pool.submit((name, chat_key(update)), name, update):
+            logger.warning(f"Очередь webhook бота {name} переполнена")
+            return await self._respond(send, 503)
+        await self._respond(send, 200)
+
+    @staticmethod
+    async def _respond(send, status):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain")],
+        })
+        await send({"type": "http.response.body", "body": b""})
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'booking.query_count.QueryCountMiddleware',
 ]
 
 ROOT_URLCONF = 'Schedule.urls'
@@ -87,6 +88,53 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Локальная память процесса по умолчанию; для нескольких процессов
+# подключите общий бэкенд (Redis, Memcached) через BACKEND/LOCATION.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'schedule',
+    }
+}
+
+# Кэш готовых ответов справочных эндпоинтов (врачи, услуги)
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TTL': 300,
+}
+
+
+# Кэш результатов поиска свободного времени (ключи версионируются по врачу)
+AVAILABILITY_CACHE = {
+    'ALIAS': 'default',
+    'TTL': 600,
+}
+
+# Лента изменений доступности (/api/async/availability/changes/):
+# сколько часов хранить события, сколько секунд максимум держать
+# long-poll запрос, как часто (сек) один опросчик на процесс проверяет
+# новые события, за сколько секунд до запроса перечитывать события
+# (транзакция может зафиксироваться позже, чем взяла id) и сколько
+# событий отдавать за раз
+AVAILABILITY_EVENTS = {
+    'RETENTION_HOURS': 48,
+    'POLL_TIMEOUT': 25,
+    'POLL_INTERVAL': 1,
+    'OVERLAP_SECONDS': 30,
+    'LIMIT': 1000,
+}
+
+
+# Порог числа SQL-запросов на HTTP-запрос, выше которого QueryCountMiddleware
+# пишет предупреждение (работает только при DEBUG)
+QUERY_COUNT = {
+    'WARN_AT': 20,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,3 +177,41 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'booking.User'
+
+# JSON API через orjson (booking.renderers); без пакета orjson классы
+# работают как стандартные JSONRenderer/JSONParser DRF
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'booking.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'booking.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Поиск свободных окон: 'python', 'sql' (оконные функции PostgreSQL) или
+# 'auto' — SQL на PostgreSQL, Python на остальных базах (SQLite в тестах).
+# Для дат есть ещё 'summary' — чтение готовых сводок DoctorDaySummary.
+AVAILABILITY_ENGINE = {
+    'available_slots': 'auto',
+    'free_dates': 'summary',
+}
+
+# Списки слотов и записей: True — лёгкие сериализаторы на values_list()
+# (booking.fast_serializers), False — обычные ModelSerializer DRF.
+# JSON одинаковый; сравнить скорость — manage.py benchmark_serializers
+FAST_SERIALIZERS = True
+
+# На сколько дней вперёд раскрывать шаблоны смен в слоты
+SCHEDULE_TEMPLATE_HORIZON_DAYS = 28
+
+# Кэш пользователей по telegram_id: размер LRU в процессе, время жизни
+# записей (сек) и, опционально, алиас кэша Django для общего кэша процессов
+IDENTITY_CACHE = {
+    'SIZE': 1024,
+    'TTL': 60,
+    'ALIAS': None,
+}
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase, mock
+
+from aiogram import Bot
+
+from Schedule.bot_webhook import SECRET_HEADER, BotWebhookApp, ChatOrderedWorkerPool
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 10, "type": "private"},
+        "from": {"id": 10, "is_bot": False, "first_name": "Пациент"},
+        "text": "/start",
+    },
+}
+
+
+class WebhookSecretTests(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.app = BotWebhookApp(bots=["patient"], secret="s3cret")
+        self.bot = Bot("42:TEST")
+        self.app.bots = {"patient": (self.bot, None)}
+        self.app.pool = mock.Mock()
+        self.app.pool.submit.return_value = True
+
+    async def asyncTearDown(self):
+        await self.bot.session.close()
+
+    async def post(self, headers, body=UPDATE):
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/webhook/patient/",
+            "headers": headers,
+        }
+        messages = [{"type": "http.request", "body": json.dumps(body).encode()}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        return sent[0]["status"]
+
+    async def test_missing_secret_is_rejected(self):
+        self.assertEqual(await self.post([]), 401)
+        self.app.pool.submit.assert_not_called()
+
+    async def test_wrong_secret_is_rejected(self):
+        self.assertEqual(await self.post([(SECRET_HEADER, b"guess")]), 401)
+        self.app.pool.submit.assert_not_called()
+
+    async def test_valid_secret_is_queued(self):
+        self.assertEqual(await self.post([(SECRET_HEADER, b"s3cret")]), 200)
+        (key, name, update), _ = self.app.pool.submit.call_args
+        self.assertEqual((key, name, update.update_id), (("patient", 10), "patient", 1))
+
+    async def test_startup_requires_secret(self):
+        with mock.patch.dict("os.environ", {}, clear=True):
+            app = BotWebhookApp(bots=["patient"])
+        with self.assertRaises(RuntimeError):
+            await app.startup()
+        self.assertIsNone(app.pool)
+
+
+class ChatOrderedWorkerPoolTests(IsolatedAsyncioTestCase):
+
+    async def test_order_is_kept_within_a_chat(self):
+        done = []
+
+        async def handler(chat, n):
+            # Первый апдейт чата обрабатывается дольше следующих
+            await asyncio.sleep(0.01 if n == 0 else 0)
+            done.append((chat, n))
+
+        pool = ChatOrderedWorkerPool(handler, workers=4)
+        pool.start()
+        for n in range(3):
+            for chat in (1, 2):
+                self.assertTrue(pool.submit(chat, chat, n))
+        await pool.stop()
+
+        for chat in (1, 2):
+            self.assertEqual([n for c, n in done if c == chat], [0, 1, 2])
+
+    async def test_full_queue(self):
+        pool = ChatOrderedWorkerPool(mock.AsyncMock(), workers=1, queue_size=1)
+        self.assertTrue(pool.submit(1, "a"))
+        self.assertFalse(pool.submit(1, "b"))
@@ -1,6 +1,10 @@
 from django.contrib import admin
-from .models import User, AvailableSlot, Appointment, Service
+from .models import (
+    User, AvailableSlot, Appointment, Service, DoctorDaySummary,
+    ScheduleTemplate,
+)
 from .serializers import ServiceSerializer
+from .slot_changes import slots_changed
 
 
 @admin.register(User)
@@ -19,6 +23,27 @@ class AvailableSlotAdmin(admin.ModelAdmin):
     search_fields = ('doctor__full_name',)
     ordering = ('start_datetime',)
 
+    def save_model(self, request, obj, form, change):
+        previous = AvailableSlot.objects.get(pk=obj.pk) if change else None
+        super().save_model(request, obj, form, change)
+        # Сводки пересчитываются по уже сохранённым слотам: и для старых
+        # врача и даты (слот мог переехать), и для новых
+        if previous is not None:
+            slots_changed(previous.doctor_id, [previous.start_datetime])
+        slots_changed(obj.doctor_id, [obj.start_datetime])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        slots_changed(obj.doctor_id, [obj.start_datetime])
+
+    def delete_queryset(self, request, queryset):
+        changed = {}
+        for doctor_id, start in queryset.values_list('doctor_id', 'start_datetime'):
+            changed.setdefault(doctor_id, []).append(start)
+        super().delete_queryset(request, queryset)
+        for doctor_id, starts in changed.items():
+            slots_changed(doctor_id, starts)
+
 
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
@@ -37,4 +62,22 @@ class AppointmentAdmin(admin.ModelAdmin):
 class ServiceAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'doctor', 'name', 'description', 'duration_minutes'
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(DoctorDaySummary)
+class DoctorDaySummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'doctor', 'date', 'free_slots', 'longest_run_minutes'
+    )
+    list_filter = ('doctor',)
+    ordering = ('date',)
+
+
+@admin.register(ScheduleTemplate)
+class ScheduleTemplateAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'doctor', 'weekdays', 'shift_start', 'shift_end',
+        'slot_minutes', 'valid_from', 'valid_to', 'expanded_until', 'is_active'
+    )
+    list_filter = ('doctor', 'is_active')
@@ -0,0 +1,45 @@
+"""
+Агрегаты по датам для экранов выбора даты.
+
+Группировка выполняется в базе через TruncDate в текущем часовом поясе,
+поэтому клиенту уходит по одной короткой строке на день, а не все слоты.
+"""
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .day_summary import day_start
+from .models import Appointment, AvailableSlot
+
+
+def date_counts(queryset, **aggregates):
+    """Группирует queryset по дате start_datetime и считает aggregates."""
+    return (
+        queryset
+        .annotate(date=TruncDate('start_datetime', tzinfo=timezone.get_current_timezone()))
+        .values('date')
+        .annotate(**aggregates)
+        .order_by('date')
+    )
+
+
+def slot_date_counts(doctor_id, since=None, only_free=False):
+    """Даты слотов врача с общим числом слотов и числом свободных."""
+    slots = AvailableSlot.objects.filter(doctor_id=doctor_id)
+    if since:
+        slots = slots.filter(start_datetime__gte=day_start(since))
+    if only_free:
+        slots = slots.filter(is_booked=False)
+    return list(date_counts(
+        slots,
+        total=Count('id'),
+        free=Count('id', filter=Q(is_booked=False)),
+    ))
+
+
+def appointment_date_counts(doctor_id, since=None):
+    """Даты активных записей врача с их количеством."""
+    appointments = Appointment.objects.filter(doctor_id=doctor_id, status='active')
+    if since:
+        appointments = appointments.filter(start_datetime__gte=day_start(since))
+    return list(date_counts(appointments, count=Count('id')))
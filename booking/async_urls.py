@@ -0,0 +1,22 @@
+from django.urls import path
+
+from . import async_views
+
+# Асинхронные копии горячих эндпоинтов чтения, те же пути под /api/async/,
+# и long-poll ленты изменений доступности
+urlpatterns = [
+    path('doctors/', async_views.doctor_list, name='async-doctor-list'),
+    path('services/doctor/', async_views.doctor_services, name='async-doctor-services'),
+    path('slots/available/', async_views.available_slots, name='async-available-slots'),
+    path('slots/free_dates/', async_views.slot_free_dates, name='async-slots-free-dates'),
+    path(
+        'appointments/by-patient/',
+        async_views.patient_appointments,
+        name='async-appointments-by-patient'
+    ),
+    path(
+        'availability/changes/',
+        async_views.availability_changes,
+        name='async-availability-changes'
+    ),
+]
@@ -0,0 +1,156 @@
+"""
+Асинхронные версии горячих эндпоинтов чтения.
+
+DRF не поддерживает async-представления, поэтому здесь обычные
+асинхронные view Django: база — через async ORM, ответ — теми же
+сериализаторами и рендерером JSON, что и в booking.views, так что формат
+совпадает. Здесь же long-poll ленты изменений доступности.
+Имеют смысл только под ASGI (см. Schedule/asgi.py); подключены
+по адресу /api/async/.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .aggregates import slot_date_counts
+from .availability_events import alast_event_id, await_changes
+from .availability_format import compact_availability, wants_compact
+from .availability_queries import afree_dates, astart_slots
+from .fast_serializers import appointment_serializer
+from .identity import resolve_user
+from .listing import filter_by_dates
+from .models import Appointment, Service
+from .renderers import render_json
+from .response_cache import acached_response
+from .serializers import DoctorShortSerializer, ServiceSerializer
+
+User = get_user_model()
+
+
+def _json(data, status=200):
+    return HttpResponse(
+        render_json(data), status=status, content_type='application/json'
+    )
+
+
+@require_GET
+async def doctor_list(request):
+    async def build_data():
+        doctors = [
+            doctor async for doctor in
+            User.objects.filter(is_doctor=True, is_doctor_approved=True)
+        ]
+        return DoctorShortSerializer(doctors, many=True).data
+
+    return await acached_response(request, build_data)
+
+
+@require_GET
+async def doctor_services(request):
+    doctor_id = request.GET.get('doctor_id')
+    if not doctor_id:
+        return _json({"error": "doctor_id is requiered"}, status=400)
+
+    async def build_data():
+        services = [s async for s in Service.objects.filter(doctor_id=doctor_id)]
+        return ServiceSerializer(services, many=True).data
+
+    return await acached_response(request, build_data)
+
+
+@require_GET
+async def available_slots(request):
+    service_id = request.GET.get('service_id')
+    doctor_id = request.GET.get('doctor_id')
+    if not service_id or not doctor_id:
+        return _json({"error": "service_id и doctor_id обязательны"}, status=400)
+
+    try:
+        service = await Service.objects.aget(id=service_id)
+    except Service.DoesNotExist:
+        return _json({"error": "Услуга не найдена"}, status=404)
+
+    slots = await astart_slots(doctor_id, service.duration_minutes)
+    if wants_compact(request.GET, request.headers.get('Accept', '')):
+        return _json(compact_availability(slots))
+    return _json([data for _, data in slots])
+
+
+@require_GET
+async def slot_free_dates(request):
+    doctor_id = request.GET.get("doctor_id")
+    service_id = request.GET.get("service_id")
+    if not doctor_id:
+        return _json({"error": "doctor_id is required."}, status=400)
+
+    if not service_id:
+        # Все даты со слотами (и занятыми), как в SlotFreeDatesView
+        counts = await sync_to_async(slot_date_counts)(doctor_id, since=timezone.localdate())
+        return _json({"dates": [str(row["date"]) for row in counts]})
+
+    try:
+        service = await Service.objects.aget(pk=service_id)
+    except Service.DoesNotExist:
+        return _json({"error": "Service not found."}, status=404)
+
+    dates = await afree_dates(doctor_id, service.duration_minutes)
+    return _json({"dates": [str(d) for d in dates]})
+
+
+@csrf_exempt
+@require_POST
+async def patient_appointments(request):
+    """Записи пациента; без курсорной пагинации, только фильтр по датам и fields."""
+    try:
+        telegram_id = json.loads(request.body or b"{}").get("telegram_id")
+    except (ValueError, AttributeError):
+        return _json({"error": "Некорректный JSON"}, status=400)
+    if not telegram_id:
+        return _json({"error": "Telegram ID обязателен"}, status=400)
+
+    user = await sync_to_async(resolve_user)(telegram_id)
+    if user is None:
+        return _json({"error": "Пользователь не найден"}, status=404)
+
+    appointments = Appointment.objects.filter(
+        patient=user, status="active"
+    ).select_related("doctor", "patient", "service")
+    try:
+        appointments = filter_by_dates(appointments, request.GET)
+    except ValueError:
+        return _json({"error": "Неверный формат даты"}, status=400)
+
+    fields = request.GET.get('fields')
+    fields = [name.strip() for name in fields.split(',') if name.strip()] if fields else None
+    items = [appointment async for appointment in appointments]
+    return _json(appointment_serializer()(items, many=True, fields=fields).data)
+
+
+@require_GET
+async def availability_changes(request):
+    """
+    Long-poll ленты изменений доступности.
+
+    Без since сразу отвечает текущим last_id; с since ждёт событий после
+    него (не дольше timeout секунд) и отдаёт
+    {"last_id": ..., "events": [[id, doctor_id, "YYYY-MM-DD"], ...]}.
+    В events входит и хвост уже отданных событий (см. availability_events):
+    виденные id клиент пропускает. doctor_id ограничивает ленту одним врачом.
+    """
+    try:
+        since = int(request.GET['since']) if request.GET.get('since') else None
+        doctor_id = int(request.GET['doctor_id']) if request.GET.get('doctor_id') else None
+        timeout = float(request.GET['timeout']) if request.GET.get('timeout') else None
+    except ValueError:
+        return _json({"error": "Неверный формат параметров"}, status=400)
+
+    if since is None:
+        return _json({"last_id": await alast_event_id(doctor_id), "events": []})
+
+    last_id, events = await await_changes(since, doctor_id, timeout)
+    return _json({"last_id": last_id, "events": events})
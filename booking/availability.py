@@ -0,0 +1,83 @@
+"""
+Движок доступности: поиск стартовых слотов, в которые помещается услуга.
+
+Слоты врача рассматриваются как отсортированные интервалы. Подряд идущие
+слоты (конец одного совпадает с началом следующего) образуют «серию»;
+слот подходит как стартовый, если серия от него тянется не меньше, чем
+длится услуга. Всё считается за один линейный проход по слотам.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+def slot_day(slot):
+    """Дата слота в текущем часовом поясе."""
+    return timezone.localtime(slot.start_datetime).date()
+
+
+def iter_runs(slots):
+    """
+    Разбивает отсортированные слоты на серии подряд идущих слотов.
+
+    Серия не переходит через границу дня. Возвращает пары (день, серия).
+    """
+    run = []
+    run_day = None
+    for slot in slots:
+        day = slot_day(slot)
+        if run and (day != run_day or slot.start_datetime != run[-1].end_datetime):
+            yield run_day, run
+            run = []
+        if not run:
+            run_day = day
+        run.append(slot)
+    if run:
+        yield run_day, run
+
+
+def find_start_slots(slots, duration_minutes):
+    """Стартовые слоты, от которых подряд свободно duration_minutes минут."""
+    duration = timedelta(minutes=duration_minutes)
+    result = []
+    for _, run in iter_runs(slots):
+        run_end = run[-1].end_datetime
+        for slot in run:
+            # Серия непрерывна, поэтому от любого её слота она тянется до run_end
+            if slot.start_datetime + duration > run_end:
+                break
+            result.append(slot)
+    return result
+
+
+def find_free_dates(slots, duration_minutes):
+    """Даты, на которые есть хотя бы одно окно длиной duration_minutes."""
+    duration = timedelta(minutes=duration_minutes)
+    dates = []
+    for day, run in iter_runs(slots):
+        if dates and dates[-1] == day:
+            continue
+        if run[-1].end_datetime - run[0].start_datetime >= duration:
+            dates.append(day)
+    return dates
+
+
+def collect_chain(slots, start_datetime, duration_minutes):
+    """
+    Слоты, которые нужно занять под услугу, начиная со start_datetime.
+
+    Возвращает список слотов или None, если подряд свободного времени
+    не хватает. Как и в iter_runs, цепочка не переходит через границу дня.
+    """
+    needed_end = start_datetime + timedelta(minutes=duration_minutes)
+    chain = []
+    for slot in slots:
+        if not chain:
+            if slot.start_datetime != start_datetime:
+                continue
+        elif slot.start_datetime != chain[-1].end_datetime or slot_day(slot) != slot_day(chain[0]):
+            break
+        chain.append(slot)
+        if slot.end_datetime >= needed_end:
+            return chain
+    return None
@@ -0,0 +1,72 @@
+"""
+Кэш результатов поиска свободного времени.
+
+Ключ включает версию доступности врача (AvailabilityVersion). Версия
+увеличивается в той же транзакции, что и любое изменение слотов
+(см. booking.slot_changes), поэтому после брони или отмены ни один
+запрос уже не попадёт в старую запись кэша.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import AvailabilityVersion
+
+
+def _cache():
+    return caches[settings.AVAILABILITY_CACHE['ALIAS']]
+
+
+def bump_availability_version(doctor_id):
+    """
+    Увеличивает версию доступности врача.
+
+    Строку версии создаёт и блокирует slot_changes.lock_doctor_slots.
+    """
+    AvailabilityVersion.objects.filter(
+        doctor_id=doctor_id
+    ).update(version=F('version') + 1)
+
+
+def availability_version(doctor_id):
+    """Текущая версия доступности врача (0, если слоты ещё не менялись)."""
+    return AvailabilityVersion.objects.filter(
+        doctor_id=doctor_id
+    ).values_list('version', flat=True).first() or 0
+
+
+async def aavailability_version(doctor_id):
+    """Асинхронный вариант availability_version."""
+    return await AvailabilityVersion.objects.filter(
+        doctor_id=doctor_id
+    ).values_list('version', flat=True).afirst() or 0
+
+
+def cached_availability(doctor_id, key, compute, version=None):
+    """
+    Возвращает результат compute() для (врач, key) с учётом версии.
+
+    Версия читается до вычисления: если слоты изменятся во время
+    вычисления, результат окажется под уже устаревшим ключом.
+    Уже прочитанную версию можно передать, чтобы не читать её повторно.
+    """
+    if version is None:
+        version = availability_version(doctor_id)
+    cache_key = f"availability:{doctor_id}:{version}:{key}"
+    result = _cache().get(cache_key)
+    if result is None:
+        result = compute()
+        _cache().set(cache_key, result, settings.AVAILABILITY_CACHE['TTL'])
+    return result
+
+
+async def acached_availability(doctor_id, key, compute, version=None):
+    """Асинхронный вариант cached_availability; compute — корутинная функция."""
+    if version is None:
+        version = await aavailability_version(doctor_id)
+    cache_key = f"availability:{doctor_id}:{version}:{key}"
+    result = await _cache().aget(cache_key)
+    if result is None:
+        result = await compute()
+        await _cache().aset(cache_key, result, settings.AVAILABILITY_CACHE['TTL'])
+    return result
@@ -0,0 +1,153 @@
+"""
+Лента изменений доступности.
+
+slots_changed пишет по событию на каждую затронутую дату врача в той же
+транзакции, что и само изменение. Клиенты (боты) читают ленту long-poll
+запросами к /api/async/availability/changes/?since=<id> и обновляют
+только изменившиеся даты.
+
+id события берётся из последовательности до фиксации транзакции, поэтому
+событие с меньшим id может стать видимым уже после того, как клиент
+получил больший. Чтобы такие события не терялись, каждый ответ заново
+отдаёт и «хвост» до since — события, созданные за OVERLAP_SECONDS до
+начала запроса; клиент отбрасывает уже виденные id.
+
+Ждущие запросы не опрашивают базу сами: на процесс работает один
+EventPoller, который раз в POLL_INTERVAL читает последний id ленты и
+будит ожидающих.
+"""
+import asyncio
+import logging
+import weakref
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AvailabilityEvent
+
+logger = logging.getLogger(__name__)
+
+
+def record_changes(doctor_id, days):
+    """Добавляет в ленту события об изменении слотов врача на даты days."""
+    AvailabilityEvent.objects.bulk_create(
+        AvailabilityEvent(doctor_id=doctor_id, date=day) for day in sorted(days)
+    )
+
+
+async def alast_event_id(doctor_id=None):
+    """id последнего события ленты (врача, если передан) или 0."""
+    events = AvailabilityEvent.objects.all()
+    if doctor_id is not None:
+        events = events.filter(doctor_id=doctor_id)
+    return await events.order_by('-id').values_list('id', flat=True).afirst() or 0
+
+
+class EventPoller:
+    """
+    Общий опрос ленты для всех long-poll запросов одного цикла событий:
+    пока есть ожидающие, раз в POLL_INTERVAL читает последний id и будит
+    тех, кто ждёт id больше уже виденного.
+    """
+
+    def __init__(self):
+        self.last_id = None
+        self.waiters = 0
+        self._changed = asyncio.Condition()
+        self._task = None
+
+    async def wait_newer(self, seen, timeout):
+        """Ждёт, пока последний id ленты превысит seen; False — по таймауту."""
+        self.waiters += 1
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            async with self._changed:
+                await asyncio.wait_for(
+                    self._changed.wait_for(
+                        lambda: self.last_id is not None and self.last_id > seen
+                    ),
+                    timeout,
+                )
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiters -= 1
+
+    async def _run(self):
+        try:
+            while self.waiters:
+                try:
+                    last_id = await alast_event_id()
+                except Exception:
+                    logger.exception("Не удалось прочитать ленту изменений")
+                else:
+                    if last_id != self.last_id:
+                        self.last_id = last_id
+                        async with self._changed:
+                            self._changed.notify_all()
+                await asyncio.sleep(settings.AVAILABILITY_EVENTS['POLL_INTERVAL'])
+        finally:
+            self._task = None
+
+
+# Условие и задача привязаны к циклу событий, поэтому опросчик — на цикл
+_pollers = weakref.WeakKeyDictionary()
+
+
+def event_poller():
+    """EventPoller текущего цикла событий."""
+    loop = asyncio.get_running_loop()
+    poller = _pollers.get(loop)
+    if poller is None:
+        poller = _pollers[loop] = EventPoller()
+    return poller
+
+
+async def await_changes(since, doctor_id=None, timeout=None):
+    """
+    События после since и хвост перед ним (см. описание модуля); если
+    новых нет, ждёт их не дольше timeout секунд. Возвращает пару
+    (последний id, строки [id, doctor_id, "YYYY-MM-DD"] по возрастанию id).
+    """
+    config = settings.AVAILABILITY_EVENTS
+    timeout = config['POLL_TIMEOUT'] if timeout is None else min(timeout, config['POLL_TIMEOUT'])
+    border = timezone.now() - timedelta(seconds=config['OVERLAP_SECONDS'])
+
+    events = AvailabilityEvent.objects.order_by('id')
+    if doctor_id is not None:
+        events = events.filter(doctor_id=doctor_id)
+    new_events = events.filter(id__gt=since).values_list('id', 'doctor_id', 'date')[:config['LIMIT']]
+    overlap = events.filter(
+        id__lte=since, created_at__gte=border
+    ).values_list('id', 'doctor_id', 'date')[:config['LIMIT']]
+
+    poller = event_poller()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    seen = since
+    while True:
+        # Что опросчик уже видел до запроса: если у врача в этом
+        # диапазоне ничего нет, ждём только id больше этого
+        observed = poller.last_id
+        # all() — новый queryset, иначе повторная итерация вернёт закэшированный результат
+        rows = [row async for row in new_events.all()]
+        remaining = deadline - loop.time()
+        if rows or remaining <= 0:
+            break
+        seen = max(seen, observed or 0)
+        if not await poller.wait_newer(seen, remaining):
+            break
+
+    rows = [row async for row in overlap] + rows
+    last_id = rows[-1][0] if rows and rows[-1][0] > since else since
+    return last_id, [[event_id, doctor, str(day)] for event_id, doctor, day in rows]
+
+
+def prune_events():
+    """Удаляет события старше RETENTION_HOURS, возвращает их число."""
+    border = timezone.now() - timedelta(hours=settings.AVAILABILITY_EVENTS['RETENTION_HOURS'])
+    deleted, _ = AvailabilityEvent.objects.filter(created_at__lt=border).delete()
+    return deleted
@@ -0,0 +1,44 @@
+"""
+Компактный формат доступности для ботов.
+
+Вместо списка полных слотов — даты, а в каждой два параллельных массива:
+минуты начала от полуночи (в TIME_ZONE) и id слотов:
+
+    {"timezone": "UTC",
+     "dates": {"2025-07-30": {"minutes": [540, 555], "ids": [17, 18]}}}
+
+Включается параметром ?compact=1 или заголовком
+Accept: application/json; availability=compact.
+"""
+from django.utils import timezone
+from django.utils.http import parse_header_parameters
+
+COMPACT_PARAM = 'compact'
+COMPACT_MEDIA_PARAM = 'availability'
+
+
+def wants_compact(params, accept=''):
+    """Просит ли клиент компактный формат (параметры запроса и заголовок Accept)."""
+    if params.get(COMPACT_PARAM, '').lower() in ('1', 'true'):
+        return True
+    for media_type in accept.split(','):
+        _, media_params = parse_header_parameters(media_type.strip())
+        if media_params.get(COMPACT_MEDIA_PARAM) == 'compact':
+            return True
+    return False
+
+
+def compact_availability(slots):
+    """Компактный формат из пар (начало, сериализованный слот)."""
+    dates = {}
+    for start, data in slots:
+        local = timezone.localtime(start)
+        day = dates.get(local.date())
+        if day is None:
+            day = dates[local.date()] = {"minutes": [], "ids": []}
+        day["minutes"].append(local.hour * 60 + local.minute)
+        day["ids"].append(data["id"])
+    return {
+        "timezone": timezone.get_current_timezone_name(),
+        "dates": {str(day): columns for day, columns in dates.items()},
+    }
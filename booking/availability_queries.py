@@ -0,0 +1,136 @@
+"""
+Запросы доступности для эндпоинтов: стартовые слоты и свободные даты
+под длительность услуги, через версионированный кэш.
+
+Для каждого запроса есть синхронный и асинхронный (с префиксом a)
+вариант; асинхронный ходит в базу через async ORM, а движок на SQL
+вызывает в потоке.
+"""
+from asgiref.sync import sync_to_async
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from .availability import find_free_dates, find_start_slots
+from .availability_cache import acached_availability, cached_availability
+from .availability_sql import (
+    find_free_dates_sql,
+    find_start_slots_sql,
+    resolve_engine,
+    use_sql_engine,
+)
+from .day_summary import day_range, day_start, summary_dates
+from .fast_serializers import slot_serializer
+from .models import AvailableSlot
+
+
+def _free_slots(doctor_id, since, until=None):
+    slots = AvailableSlot.objects.filter(
+        doctor_id=doctor_id,
+        is_booked=False,
+        start_datetime__gte=since,
+    )
+    if until is not None:
+        slots = slots.filter(start_datetime__lt=until)
+    return slots.select_related('doctor').order_by('start_datetime')
+
+
+def _with_starts(slots):
+    """Пары (начало, сериализованный слот) — так их удобно фильтровать по времени."""
+    return [
+        (slot.start_datetime, data)
+        for slot, data in zip(slots, slot_serializer()(slots, many=True).data)
+    ]
+
+
+def _upcoming(cached):
+    now = timezone.now()
+    return [(start, data) for start, data in cached if start >= now]
+
+
+def _sql_start_slots(doctor_id, since, duration_minutes, until=None):
+    slots = find_start_slots_sql(doctor_id, since, duration_minutes, until)
+    # raw() не умеет select_related: врача подгружаем одним запросом
+    prefetch_related_objects(slots, 'doctor')
+    return _with_starts(slots)
+
+
+def _start_bounds(duration_minutes, day):
+    """Интервал [since, until) слотов для поиска стартов и ключ кэша."""
+    if day is None:
+        # Считаем с начала дня, чтобы запись кэша годилась до полуночи;
+        # уже прошедшие слоты отсекаются при ответе
+        today = timezone.localdate()
+        return day_start(today), None, f"slots:{duration_minutes}:{today}"
+    # Цепочка слотов не переходит через полночь, поэтому для стартов дня
+    # достаточно слотов самого дня
+    since, until = day_range(day)
+    return since, until, f"slots:{duration_minutes}:day:{day}"
+
+
+def start_slots(doctor_id, duration_minutes, version=None, day=None):
+    """
+    Пары (начало, сериализованный слот) для будущих стартовых слотов под
+    услугу; если задан day — только на эту дату.
+    """
+    since, until, key = _start_bounds(duration_minutes, day)
+
+    def compute():
+        if use_sql_engine('available_slots'):
+            return _sql_start_slots(doctor_id, since, duration_minutes, until)
+        return _with_starts(
+            find_start_slots(_free_slots(doctor_id, since, until), duration_minutes)
+        )
+
+    return _upcoming(cached_availability(doctor_id, key, compute, version))
+
+
+async def astart_slots(doctor_id, duration_minutes, version=None, day=None):
+    """Асинхронный вариант start_slots."""
+    since, until, key = _start_bounds(duration_minutes, day)
+
+    async def compute():
+        if use_sql_engine('available_slots'):
+            return await sync_to_async(_sql_start_slots)(
+                doctor_id, since, duration_minutes, until
+            )
+        slots = [slot async for slot in _free_slots(doctor_id, since, until)]
+        return _with_starts(find_start_slots(slots, duration_minutes))
+
+    return _upcoming(await acached_availability(doctor_id, key, compute, version))
+
+
+def free_dates(doctor_id, duration_minutes, version=None):
+    """Даты начиная с сегодняшней, на которые есть окно под услугу."""
+    engine = resolve_engine('free_dates')
+    today = timezone.localdate()
+
+    def compute():
+        if engine == 'summary':
+            return list(summary_dates(doctor_id, today, duration_minutes))
+        if engine == 'sql':
+            return find_free_dates_sql(doctor_id, day_start(today), duration_minutes)
+        return find_free_dates(_free_slots(doctor_id, day_start(today)), duration_minutes)
+
+    return cached_availability(
+        doctor_id, f"dates:{engine}:{duration_minutes}:{today}", compute, version
+    )
+
+
+async def afree_dates(doctor_id, duration_minutes, version=None):
+    """Асинхронный вариант free_dates."""
+    engine = resolve_engine('free_dates')
+    today = timezone.localdate()
+
+    async def compute():
+        if engine == 'summary':
+            return [day async for day in summary_dates(doctor_id, today, duration_minutes)]
+        if engine == 'sql':
+            return await sync_to_async(find_free_dates_sql)(
+                doctor_id, day_start(today), duration_minutes
+            )
+        slots = [slot async for slot in _free_slots(doctor_id, day_start(today))]
+        return find_free_dates(slots, duration_minutes)
+
+    return await acached_availability(
+        doctor_id, f"dates:{engine}:{duration_minutes}:{today}", compute, version
+    )
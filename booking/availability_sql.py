@@ -0,0 +1,104 @@
+"""
+PostgreSQL-реализация движка доступности.
+
+Та же логика, что и в booking.availability, но посчитанная в базе оконными
+функциями (gaps-and-islands): LAG находит разрывы между слотами, накопленная
+сумма разрывов нумерует серии, MAX(end_datetime) по серии даёт её конец.
+Из базы возвращаются только подходящие слоты или даты.
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import AvailableSlot
+
+RUNS_CTE = """
+WITH free AS (
+    SELECT id, doctor_id, start_datetime, end_datetime, is_booked,
+           (start_datetime AT TIME ZONE %(tz)s)::date AS day,
+           LAG(end_datetime) OVER (
+               PARTITION BY (start_datetime AT TIME ZONE %(tz)s)::date
+               ORDER BY start_datetime
+           ) AS prev_end
+    FROM {table}
+    WHERE doctor_id = %(doctor_id)s
+      AND is_booked = false
+      AND start_datetime >= %(since)s
+      {until}
+),
+islands AS (
+    SELECT *,
+           SUM(CASE WHEN prev_end = start_datetime THEN 0 ELSE 1 END)
+               OVER (PARTITION BY day ORDER BY start_datetime) AS island
+    FROM free
+),
+runs AS (
+    SELECT *,
+           MAX(end_datetime) OVER (PARTITION BY day, island) AS run_end
+    FROM islands
+)
+"""
+
+FITS = "run_end >= start_datetime + make_interval(mins => %(minutes)s)"
+
+
+def resolve_engine(endpoint):
+    """
+    Движок доступности для данного эндпоинта.
+
+    Выбор задаётся в settings.AVAILABILITY_ENGINE: 'python', 'sql',
+    'summary' (сводки по дням, только для дат) или 'auto' — SQL на
+    PostgreSQL, Python на остальных базах.
+    """
+    engine = getattr(settings, 'AVAILABILITY_ENGINE', {}).get(endpoint, 'auto')
+    if engine == 'auto':
+        return 'sql' if connection.vendor == 'postgresql' else 'python'
+    return engine
+
+
+def use_sql_engine(endpoint):
+    """Нужно ли считать доступность в базе для данного эндпоинта."""
+    return resolve_engine(endpoint) == 'sql'
+
+
+def _runs(until=None):
+    return RUNS_CTE.format(
+        table=AvailableSlot._meta.db_table,
+        until="AND start_datetime < %(until)s" if until is not None else "",
+    )
+
+
+def _params(doctor_id, since, duration_minutes, until=None):
+    return {
+        'tz': timezone.get_current_timezone_name(),
+        'doctor_id': doctor_id,
+        'since': since,
+        'until': until,
+        'minutes': duration_minutes,
+    }
+
+
+def find_start_slots_sql(doctor_id, since, duration_minutes, until=None):
+    """Стартовые слоты врача в [since, until), вмещающие услугу."""
+    sql = _runs(until) + f"""
+        SELECT id, doctor_id, start_datetime, end_datetime, is_booked
+        FROM runs
+        WHERE {FITS}
+        ORDER BY start_datetime
+    """
+    return list(AvailableSlot.objects.raw(
+        sql, _params(doctor_id, since, duration_minutes, until)
+    ))
+
+
+def find_free_dates_sql(doctor_id, since, duration_minutes):
+    """Даты начиная с since, на которые у врача есть окно под услугу."""
+    sql = _runs() + f"""
+        SELECT DISTINCT day
+        FROM runs
+        WHERE {FITS}
+        ORDER BY day
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, _params(doctor_id, since, duration_minutes))
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,84 @@
+"""
+Инкрементальное обновление сводок DoctorDaySummary.
+
+Пересчитываются только затронутые дни врача: по каждому дню считаются
+свободные слоты, самая длинная серия подряд идущих слотов и границы
+свободного времени. Дни без свободных слотов из сводки удаляются.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .availability import iter_runs
+from .models import AvailableSlot, DoctorDaySummary
+
+
+def day_start(day):
+    """Начало дня в текущем часовом поясе."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(day):
+    """
+    Полуоткрытый интервал [начало дня, начало следующего дня).
+
+    В отличие от lookup __date, фильтр по такому диапазону использует
+    индексы по start_datetime.
+    """
+    return day_start(day), day_start(day + timedelta(days=1))
+
+
+def refresh_day_summaries(doctor_id, days):
+    """Пересчитывает сводки врача за указанные дни."""
+    days = set(days)
+    if not days:
+        return
+
+    slots = AvailableSlot.objects.filter(
+        doctor_id=doctor_id,
+        is_booked=False,
+        start_datetime__gte=day_start(min(days)),
+        start_datetime__lt=day_start(max(days) + timedelta(days=1)),
+    ).order_by('start_datetime')
+
+    runs_by_day = {}
+    for day, run in iter_runs(slots):
+        if day in days:
+            runs_by_day.setdefault(day, []).append(run)
+
+    for day, runs in runs_by_day.items():
+        DoctorDaySummary.objects.update_or_create(
+            doctor_id=doctor_id,
+            date=day,
+            defaults={
+                'free_slots': sum(len(run) for run in runs),
+                'longest_run_minutes': max(
+                    (run[-1].end_datetime - run[0].start_datetime) // timedelta(minutes=1)
+                    for run in runs
+                ),
+                'first_free_start': runs[0][0].start_datetime,
+                'last_free_end': runs[-1][-1].end_datetime,
+            }
+        )
+
+    DoctorDaySummary.objects.filter(
+        doctor_id=doctor_id,
+        date__in=days - runs_by_day.keys()
+    ).delete()
+
+
+def summary_dates(doctor_id, since, duration_minutes=None):
+    """Запрос дат начиная с since, на которые есть свободное окно (нужной длины)."""
+    summaries = DoctorDaySummary.objects.filter(
+        doctor_id=doctor_id,
+        date__gte=since,
+        free_slots__gt=0,
+    )
+    if duration_minutes:
+        summaries = summaries.filter(longest_run_minutes__gte=duration_minutes)
+    return summaries.order_by('date').values_list('date', flat=True)
+
+
+def free_dates_from_summary(doctor_id, since, duration_minutes=None):
+    """Даты начиная с since, на которые есть свободное окно (нужной длины)."""
+    return list(summary_dates(doctor_id, since, duration_minutes))
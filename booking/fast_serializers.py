@@ -0,0 +1,131 @@
+"""
+Лёгкие сериализаторы чтения для больших списков слотов и записей.
+
+Дают тот же JSON, что SlotSerializer и AppointmentSerializer, но без
+полей DRF на каждый объект: queryset читается через values_list(),
+а готовые объекты (например, после find_start_slots) — через attrgetter.
+Даты и цены форматируются полями DRF, поэтому учитываются DATETIME_FORMAT,
+часовой пояс и COERCE_DECIMAL_TO_STRING.
+
+Какие сериализаторы использовать, решает настройка FAST_SERIALIZERS;
+views берут класс через slot_serializer() и appointment_serializer().
+"""
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+from .serializers import AppointmentSerializer, ServiceSerializer, SlotSerializer
+
+_datetime = serializers.DateTimeField().to_representation
+_price_field = ServiceSerializer().fields['price']
+
+
+def _format_datetime(value):
+    return None if value is None else _datetime(value)
+
+
+def _format_price(value):
+    return None if value is None else _price_field.to_representation(value)
+
+
+def _getter(columns):
+    """Кортеж значений колонок из объекта: doctor__full_name -> doctor.full_name."""
+    get = attrgetter(*(column.replace('__', '.') for column in columns))
+    if len(columns) == 1:
+        return lambda obj: (get(obj),)
+    return get
+
+
+class FastReadSerializer:
+    """
+    Основа лёгкого сериализатора с интерфейсом DRF: Serializer(obj).data,
+    Serializer(objs, many=True, fields=[...]).data.
+
+    schema — тройки (поле ответа, путь для values_list(), форматтер или
+    None) в порядке полей DRF-сериализатора. Поле с точкой попадает во
+    вложенный словарь: 'doctor.id' -> {'doctor': {'id': ...}}. fields
+    отбирает поля верхнего уровня, и лишние колонки не читаются вовсе.
+    """
+    schema = ()
+
+    def __init__(self, instance=None, many=False, fields=None):
+        self.instance = instance
+        self.many = many
+        wanted = set(fields) if fields else None
+        schema = [
+            (name.split('.'), column, formatter)
+            for name, column, formatter in self.schema
+            if wanted is None or name.split('.')[0] in wanted
+        ]
+        self.columns = [column for _, column, _ in schema]
+        self.plan = [(path, formatter) for path, _, formatter in schema]
+
+    def _rows(self):
+        if not self.columns:
+            return ((),) * len(self.instance)
+        if isinstance(self.instance, QuerySet):
+            return self.instance.values_list(*self.columns)
+        return map(_getter(self.columns), self.instance)
+
+    def _to_representation(self, row):
+        data = {}
+        for (path, formatter), value in zip(self.plan, row):
+            if formatter is not None:
+                value = formatter(value)
+            target = data
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value
+        return data
+
+    @property
+    def data(self):
+        if not self.many:
+            row = _getter(self.columns)(self.instance) if self.columns else ()
+            return self._to_representation(row)
+        return [self._to_representation(row) for row in self._rows()]
+
+
+class FastSlotSerializer(FastReadSerializer):
+    """Лёгкий аналог SlotSerializer."""
+    schema = (
+        ('id', 'id', None),
+        ('doctor', 'doctor_id', None),
+        ('doctor_name', 'doctor__full_name', None),
+        ('start_datetime', 'start_datetime', _format_datetime),
+        ('end_datetime', 'end_datetime', _format_datetime),
+        ('is_booked', 'is_booked', None),
+    )
+
+
+class FastAppointmentSerializer(FastReadSerializer):
+    """Лёгкий аналог AppointmentSerializer (врач, пациент и услуга вложены)."""
+    schema = (
+        ('id', 'id', None),
+        ('doctor.id', 'doctor__id', None),
+        ('doctor.full_name', 'doctor__full_name', None),
+        ('doctor.telegram_id', 'doctor__telegram_id', None),
+        ('patient.full_name', 'patient__full_name', None),
+        ('patient.phone_number', 'patient__phone_number', None),
+        ('service.id', 'service__id', None),
+        ('service.name', 'service__name', None),
+        ('service.description', 'service__description', None),
+        ('service.duration_minutes', 'service__duration_minutes', None),
+        ('service.price', 'service__price', _format_price),
+        ('start_datetime', 'start_datetime', _format_datetime),
+        ('end_datetime', 'end_datetime', _format_datetime),
+        ('status', 'status', None),
+        ('created_at', 'created_at', _format_datetime),
+    )
+
+
+def slot_serializer():
+    """Класс сериализатора списков слотов с учётом FAST_SERIALIZERS."""
+    return FastSlotSerializer if settings.FAST_SERIALIZERS else SlotSerializer
+
+
+def appointment_serializer():
+    """Класс сериализатора списков записей с учётом FAST_SERIALIZERS."""
+    return FastAppointmentSerializer if settings.FAST_SERIALIZERS else AppointmentSerializer
@@ -0,0 +1,130 @@
+"""
+Определение пользователя по telegram_id с кэшированием.
+
+Почти каждый запрос ботов начинается с поиска пользователя по заголовку
+X-Telegram-ID. Найденный пользователь кэшируется в памяти процесса
+(LRU + TTL) и, если задан IDENTITY_CACHE['ALIAS'], дополнительно в кэше
+Django. Записи сбрасываются сигналами при сохранении и удалении User.
+«Не найден» не кэшируется: только что зарегистрированный пользователь
+должен находиться сразу, во всех процессах.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import User
+
+DEFAULTS = {
+    'SIZE': 1024,
+    'TTL': 60,
+    'ALIAS': None,
+}
+
+def _config(name):
+    return getattr(settings, 'IDENTITY_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш с ограничением времени жизни записей."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = LRUCache(_config('SIZE'), _config('TTL'))
+
+
+def _shared_cache():
+    alias = _config('ALIAS')
+    return caches[alias] if alias else None
+
+
+def _key(telegram_id):
+    return f"identity:tg:{telegram_id}"
+
+
+def _normalize(telegram_id):
+    try:
+        return int(telegram_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def resolve_user(telegram_id):
+    """Пользователь с данным telegram_id или None."""
+    telegram_id = _normalize(telegram_id)
+    if telegram_id is None:
+        return None
+
+    user = _local.get(telegram_id)
+    if user is not None:
+        return user
+
+    shared = _shared_cache()
+    if shared is not None:
+        user = shared.get(_key(telegram_id))
+        if user is not None:
+            _local.set(telegram_id, user)
+            return user
+
+    user = User.objects.filter(telegram_id=telegram_id).first()
+    if user is not None:
+        _local.set(telegram_id, user)
+        if shared is not None:
+            shared.set(_key(telegram_id), user, _config('TTL'))
+    return user
+
+
+def resolve_doctor(telegram_id):
+    """Врач с данным telegram_id или None."""
+    user = resolve_user(telegram_id)
+    return user if user is not None and user.is_doctor else None
+
+
+def invalidate_user(user):
+    """Сбрасывает кэш для пользователя (вызывается сигналами User)."""
+    # telegram_id мог смениться, поэтому чистим и по первичному ключу
+    _local.delete_where(lambda cached: cached.pk == user.pk)
+    if user.telegram_id is not None:
+        _local.delete(user.telegram_id)
+        shared = _shared_cache()
+        if shared is not None:
+            shared.delete(_key(user.telegram_id))
@@ -0,0 +1,61 @@
+"""
+Общие параметры списочных эндпоинтов: фильтр по датам, курсорная
+пагинация и выбор полей.
+
+Пагинация включается только если клиент передал cursor или page_size,
+поэтому старые клиенты продолжают получать обычный список.
+"""
+from datetime import date
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .day_summary import day_start, day_range
+
+
+class StartDatetimeCursorPagination(CursorPagination):
+    ordering = 'start_datetime'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+def filter_by_dates(queryset, params):
+    """
+    Фильтрует queryset по start_datetime.
+
+    Поддерживаются date=YYYY-MM-DD либо date_from/date_to (включительно).
+    При неверном формате даты бросает ValueError.
+    """
+    if params.get('date'):
+        day_begin, day_end = day_range(date.fromisoformat(params['date']))
+        return queryset.filter(start_datetime__gte=day_begin, start_datetime__lt=day_end)
+
+    if params.get('date_from'):
+        queryset = queryset.filter(
+            start_datetime__gte=day_start(date.fromisoformat(params['date_from']))
+        )
+    if params.get('date_to'):
+        _, day_end = day_range(date.fromisoformat(params['date_to']))
+        queryset = queryset.filter(start_datetime__lt=day_end)
+    return queryset
+
+
+def requested_fields(request):
+    """Список полей из ?fields=a,b,c или None, если параметр не передан."""
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(',') if name.strip()]
+
+
+def list_response(request, view, queryset, serializer_class):
+    """Ответ со списком: с учётом ?fields= и, по запросу, с пагинацией."""
+    fields = requested_fields(request)
+    params = request.query_params
+    if 'cursor' in params or 'page_size' in params:
+        paginator = StartDatetimeCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=view)
+        data = serializer_class(page, many=True, fields=fields).data
+        return paginator.get_paginated_response(data)
+    return Response(serializer_class(queryset, many=True, fields=fields).data)
@@ -0,0 +1,80 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from booking.renderers import ORJSONRenderer, orjson
+from booking.views import DoctorAppointmentsView, DoctorSlotsView
+
+from .benchmark_serializers import seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает JSONRenderer DRF и ORJSONRenderer на ответах "
+        "/slots/all/ и /appointments/: время рендеринга, время разбора "
+        "(json.loads против orjson.loads, как в клиентах ботов) и "
+        "побайтное совпадение. Тестовые данные создаются в транзакции "
+        "и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=2000,
+                            help="Сколько слотов у тестового врача")
+        parser.add_argument('--appointments', type=int, default=500,
+                            help="Сколько записей у тестового врача")
+        parser.add_argument('--repeat', type=int, default=50,
+                            help="Сколько раз повторить каждый замер")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("Пакет orjson не установлен, сравнивать не с чем")
+            return
+
+        with transaction.atomic():
+            doctor = seed_benchmark_data(options['slots'], options['appointments'])
+            payloads = {
+                "/slots/all/": self._payload(DoctorSlotsView, '/api/slots/all/', doctor),
+                "/appointments/": self._payload(
+                    DoctorAppointmentsView, '/api/appointments/', doctor
+                ),
+            }
+            transaction.set_rollback(True)
+
+        for path, data in payloads.items():
+            self._compare(path, data, options['repeat'])
+
+    def _payload(self, view_class, path, doctor):
+        """Данные ответа представления, как их получает рендерер."""
+        request = APIRequestFactory().get(path, HTTP_X_TELEGRAM_ID=str(doctor.telegram_id))
+        return view_class.as_view()(request).data
+
+    @staticmethod
+    def _timed(func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - started) * 1000 / repeat, result
+
+    def _compare(self, path, data, repeat):
+        std_ms, std_body = self._timed(lambda: JSONRenderer().render(data), repeat)
+        fast_ms, fast_body = self._timed(lambda: ORJSONRenderer().render(data), repeat)
+        std_parse_ms, _ = self._timed(lambda: json.loads(std_body), repeat)
+        fast_parse_ms, _ = self._timed(lambda: orjson.loads(fast_body), repeat)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"=== {path}: {len(data)} объектов, {len(std_body) / 1024:.0f} КБ"
+        ))
+        self.stdout.write(
+            f"рендеринг: json {std_ms:.2f} мс, orjson {fast_ms:.2f} мс "
+            f"(x{std_ms / fast_ms:.1f})\n"
+            f"разбор:    json {std_parse_ms:.2f} мс, orjson {fast_parse_ms:.2f} мс "
+            f"(x{std_parse_ms / fast_parse_ms:.1f})"
+        )
+        if std_body == fast_body:
+            self.stdout.write(self.style.SUCCESS("JSON совпадает побайтно"))
+        else:
+            self.stderr.write("JSON отличается!")
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from booking.fast_serializers import FastAppointmentSerializer, FastSlotSerializer
+from booking.models import Appointment, AvailableSlot, Service, User
+from booking.serializers import AppointmentSerializer, SlotSerializer
+
+
+def seed_benchmark_data(slot_count, appointment_count):
+    """Врач со слотами и записями для бенчмарков; вызывать внутри откатываемой транзакции."""
+    doctor = User.objects.create(
+        username='benchmark_doctor', full_name="Бенчмарк Врач", phone_number='0',
+        telegram_id=-1, is_doctor=True, is_doctor_approved=True,
+    )
+    patient = User.objects.create(
+        username='benchmark_patient', full_name="Бенчмарк Пациент", phone_number='1',
+        telegram_id=-2,
+    )
+    service = Service.objects.create(
+        doctor=doctor, name="Приём", duration_minutes=15, price='1500.00'
+    )
+    start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+    step = timedelta(minutes=15)
+    AvailableSlot.objects.bulk_create(
+        AvailableSlot(
+            doctor=doctor,
+            start_datetime=start + step * n,
+            end_datetime=start + step * (n + 1),
+        )
+        for n in range(slot_count)
+    )
+    Appointment.objects.bulk_create(
+        Appointment(
+            doctor=doctor, patient=patient, service=service,
+            start_datetime=start + step * n, end_datetime=start + step * (n + 1),
+        )
+        for n in range(appointment_count)
+    )
+    return doctor
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает скорость сериализации списков слотов и записей: "
+        "ModelSerializer DRF против лёгких сериализаторов из "
+        "booking.fast_serializers, и проверяет, что JSON совпадает. "
+        "Тестовые данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=500,
+                            help="Сколько слотов сериализовать")
+        parser.add_argument('--appointments', type=int, default=200,
+                            help="Сколько записей сериализовать")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Сколько раз повторить каждый замер")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            doctor = seed_benchmark_data(options['slots'], options['appointments'])
+            slots = AvailableSlot.objects.filter(doctor=doctor).select_related('doctor')
+            appointments = Appointment.objects.filter(
+                doctor=doctor
+            ).select_related('doctor', 'patient', 'service')
+
+            self._compare("Слоты", slots, SlotSerializer, FastSlotSerializer, options['repeat'])
+            self._compare("Записи", appointments, AppointmentSerializer,
+                          FastAppointmentSerializer, options['repeat'])
+            transaction.set_rollback(True)
+
+    def _measure(self, queryset, serializer_class, repeat):
+        """Среднее время (мс) выборки и сериализации и итоговый JSON."""
+        renderer = JSONRenderer()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            content = renderer.render(serializer_class(queryset.all(), many=True).data)
+        return (time.perf_counter() - started) * 1000 / repeat, content
+
+    def _compare(self, title, queryset, drf_class, fast_class, repeat):
+        drf_ms, drf_content = self._measure(queryset, drf_class, repeat)
+        fast_ms, fast_content = self._measure(queryset, fast_class, repeat)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"=== {title}: {queryset.count()}"))
+        self.stdout.write(
+            f"DRF: {drf_ms:.1f} мс, лёгкий: {fast_ms:.1f} мс, "
+            f"ускорение x{drf_ms / fast_ms:.1f}"
+        )
+        if drf_content == fast_content:
+            self.stdout.write(self.style.SUCCESS("JSON совпадает"))
+        else:
+            self.stderr.write("JSON отличается!")
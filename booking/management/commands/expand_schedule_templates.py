@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from booking.schedule_templates import expand_due_templates
+
+
+class Command(BaseCommand):
+    help = "Создаёт слоты из активных шаблонов смен (запускать по расписанию)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Горизонт в днях (по умолчанию SCHEDULE_TEMPLATE_HORIZON_DAYS)"
+        )
+
+    def handle(self, *args, **options):
+        created = expand_due_templates(options['days'])
+        self.stdout.write(f"Создано слотов: {created}")
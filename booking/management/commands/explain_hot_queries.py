@@ -0,0 +1,133 @@
+from argparse import ArgumentTypeError
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from booking.day_summary import day_range
+from booking.models import Appointment, AvailableSlot, Service, User
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise ArgumentTypeError("нужно целое число не меньше 1")
+    return number
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает планы горячих запросов по слотам и записям. "
+        "С --seed заполняет базу тестовыми данными, с --compare ещё и план "
+        "без частичных индексов. Всё выполняется в транзакции и откатывается."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Сколько дней слотов по 15 минут (8:00-20:00) создать")
+        parser.add_argument('--doctors', type=positive_int, default=20,
+                            help="Сколько врачей создать при --seed")
+        parser.add_argument('--compare', action='store_true',
+                            help="Показать план и без новых индексов")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                doctor = self._seed(options['seed'], options['doctors'])
+            else:
+                doctor = User.objects.filter(is_doctor=True).first()
+                if doctor is None:
+                    self.stderr.write("Нет врачей, запустите с --seed")
+                    return
+
+            self._explain_all(doctor, "С индексами")
+
+            if options['compare'] and connection.vendor != 'postgresql':
+                self.stderr.write("--compare поддерживается только на PostgreSQL")
+            elif options['compare']:
+                with connection.schema_editor() as editor:
+                    for model in (AvailableSlot, Appointment):
+                        for index in model._meta.indexes:
+                            editor.remove_index(model, index)
+                self._explain_all(doctor, "Без частичных индексов")
+
+            transaction.set_rollback(True)
+
+    def _queries(self, doctor):
+        today = timezone.localdate()
+        day_begin, day_end = day_range(today + timedelta(days=1))
+        return {
+            "Свободные слоты врача (AvailableSlotsView)": AvailableSlot.objects.filter(
+                doctor=doctor, is_booked=False, start_datetime__gte=timezone.now()
+            ).order_by('start_datetime'),
+            "Слоты врача за день (SlotsListView)": AvailableSlot.objects.filter(
+                doctor=doctor, start_datetime__gte=day_begin, start_datetime__lt=day_end
+            ).order_by('start_datetime'),
+            "Слоты врача за день через __date (до изменений)": AvailableSlot.objects.filter(
+                doctor=doctor, start_datetime__date=today + timedelta(days=1)
+            ).order_by('start_datetime'),
+            "Активные записи врача за день": Appointment.objects.filter(
+                doctor=doctor, status='active',
+                start_datetime__gte=day_begin, start_datetime__lt=day_end
+            ).order_by('start_datetime'),
+        }
+
+    def _explain_all(self, doctor, title):
+        analyze = connection.vendor == 'postgresql'
+        self.stdout.write(self.style.MIGRATE_HEADING(f"=== {title}"))
+        for name, queryset in self._queries(doctor).items():
+            self.stdout.write(self.style.SQL_KEYWORD(f"--- {name}"))
+            self.stdout.write(queryset.explain(analyze=analyze) if analyze else queryset.explain())
+
+    def _seed(self, days, doctors):
+        first_day = timezone.localdate()
+        created = []
+        for n in range(doctors):
+            doctor = User.objects.create(
+                username=f"bench_doctor_{n}",
+                full_name=f"Bench Doctor {n}",
+                is_doctor=True,
+                is_doctor_approved=True,
+            )
+            patient = User.objects.create(
+                username=f"bench_patient_{n}",
+                full_name=f"Bench Patient {n}",
+            )
+            service = Service.objects.create(
+                doctor=doctor, name="Bench", duration_minutes=30
+            )
+            slots = []
+            appointments = []
+            for day_offset in range(days):
+                day_begin, _ = day_range(first_day + timedelta(days=day_offset))
+                shift_start = day_begin + timedelta(hours=8)
+                for i in range(48):
+                    start = shift_start + timedelta(minutes=15 * i)
+                    # Каждый восьмой слот занят активной записью, между ними — отменённые
+                    booked = i % 8 == 0
+                    slots.append(AvailableSlot(
+                        doctor=doctor,
+                        start_datetime=start,
+                        end_datetime=start + timedelta(minutes=15),
+                        is_booked=booked,
+                    ))
+                    if i % 4 == 0:
+                        appointments.append(Appointment(
+                            doctor=doctor,
+                            patient=patient,
+                            service=service,
+                            start_datetime=start,
+                            end_datetime=start + timedelta(minutes=15),
+                            status='active' if booked else 'cancelled',
+                        ))
+            AvailableSlot.objects.bulk_create(slots, batch_size=1000)
+            Appointment.objects.bulk_create(appointments, batch_size=1000)
+            created.append(doctor)
+
+        for model in (AvailableSlot, Appointment):
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+        self.stdout.write(f"Создано врачей: {doctors}, дней слотов на врача: {days}")
+        return created[0]
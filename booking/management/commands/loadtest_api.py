@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import time
+
+import aiohttp
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест горячих эндпоинтов чтения. Принимает несколько "
+        "базовых адресов, например WSGI (gunicorn Schedule.wsgi) и ASGI "
+        "(uvicorn Schedule.asgi:application, пути /api/async/), и для "
+        "каждого печатает запросы в секунду и перцентили задержки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', action='append', required=True,
+                            help="Базовый адрес API, например http://127.0.0.1:8000/api "
+                                 "или http://127.0.0.1:8001/api/async; можно несколько")
+        parser.add_argument('--doctor', type=int, required=True, help="ID врача")
+        parser.add_argument('--service', type=int, required=True, help="ID услуги врача")
+        parser.add_argument('--telegram-id', type=int,
+                            help="Telegram ID пациента для appointments/by-patient/")
+        parser.add_argument('--requests', type=int, default=2000,
+                            help="Сколько запросов на каждый адрес")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="Сколько запросов одновременно")
+
+    def handle(self, *args, **options):
+        for base_url in options['base_url']:
+            latencies, errors, elapsed = asyncio.run(self._run(base_url.rstrip('/'), options))
+            self._report(base_url, latencies, errors, elapsed)
+
+    def _targets(self, options):
+        doctor, service = options['doctor'], options['service']
+        targets = [
+            ('GET', '/doctors/', None),
+            ('GET', f'/services/doctor/?doctor_id={doctor}', None),
+            ('GET', f'/slots/available/?doctor_id={doctor}&service_id={service}', None),
+            ('GET', f'/slots/free_dates/?doctor_id={doctor}&service_id={service}', None),
+        ]
+        if options['telegram_id']:
+            targets.append(
+                ('POST', '/appointments/by-patient/', {'telegram_id': options['telegram_id']})
+            )
+        return targets
+
+    async def _run(self, base_url, options):
+        targets = self._targets(options)
+        total = options['requests']
+        latencies = []
+        errors = 0
+        counter = iter(range(total))
+
+        async def worker(session):
+            nonlocal errors
+            for n in counter:
+                method, path, payload = targets[n % len(targets)]
+                start = time.perf_counter()
+                try:
+                    async with session.request(method, base_url + path, json=payload) as response:
+                        await response.read()
+                        if response.status >= 400:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        connector = aiohttp.TCPConnector(limit=options['concurrency'])
+        async with aiohttp.ClientSession(connector=connector) as session:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(session) for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+        return latencies, errors, elapsed
+
+    def _report(self, base_url, latencies, errors, elapsed):
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"=== {base_url}"))
+        self.stdout.write(
+            f"запросов: {len(latencies)}, ошибок: {errors}, "
+            f"{len(latencies) / elapsed:.0f} запросов/с\n"
+            f"p50 {quantiles[49] * 1000:.1f} мс, p95 {quantiles[94] * 1000:.1f} мс, "
+            f"p99 {quantiles[98] * 1000:.1f} мс"
+        )
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from booking.availability_events import prune_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из ленты изменений доступности события старше "
+        "AVAILABILITY_EVENTS['RETENTION_HOURS']; запускать по расписанию"
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_events()
+        hours = settings.AVAILABILITY_EVENTS['RETENTION_HOURS']
+        self.stdout.write(f"Удалено событий старше {hours} ч: {deleted}")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from booking.day_summary import refresh_day_summaries
+from booking.models import AvailableSlot, DoctorDaySummary, User
+from booking.slot_changes import slot_days
+
+
+class Command(BaseCommand):
+    help = "Полностью пересчитывает сводки свободного времени врачей по дням"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, help="ID врача (по умолчанию все)")
+
+    def handle(self, *args, **options):
+        doctors = User.objects.filter(is_doctor=True)
+        if options['doctor']:
+            doctors = doctors.filter(id=options['doctor'])
+
+        for doctor_id in doctors.values_list('id', flat=True):
+            starts = AvailableSlot.objects.filter(
+                doctor_id=doctor_id
+            ).values_list('start_datetime', flat=True)
+            days = slot_days(starts)
+            days.update(
+                DoctorDaySummary.objects.filter(
+                    doctor_id=doctor_id
+                ).values_list('date', flat=True)
+            )
+            refresh_day_summaries(doctor_id, days)
+            self.stdout.write(f"Врач {doctor_id}: пересчитано дней {len(days)}")
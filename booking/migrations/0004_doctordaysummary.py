@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:47
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_day_summaries(apps, schema_editor):
+    """
+    Сводки по уже существующим свободным слотам. Серии считаются так же,
+    как в booking.availability.iter_runs, но здесь, чтобы миграция не
+    зависела от кода приложения.
+    """
+    AvailableSlot = apps.get_model('booking', 'AvailableSlot')
+    DoctorDaySummary = apps.get_model('booking', 'DoctorDaySummary')
+
+    summaries = {}
+    run_start = None
+    slots = AvailableSlot.objects.filter(is_booked=False).order_by(
+        'doctor_id', 'start_datetime'
+    ).values_list('doctor_id', 'start_datetime', 'end_datetime')
+    for doctor_id, start, end in slots.iterator():
+        day = timezone.localtime(start).date()
+        summary = summaries.get((doctor_id, day))
+        if summary is None:
+            summary = summaries[doctor_id, day] = DoctorDaySummary(
+                doctor_id=doctor_id, date=day, first_free_start=start
+            )
+            run_start = start
+        elif start != summary.last_free_end:
+            run_start = start
+        summary.free_slots += 1
+        summary.last_free_end = end
+        summary.longest_run_minutes = max(
+            summary.longest_run_minutes, (end - run_start) // timedelta(minutes=1)
+        )
+    DoctorDaySummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_service_doctor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDaySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('free_slots', models.PositiveIntegerField(default=0)),
+                ('longest_run_minutes', models.PositiveIntegerField(default=0)),
+                ('first_free_start', models.DateTimeField(blank=True, null=True)),
+                ('last_free_end', models.DateTimeField(blank=True, null=True)),
+                ('doctor', models.ForeignKey(limit_choices_to={'is_doctor': True}, on_delete=django.db.models.deletion.CASCADE, related_name='day_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('doctor', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_day_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_doctordaysummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.JSONField(default=list)),
+                ('shift_start', models.TimeField()),
+                ('shift_end', models.TimeField()),
+                ('slot_minutes', models.PositiveIntegerField(default=15, validators=[django.core.validators.MinValueValidator(5)])),
+                ('valid_from', models.DateField()),
+                ('valid_to', models.DateField(blank=True, null=True)),
+                ('expanded_until', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(limit_choices_to={'is_doctor': True}, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_templates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['valid_from'],
+            },
+        ),
+    ]
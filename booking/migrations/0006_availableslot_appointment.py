@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_active_appointments(apps, schema_editor):
+    """Привязывает к активным записям слоты, занятые ими до появления связи."""
+    Appointment = apps.get_model('booking', 'Appointment')
+    AvailableSlot = apps.get_model('booking', 'AvailableSlot')
+
+    for appointment in Appointment.objects.filter(status='active').iterator():
+        AvailableSlot.objects.filter(
+            doctor_id=appointment.doctor_id,
+            start_datetime__gte=appointment.start_datetime,
+            end_datetime__lte=appointment.end_datetime,
+            is_booked=True,
+            appointment__isnull=True,
+        ).update(appointment=appointment)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_scheduletemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availableslot',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slots', to='booking.appointment'),
+        ),
+        migrations.RunPython(link_active_appointments, migrations.RunPython.noop),
+    ]
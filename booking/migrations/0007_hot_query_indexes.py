@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_availableslot_appointment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['doctor', 'start_datetime'], name='appt_doctor_active_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['patient', 'start_datetime'], name='appt_patient_active_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availableslot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['doctor', 'start_datetime'], name='slot_doctor_free_start_idx'),
+        ),
+    ]
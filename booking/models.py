@@ -50,10 +50,24 @@ class AvailableSlot(models.Model):
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
     is_booked = models.BooleanField(default=False)
+    appointment = models.ForeignKey(
+        'Appointment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='slots'
+    )
 
     class Meta:
         unique_together = ('doctor', 'start_datetime')
         ordering = ['start_datetime']
+        indexes = [
+            models.Index(
+                fields=['doctor', 'start_datetime'],
+                condition=models.Q(is_booked=False),
+                name='slot_doctor_free_start_idx'
+            ),
+        ]
 
     def __str__(self):
         doctor_full_name = self.doctor.full_name
@@ -90,9 +104,112 @@ class Appointment(models.Model):
 
     class Meta:
         ordering = ['start_datetime']
+        indexes = [
+            models.Index(
+                fields=['doctor', 'start_datetime'],
+                condition=models.Q(status='active'),
+                name='appt_doctor_active_start_idx'
+            ),
+            models.Index(
+                fields=['patient', 'start_datetime'],
+                condition=models.Q(status='active'),
+                name='appt_patient_active_start_idx'
+            ),
+        ]
 
     def __str__(self):
         patient_full_name = self.patient.full_name
         service_name = self.service.name
         start_datetime = self.start_datetime.strftime('%Y-%m-%d %H:%M')
-        return f"{patient_full_name} — {service_name} @ {start_datetime}"
\ No newline at end of file
+        return f"{patient_full_name} — {service_name} @ {start_datetime}"
+
+class DoctorDaySummary(models.Model):
+    """Сводка свободного времени врача за день, обновляется при изменении слотов."""
+    doctor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        limit_choices_to={'is_doctor': True},
+        related_name='day_summaries'
+    )
+    date = models.DateField()
+    free_slots = models.PositiveIntegerField(default=0)
+    longest_run_minutes = models.PositiveIntegerField(default=0)
+    first_free_start = models.DateTimeField(null=True, blank=True)
+    last_free_end = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('doctor', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.doctor.full_name}: {self.date} ({self.free_slots})"
+
+
+class ScheduleTemplate(models.Model):
+    """Повторяющаяся смена врача, по которой сервер сам создаёт слоты."""
+    doctor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        limit_choices_to={'is_doctor': True},
+        related_name='schedule_templates'
+    )
+    # Дни недели смены: 0 — понедельник, 6 — воскресенье
+    weekdays = models.JSONField(default=list)
+    shift_start = models.TimeField()
+    shift_end = models.TimeField()
+    slot_minutes = models.PositiveIntegerField(
+        default=15,
+        validators=[MinValueValidator(5)]
+    )
+    valid_from = models.DateField()
+    valid_to = models.DateField(null=True, blank=True)
+    # До какой даты включительно слоты уже сгенерированы
+    expanded_until = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['valid_from']
+
+    def __str__(self):
+        shift_start = self.shift_start.strftime('%H:%M')
+        shift_end = self.shift_end.strftime('%H:%M')
+        return f"{self.doctor.full_name}: {shift_start}-{shift_end}"
+
+
+class AvailabilityVersion(models.Model):
+    """Счётчик изменений слотов врача, по нему версионируется кэш доступности."""
+    doctor = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='availability_version'
+    )
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.doctor.full_name}: v{self.version}"
+
+
+class AvailabilityEvent(models.Model):
+    """
+    Запись ленты изменений доступности: у врача менялись слоты на дату.
+    id растёт монотонно, клиенты читают ленту начиная с последнего
+    увиденного id.
+    """
+    doctor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='availability_events'
+    )
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['doctor', 'id'], name='avail_event_doctor_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.doctor.full_name}: {self.date}"
@@ -0,0 +1,102 @@
+"""
+Контроль числа SQL-запросов.
+
+QueryCountMiddleware в режиме DEBUG добавляет к ответу заголовок
+X-Query-Count и пишет в лог запросы, превысившие порог из
+settings.QUERY_COUNT['WARN_AT']. assert_max_queries — помощник для
+тестов: проверяет, что блок кода укладывается в заданное число запросов
+(например, что список не зависит от числа элементов).
+"""
+import logging
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper, считающая запросы без сохранения их текста."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _add_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class QueryCountMiddleware:
+    """
+    Сообщает число запросов к базе на HTTP-запрос (только при DEBUG).
+
+    Поддерживает и синхронную, и асинхронную цепочку, чтобы под ASGI
+    Django не оборачивал её в sync_to_async ради этого middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DEBUG:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        return self.report(request, response, counter.count)
+
+    async def __acall__(self, request):
+        if not settings.DEBUG:
+            return await self.get_response(request)
+
+        # Соединения с базой привязаны к потоку, а async ORM ходит в базу из
+        # потока sync_to_async — под ASGI он один на запрос. Поэтому счётчик
+        # ставится на соединение этого потока, а не цикла событий
+        counter = QueryCounter()
+        await sync_to_async(_add_wrapper)(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(counter)
+        return self.report(request, response, counter.count)
+
+    @staticmethod
+    def report(request, response, count):
+        response['X-Query-Count'] = str(count)
+        warn_at = settings.QUERY_COUNT['WARN_AT']
+        if warn_at and count > warn_at:
+            logger.warning(
+                f"{request.method} {request.get_full_path()}: "
+                f"{count} SQL-запросов (порог {warn_at})"
+            )
+        return response
+
+
+@contextmanager
+def assert_max_queries(limit, using='default'):
+    """Падает с AssertionError, если внутри блока выполнено больше limit запросов."""
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > limit:
+        queries = "\n".join(query['sql'] for query in context.captured_queries)
+        raise AssertionError(
+            f"Выполнено {len(context)} запросов, ожидалось не больше {limit}:\n{queries}"
+        )
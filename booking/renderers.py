@@ -0,0 +1,60 @@
+"""
+Быстрые рендерер и парсер JSON на orjson.
+
+Вывод совпадает с JSONRenderer DRF побайтно: компактный JSON без
+экранирования кириллицы, datetime в UTC с суффиксом Z, экранированные
+U+2028/U+2029. datetime, date, time и UUID orjson кодирует сам, остальное
+(Decimal, timedelta, ленивые строки) — через JSONEncoder DRF.
+orjson — необязательная зависимость: без него, а также для отступов
+(Accept: application/json; indent=4) и значений, которые orjson не
+умеет, работает обычный рендерер DRF.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser, get_encoding
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson с откатом на стандартный json."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Например, целое больше 64 бит
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser на orjson; NaN и Infinity, как и в строгом режиме DRF, не принимает."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = get_encoding(parser_context or {})
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+def render_json(data):
+    """JSON-байты для ответов в обход DRF (кэш ответов, async-представления)."""
+    return ORJSONRenderer().render(data)
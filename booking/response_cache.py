@@ -0,0 +1,98 @@
+"""
+Кэш готовых JSON-ответов для редко меняющихся эндпоинтов.
+
+В кэше лежат уже отрендеренные байты ответа вместе с ETag, так что
+повторный запрос не трогает ни базу, ни сериализаторы, а клиент с
+подходящим If-None-Match получает 304. Ключи включают версию
+пространства имён; сигналы меняют версию при изменении данных, и все
+старые ответы разом перестают находиться.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+
+from .renderers import render_json
+
+CATALOG = 'catalog'
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE['ALIAS']]
+
+
+def _version_key(namespace):
+    return f"respcache:{namespace}:version"
+
+
+def namespace_version(namespace):
+    """Текущая версия пространства имён кэша."""
+    version = _cache().get(_version_key(namespace))
+    if version is None:
+        version = time.time_ns()
+        _cache().add(_version_key(namespace), version, None)
+        version = _cache().get(_version_key(namespace), version)
+    return version
+
+
+def invalidate_namespace(namespace):
+    """Делает недействительными все закэшированные ответы пространства имён."""
+    _cache().set(_version_key(namespace), time.time_ns(), None)
+
+
+def _entry_key(request, namespace, version):
+    path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"respcache:{namespace}:{version}:{path_hash}"
+
+
+def _render(data):
+    body = render_json(data)
+    return f'"{hashlib.md5(body).hexdigest()}"', body
+
+
+def _response(request, entry):
+    etag, body = entry
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+class CachedJSONResponseMixin:
+    """Отдаёт ответ из кэша по пути запроса, поддерживает ETag/If-None-Match."""
+    cache_namespace = CATALOG
+
+    def cached_response(self, request, build_data):
+        version = namespace_version(self.cache_namespace)
+        key = _entry_key(request, self.cache_namespace, version)
+
+        entry = _cache().get(key)
+        if entry is None:
+            entry = _render(build_data())
+            _cache().set(key, entry, settings.RESPONSE_CACHE['TTL'])
+        return _response(request, entry)
+
+
+async def anamespace_version(namespace):
+    """Асинхронный вариант namespace_version."""
+    version = await _cache().aget(_version_key(namespace))
+    if version is None:
+        version = time.time_ns()
+        await _cache().aadd(_version_key(namespace), version, None)
+        version = await _cache().aget(_version_key(namespace), version)
+    return version
+
+
+async def acached_response(request, abuild_data, namespace=CATALOG):
+    """Асинхронный вариант CachedJSONResponseMixin.cached_response."""
+    key = _entry_key(request, namespace, await anamespace_version(namespace))
+
+    entry = await _cache().aget(key)
+    if entry is None:
+        entry = _render(await abuild_data())
+        await _cache().aset(key, entry, settings.RESPONSE_CACHE['TTL'])
+    return _response(request, entry)
@@ -0,0 +1,79 @@
+"""
+Генерация слотов из шаблонов смен на стороне сервера.
+
+Шаблон раскрывается лениво: за раз создаются слоты до заданного горизонта,
+а дата, до которой шаблон уже раскрыт, сохраняется в expanded_until.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ScheduleTemplate
+from .slots import bulk_create_slots
+
+
+def shift_intervals(day, shift_start, shift_end, slot_minutes):
+    """Интервалы слотов одной смены в текущем часовом поясе."""
+    step = timedelta(minutes=slot_minutes)
+    current = timezone.make_aware(datetime.combine(day, shift_start))
+    end = timezone.make_aware(datetime.combine(day, shift_end))
+    intervals = []
+    while current + step <= end:
+        intervals.append((current, current + step))
+        current += step
+    return intervals
+
+
+def template_intervals(template, date_from, date_to):
+    """Интервалы слотов шаблона за даты с date_from по date_to включительно."""
+    intervals = []
+    day = date_from
+    while day <= date_to:
+        if day.weekday() in template.weekdays:
+            intervals.extend(shift_intervals(
+                day, template.shift_start, template.shift_end, template.slot_minutes
+            ))
+        day += timedelta(days=1)
+    return intervals
+
+
+def expand_template(template, until):
+    """
+    Создаёт слоты шаблона до даты until включительно.
+
+    Уже раскрытые даты и прошедшие дни пропускаются. Возвращает
+    результаты bulk_create_slots.
+    """
+    date_from = max(template.valid_from, timezone.localdate())
+    if template.expanded_until:
+        date_from = max(date_from, template.expanded_until + timedelta(days=1))
+    date_to = min(until, template.valid_to) if template.valid_to else until
+
+    if date_from > date_to:
+        return []
+
+    results = bulk_create_slots(
+        template.doctor, template_intervals(template, date_from, date_to)
+    )
+    template.expanded_until = date_to
+    template.save(update_fields=['expanded_until'])
+    return results
+
+
+def expand_due_templates(horizon_days=None):
+    """Раскрывает все активные шаблоны на горизонт horizon_days дней вперёд."""
+    if horizon_days is None:
+        horizon_days = settings.SCHEDULE_TEMPLATE_HORIZON_DAYS
+    until = timezone.localdate() + timedelta(days=horizon_days)
+
+    templates = ScheduleTemplate.objects.filter(
+        is_active=True,
+        doctor__is_doctor=True,
+    ).select_related('doctor')
+
+    created = 0
+    for template in templates:
+        results = expand_template(template, until)
+        created += sum(1 for r in results if r["status"] == "created")
+    return created
@@ -1,8 +1,23 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Service, AvailableSlot, Appointment, User
+from .availability import collect_chain
+from .identity import resolve_user
+from .models import Service, AvailableSlot, Appointment, User, ScheduleTemplate
+from .slot_changes import slots_changed
 from datetime import timedelta
 
 
+class DynamicFieldsMixin:
+    """Позволяет ограничить набор полей аргументом fields=[...]."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class DoctorShortSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -23,7 +38,7 @@ class ServiceSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'duration_minutes', 'price']
 
 
-class SlotSerializer(serializers.ModelSerializer):
+class SlotSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     doctor_name = serializers.CharField(
         source='doctor.full_name', read_only=True
     )
@@ -40,7 +55,57 @@ class SlotSerializer(serializers.ModelSerializer):
         ]
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class ScheduleTemplateSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ScheduleTemplate
+        fields = [
+            'id',
+            'weekdays',
+            'shift_start',
+            'shift_end',
+            'slot_minutes',
+            'valid_from',
+            'valid_to',
+            'expanded_until',
+            'is_active',
+        ]
+        read_only_fields = ['expanded_until']
+
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or not all(
+            isinstance(day, int) and 0 <= day <= 6 for day in value
+        ):
+            raise serializers.ValidationError("Ожидался список дней недели от 0 до 6")
+        return sorted(set(value))
+
+    def validate(self, data):
+        shift_start = data.get('shift_start', getattr(self.instance, 'shift_start', None))
+        shift_end = data.get('shift_end', getattr(self.instance, 'shift_end', None))
+        if shift_start and shift_end and shift_start >= shift_end:
+            raise serializers.ValidationError("Конец смены должен быть позже начала")
+
+        valid_from = data.get('valid_from', getattr(self.instance, 'valid_from', None))
+        valid_to = data.get('valid_to', getattr(self.instance, 'valid_to', None))
+        if valid_from and valid_to and valid_to < valid_from:
+            raise serializers.ValidationError("valid_to раньше valid_from")
+        return data
+
+
+class ShiftSerializer(serializers.Serializer):
+    """Разовая смена: сервер сам нарежет её на слоты."""
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    slot_minutes = serializers.IntegerField(default=15, min_value=5)
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("Время окончания должно быть позже времени начала")
+        return data
+
+
+class AppointmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     doctor = DoctorShortSerializer(read_only=True)
     patient = PatientShortSerializer(read_only=True)
     service = ServiceSerializer(read_only=True)
@@ -74,9 +139,8 @@ class AppointmentCreateSerializer(serializers.Serializer):
         telegram_id = data['telegram_id']
 
         # 🔍 Найти пациента по telegram_id
-        try:
-            patient = User.objects.get(telegram_id=telegram_id, is_doctor=False)
-        except User.DoesNotExist:
+        patient = resolve_user(telegram_id)
+        if patient is None or patient.is_doctor:
             raise serializers.ValidationError("Пациент не найден по telegram_id")
 
         # ✅ Валидация доктора
@@ -91,35 +155,19 @@ class AppointmentCreateSerializer(serializers.Serializer):
         except Service.DoesNotExist:
             raise serializers.ValidationError("Услуга не найдена")
 
-        needed_duration = timedelta(minutes=service.duration_minutes)
+        end_datetime = start_datetime + timedelta(minutes=service.duration_minutes)
 
         available_slots = AvailableSlot.objects.filter(
             doctor=doctor,
             start_datetime__gte=start_datetime,
+            start_datetime__lt=end_datetime,
             is_booked=False
         ).order_by('start_datetime')
 
-        selected_slots = []
-        total_duration = timedelta()
-
-        for slot in available_slots:
-            if not selected_slots:
-                if slot.start_datetime != start_datetime:
-                    continue
-                selected_slots.append(slot)
-                total_duration += slot.end_datetime - slot.start_datetime
-            else:
-                last = selected_slots[-1]
-                if slot.start_datetime == last.end_datetime:
-                    selected_slots.append(slot)
-                    total_duration += slot.end_datetime - slot.start_datetime
-                else:
-                    break
-
-            if total_duration >= needed_duration:
-                break
-
-        if total_duration < needed_duration:
+        selected_slots = collect_chain(
+            available_slots, start_datetime, service.duration_minutes
+        )
+        if not selected_slots:
             raise serializers.ValidationError("Недостаточно свободных слотов")
 
         # ✍️ Добавим данные в validated_data
@@ -138,18 +186,34 @@ class AppointmentCreateSerializer(serializers.Serializer):
         end_datetime = validated_data['end_datetime']
         slots_to_book = validated_data['selected_slots']
 
-        for slot in slots_to_book:
-            slot.is_booked = True
-            slot.save()
+        slot_ids = [slot.id for slot in slots_to_book]
 
-        return Appointment.objects.create(
-            doctor=doctor,
-            patient=patient,
-            service=service,
-            start_datetime=start_datetime,
-            end_datetime=end_datetime,
-            status='active'
-        )
+        with transaction.atomic():
+            # Забираем слоты под блокировку; занятые другой транзакцией
+            # пропускаются, и бронь сразу отклоняется, а не ждёт
+            locked_ids = list(
+                AvailableSlot.objects.select_for_update(skip_locked=True)
+                .filter(id__in=slot_ids, is_booked=False)
+                .order_by('start_datetime')
+                .values_list('id', flat=True)
+            )
+            if len(locked_ids) != len(slot_ids):
+                raise serializers.ValidationError("Выбранное время уже занято")
+
+            appointment = Appointment.objects.create(
+                doctor=doctor,
+                patient=patient,
+                service=service,
+                start_datetime=start_datetime,
+                end_datetime=end_datetime,
+                status='active'
+            )
+            AvailableSlot.objects.filter(id__in=locked_ids).update(
+                is_booked=True, appointment=appointment
+            )
+            slots_changed(doctor.id, [slot.start_datetime for slot in slots_to_book])
+
+        return appointment
 
 
 class AppointmentCancelSerializer(serializers.Serializer):
@@ -187,21 +251,27 @@ class AppointmentCancelSerializer(serializers.Serializer):
 
     def save(self, **kwargs):
         appointments = self.validated_data['appointments']
-
-        for appointment in appointments:
-            # Освобождаем связанные слоты
-            slots = AvailableSlot.objects.filter(
-                doctor=appointment.doctor,
-                start_datetime__gte=appointment.start_datetime,
-                end_datetime__lte=appointment.end_datetime,
-                is_booked=True
-            )
-            slots.update(is_booked=False)
-
-            appointment.status = 'cancelled'
-            appointment.save()
-
-        return appointments
+        cancelled = list(
+            appointments.values_list('id', 'doctor_id', 'start_datetime')
+        )
+        appointment_ids = [appointment_id for appointment_id, _, _ in cancelled]
+
+        with transaction.atomic():
+            # Освобождаем связанные слоты и отменяем записи двумя UPDATE
+            AvailableSlot.objects.filter(
+                appointment_id__in=appointment_ids
+            ).update(is_booked=False, appointment=None)
+            Appointment.objects.filter(
+                id__in=appointment_ids
+            ).update(status='cancelled')
+
+            changed = {}
+            for _, doctor_id, start in cancelled:
+                changed.setdefault(doctor_id, []).append(start)
+            for doctor_id, starts in changed.items():
+                slots_changed(doctor_id, starts)
+
+        return appointment_ids
 
 
 class TelegramAuthSerializer(serializers.Serializer):
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .identity import invalidate_user
+from .models import Service, User
+from .response_cache import CATALOG, invalidate_namespace
+
+
+# Поля пользователя, которые видны в каталоге врачей
+CATALOG_FIELDS = ('full_name', 'is_doctor', 'is_doctor_approved', 'telegram_id')
+
+
+def catalog_values(user):
+    return {field: getattr(user, field) for field in CATALOG_FIELDS}
+
+
+@receiver(pre_save, sender=User)
+def remember_catalog_values(sender, instance, raw=False, **kwargs):
+    # Значения до сохранения: post_save сравнивает с ними, менялся ли каталог
+    if raw or instance.pk is None:
+        instance._catalog_before = None
+        return
+    instance._catalog_before = (
+        User.objects.filter(pk=instance.pk).values(*CATALOG_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    invalidate_user(instance)
+    before = getattr(instance, '_catalog_before', None)
+    was_doctor = bool(before and before['is_doctor'])
+    if (instance.is_doctor or was_doctor) and before != catalog_values(instance):
+        invalidate_namespace(CATALOG)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_user(instance)
+    if instance.is_doctor:
+        invalidate_namespace(CATALOG)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, instance, **kwargs):
+    invalidate_namespace(CATALOG)
@@ -0,0 +1,50 @@
+"""
+Единая точка уведомления об изменении слотов врача.
+
+Вызывается всеми путями, которые создают, удаляют, бронируют или
+освобождают слоты, чтобы производные данные (сводки по дням, версия
+кэша, лента изменений) оставались согласованными.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .availability_cache import bump_availability_version
+from .availability_events import record_changes
+from .day_summary import refresh_day_summaries
+from .models import AvailabilityVersion
+
+
+def slot_days(datetimes):
+    """Множество дат (в текущем часовом поясе) для начал слотов."""
+    return {
+        timezone.localtime(
+            timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+        ).date()
+        for dt in datetimes
+    }
+
+
+def lock_doctor_slots(doctor_id):
+    """
+    Блокирует до конца транзакции строку версии доступности врача:
+    изменения его слотов и пересчёт сводок идут по очереди, и каждый
+    пересчёт видит уже зафиксированные изменения предыдущих.
+
+    Строка создаётся при первом изменении слотов врача; одновременное
+    создание get_or_create разрешает через уникальный ключ.
+    """
+    AvailabilityVersion.objects.get_or_create(doctor_id=doctor_id)
+    list(
+        AvailabilityVersion.objects.select_for_update()
+        .filter(doctor_id=doctor_id).values_list('pk', flat=True)
+    )
+
+
+def slots_changed(doctor_id, datetimes):
+    """Слоты врача, начинающиеся в datetimes, изменились."""
+    with transaction.atomic():
+        lock_doctor_slots(doctor_id)
+        bump_availability_version(doctor_id)
+        days = slot_days(datetimes)
+        refresh_day_summaries(doctor_id, days)
+        record_changes(doctor_id, days)
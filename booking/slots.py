@@ -0,0 +1,113 @@
+"""
+Массовое создание слотов врача.
+
+Конфликты для всей пачки ищутся одним запросом по диапазону времени,
+после чего новые слоты вставляются одним bulk_create. Всё это идёт под
+блокировкой врача (lock_doctor_slots), поэтому две одновременные пачки
+одного врача не вставят пересекающиеся слоты.
+"""
+from bisect import bisect_left
+from itertools import accumulate
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import AvailableSlot
+from .slot_changes import lock_doctor_slots, slots_changed
+
+
+def _aware(value):
+    return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+
+def _insert(slots):
+    """
+    Вставляет слоты одним bulk_create, возвращает вставленные.
+
+    Путь, не берущий блокировку врача (например, админка), всё же может
+    успеть занять то же начало: тогда слоты вставляются по одному, а
+    нарушившие уникальность (врач, начало) пропускаются.
+    """
+    try:
+        with transaction.atomic():
+            return AvailableSlot.objects.bulk_create(slots)
+    except IntegrityError:
+        pass
+
+    created = []
+    for slot in slots:
+        try:
+            with transaction.atomic():
+                slot.save(force_insert=True)
+        except IntegrityError:
+            continue
+        created.append(slot)
+    return created
+
+
+def bulk_create_slots(doctor, intervals):
+    """
+    Создаёт слоты врача по списку пар (start, end).
+
+    Возвращает список результатов в порядке входных интервалов:
+    {"start_datetime", "end_datetime", "status": "created", "slot"} или
+    {"start_datetime", "end_datetime", "status": "skipped", "reason"}.
+    Пересечения с существующими слотами и внутри самой пачки пропускаются.
+    """
+    results = [
+        {"start_datetime": _aware(start), "end_datetime": _aware(end)}
+        for start, end in intervals
+    ]
+    candidates = []
+    for result in results:
+        if result["start_datetime"] >= result["end_datetime"]:
+            result.update(status="skipped", reason="invalid_interval")
+        else:
+            candidates.append(result)
+
+    if not candidates:
+        return results
+
+    with transaction.atomic():
+        lock_doctor_slots(doctor.id)
+        existing = list(
+            AvailableSlot.objects.filter(
+                doctor=doctor,
+                start_datetime__lt=max(c["end_datetime"] for c in candidates),
+                end_datetime__gt=min(c["start_datetime"] for c in candidates),
+            ).order_by('start_datetime').values_list('start_datetime', 'end_datetime')
+        )
+        existing_starts = [start for start, _ in existing]
+        # Максимальный конец среди существующих слотов с началом до индекса
+        existing_max_ends = list(accumulate((end for _, end in existing), max))
+
+        to_create = []
+        last_end = None
+        for candidate in sorted(candidates, key=lambda c: c["start_datetime"]):
+            start, end = candidate["start_datetime"], candidate["end_datetime"]
+            idx = bisect_left(existing_starts, end)
+            if idx and existing_max_ends[idx - 1] > start:
+                candidate.update(status="skipped", reason="conflict")
+                continue
+            if last_end is not None and start < last_end:
+                candidate.update(status="skipped", reason="conflict")
+                continue
+            last_end = end
+            candidate["slot"] = AvailableSlot(
+                doctor=doctor,
+                start_datetime=start,
+                end_datetime=end,
+                is_booked=False
+            )
+            candidate["status"] = "created"
+            to_create.append(candidate["slot"])
+
+        created = _insert(to_create)
+        inserted = {id(slot) for slot in created}
+        for candidate in candidates:
+            if candidate["status"] == "created" and id(candidate["slot"]) not in inserted:
+                del candidate["slot"]
+                candidate.update(status="skipped", reason="conflict")
+        slots_changed(doctor.id, [slot.start_datetime for slot in created])
+
+    return results
@@ -1,3 +1,1158 @@
-from django.test import TestCase
+import asyncio
+import io
+import random
+import uuid
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import identity
+from .admin import AvailableSlotAdmin
+from .availability import collect_chain, find_free_dates, find_start_slots
+from .availability_cache import availability_version
+from .availability_events import EventPoller, alast_event_id, await_changes, event_poller
+from .availability_format import compact_availability, wants_compact
+from .availability_sql import find_free_dates_sql, find_start_slots_sql
+from .day_summary import day_start, free_dates_from_summary, refresh_day_summaries
+from .fast_serializers import FastAppointmentSerializer, FastSlotSerializer
+from .models import (
+    Appointment, AvailabilityEvent, AvailabilityVersion, AvailableSlot, DoctorDaySummary, Service, User,
+)
+from .query_count import QueryCountMiddleware, assert_max_queries
+from .renderers import ORJSONParser, ORJSONRenderer
+from .schedule_templates import expand_due_templates
+from .serializers import AppointmentCreateSerializer, AppointmentSerializer, SlotSerializer
+from .slots import _insert, bulk_create_slots
+
+
+def brute_force_chain(slots, start, duration_minutes):
+    """Цепочка подряд идущих слотов одного дня от start, перебором."""
+    needed_end = start.start_datetime + timedelta(minutes=duration_minutes)
+    chain = [start]
+    for slot in slots:
+        if chain[-1].end_datetime >= needed_end:
+            break
+        if (slot.start_datetime == chain[-1].end_datetime
+                and timezone.localtime(slot.start_datetime).date()
+                == timezone.localtime(start.start_datetime).date()):
+            chain.append(slot)
+    return chain if chain[-1].end_datetime >= needed_end else None
+
+
+def random_slots(rng, make=SimpleNamespace):
+    """Случайные непересекающиеся слоты начиная с 8:00 завтрашнего дня."""
+    slots = []
+    current = timezone.make_aware(datetime.combine(
+        timezone.localdate() + timedelta(days=1), time(8)
+    ))
+    for _ in range(rng.randint(0, 60)):
+        # Разрывы, слоты разной длины и переходы через полночь
+        current += timedelta(minutes=rng.choice([0, 0, 0, 5, 15, 60, 600]))
+        length = timedelta(minutes=rng.choice([10, 15, 15, 30]))
+        slots.append(make(start_datetime=current, end_datetime=current + length))
+        current += length
+    return slots
+
+
+class AvailabilityEngineTests(SimpleTestCase):
+    """Линейный проход движка совпадает с перебором по всем слотам."""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(20251018)
+        for _ in range(300):
+            slots = random_slots(rng)
+            duration = rng.choice([10, 15, 30, 45, 60, 90])
+
+            expected = [s for s in slots if brute_force_chain(slots, s, duration)]
+            self.assertEqual(find_start_slots(slots, duration), expected)
+
+            expected_dates = sorted({
+                timezone.localtime(s.start_datetime).date() for s in expected
+            })
+            self.assertEqual(find_free_dates(slots, duration), expected_dates)
+
+            for slot in slots:
+                self.assertEqual(
+                    collect_chain(slots, slot.start_datetime, duration),
+                    brute_force_chain(slots, slot, duration),
+                )
+
+    def test_run_does_not_cross_midnight(self):
+        evening = timezone.make_aware(datetime.combine(
+            timezone.localdate() + timedelta(days=1), time(23, 30)
+        ))
+        slots = [
+            SimpleNamespace(
+                start_datetime=evening + timedelta(minutes=15 * n),
+                end_datetime=evening + timedelta(minutes=15 * (n + 1)),
+            )
+            for n in range(4)
+        ]
+        self.assertEqual(find_start_slots(slots, 30), [slots[0], slots[2]])
+        self.assertIsNone(collect_chain(slots, slots[1].start_datetime, 30))
+
+
+@skipUnless(connection.vendor == 'postgresql', "оконные функции считаются только на PostgreSQL")
+class SqlEngineTests(TestCase):
+    """SQL-движок возвращает то же, что и движок на Python."""
+
+    def test_matches_python_engine(self):
+        doctor = User.objects.create(username='doctor', telegram_id=1001, is_doctor=True)
+        rng = random.Random(20251018)
+        for _ in range(20):
+            AvailableSlot.objects.all().delete()
+            slots = AvailableSlot.objects.bulk_create(
+                random_slots(rng, lambda **kw: AvailableSlot(doctor=doctor, **kw))
+            )
+            since = timezone.now()
+            until = day_start(timezone.localdate() + timedelta(days=2))
+            for duration in (15, 30, 60):
+                self.assertEqual(
+                    [s.id for s in find_start_slots_sql(doctor.id, since, duration)],
+                    [s.id for s in find_start_slots(slots, duration)],
+                )
+                self.assertEqual(
+                    [s.id for s in find_start_slots_sql(doctor.id, since, duration, until)],
+                    [s.id for s in find_start_slots(slots, duration) if s.start_datetime < until],
+                )
+                self.assertEqual(
+                    find_free_dates_sql(doctor.id, since, duration),
+                    find_free_dates(slots, duration),
+                )
+
+
+class BookingTestCase(TestCase):
+    """Врач с услугой на 30 минут, пациент и завтрашний день."""
+
+    def setUp(self):
+        # Кэши живут в процессе и переживают откат транзакции теста
+        cache.clear()
+        identity._local.clear()
+        self.doctor = User.objects.create(
+            username='doctor', full_name="Врач", telegram_id=1001,
+            is_doctor=True, is_doctor_approved=True,
+        )
+        self.patient = User.objects.create(
+            username='patient', full_name="Пациент", phone_number='1', telegram_id=1002,
+        )
+        self.service = Service.objects.create(
+            doctor=self.doctor, name="Приём", duration_minutes=30, price='1000.00'
+        )
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.client = APIClient()
+
+    def at(self, hour, minute=0, day=None):
+        return timezone.make_aware(datetime.combine(day or self.day, time(hour, minute)))
+
+    def create_slots(self, start, count, step=timedelta(minutes=15)):
+        """Слоты через API, как их создаёт бот врача."""
+        response = self.client.post('/api/slots/create/', {"slots": [
+            {"start_datetime": (start + step * n).isoformat(),
+             "end_datetime": (start + step * (n + 1)).isoformat()}
+            for n in range(count)
+        ]}, format='json', HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def book(self, start, service=None):
+        return self.client.post('/api/appointments/create/', {
+            "doctor_id": self.doctor.id,
+            "service_id": (service or self.service).id,
+            "start_datetime": start.isoformat(),
+            "telegram_id": self.patient.telegram_id,
+        }, format='json')
+
+    def cancel(self, appointment_id):
+        return self.client.post(
+            '/api/appointments/cancel/', {"appointment_ids": [appointment_id]},
+            format='json', HTTP_X_TELEGRAM_ID=str(self.patient.telegram_id),
+        )
+
+    def free_dates(self, **params):
+        response = self.client.get(
+            '/api/slots/free_dates/', {"doctor_id": self.doctor.id, **params}
+        )
+        return response.json()["dates"]
+
+
+class DaySummaryTests(BookingTestCase):
+    """Сводки по дням после любых изменений совпадают с расчётом по слотам."""
+
+    def assert_summaries_match(self):
+        free = AvailableSlot.objects.filter(
+            doctor=self.doctor, is_booked=False
+        ).order_by('start_datetime')
+        today = timezone.localdate()
+        self.assertEqual(
+            free_dates_from_summary(self.doctor.id, today),
+            sorted({timezone.localtime(s.start_datetime).date() for s in free}),
+        )
+        for minutes in (15, 30, 45, 60, 90):
+            self.assertEqual(
+                free_dates_from_summary(self.doctor.id, today, minutes),
+                find_free_dates(free, minutes),
+            )
+
+    def test_book_cancel_delete(self):
+        next_day = self.day + timedelta(days=1)
+        self.create_slots(self.at(10), 4)
+        self.create_slots(self.at(9, day=next_day), 2)
+        self.assert_summaries_match()
+
+        response = self.book(self.at(10, 15))
+        self.assertEqual(response.status_code, 201)
+        self.assert_summaries_match()
+        self.assertEqual(
+            free_dates_from_summary(self.doctor.id, self.day, 30), [next_day]
+        )
+
+        self.assertEqual(self.cancel(response.json()["id"]).status_code, 200)
+        self.assert_summaries_match()
+
+        ids = list(AvailableSlot.objects.filter(
+            start_datetime__date=next_day
+        ).values_list('id', flat=True))
+        response = self.client.delete(
+            '/api/slots/delete/', {"slot_ids": ids}, format='json',
+            HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id),
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_summaries_match()
+        self.assertFalse(DoctorDaySummary.objects.filter(date=next_day).exists())
+
+    def test_admin_moves_slot_between_days(self):
+        self.create_slots(self.at(10), 1)
+        slot = AvailableSlot.objects.get()
+        slot.start_datetime += timedelta(days=1)
+        slot.end_datetime += timedelta(days=1)
+        AvailableSlotAdmin(AvailableSlot, site).save_model(None, slot, None, True)
+
+        self.assert_summaries_match()
+        self.assertEqual(
+            list(DoctorDaySummary.objects.values_list('date', flat=True)),
+            [self.day + timedelta(days=1)],
+        )
+
+    def test_free_dates_without_service_include_booked_days(self):
+        self.create_slots(self.at(10), 2)
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+
+        self.assertEqual(self.free_dates(), [str(self.day)])
+        self.assertEqual(self.free_dates(service_id=self.service.id), [])
+
+
+class DaySummaryMigrationTests(TransactionTestCase):
+    """Миграция 0004 заполняет сводки по уже существующим слотам."""
+
+    def test_backfill_matches_refresh(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('booking', '0003_service_doctor')])
+        apps = executor.loader.project_state([('booking', '0003_service_doctor')]).apps
+        OldUser = apps.get_model('booking', 'User')
+        OldSlot = apps.get_model('booking', 'AvailableSlot')
+
+        doctor = OldUser.objects.create(username='doctor', telegram_id=1001, is_doctor=True)
+        rng = random.Random(20251018)
+        for _ in range(5):
+            OldSlot.objects.bulk_create(
+                OldSlot(doctor=doctor, is_booked=rng.random() < 0.3, **kwargs)
+                for kwargs in (vars(s) for s in random_slots(rng))
+                if not OldSlot.objects.filter(
+                    doctor=doctor, start_datetime__lt=kwargs['end_datetime'],
+                    end_datetime__gt=kwargs['start_datetime'],
+                ).exists()
+            )
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+        fields = ('date', 'free_slots', 'longest_run_minutes', 'first_free_start', 'last_free_end')
+        backfilled = list(DoctorDaySummary.objects.order_by('date').values_list(*fields))
+        self.assertTrue(backfilled)
+
+        days = {
+            timezone.localtime(start).date()
+            for start in AvailableSlot.objects.values_list('start_datetime', flat=True)
+        }
+        DoctorDaySummary.objects.all().delete()
+        refresh_day_summaries(doctor.id, days)
+        self.assertEqual(
+            list(DoctorDaySummary.objects.order_by('date').values_list(*fields)), backfilled
+        )
+
+
+class BulkCreateSlotsTests(BookingTestCase):
+
+    def test_conflicts_are_skipped(self):
+        self.create_slots(self.at(10), 2)
+
+        results = bulk_create_slots(self.doctor, [
+            (self.at(10, 15), self.at(10, 45)),  # пересекается с существующим
+            (self.at(11), self.at(11, 15)),
+            (self.at(11, 10), self.at(11, 20)),  # пересекается с предыдущим в пачке
+            (self.at(12), self.at(11)),          # конец раньше начала
+            (self.at(11, 15), self.at(11, 30)),  # вплотную — не конфликт
+        ])
+
+        self.assertEqual(
+            [(r["status"], r.get("reason")) for r in results],
+            [
+                ("skipped", "conflict"),
+                ("created", None),
+                ("skipped", "conflict"),
+                ("skipped", "invalid_interval"),
+                ("created", None),
+            ],
+        )
+        self.assertEqual(AvailableSlot.objects.filter(doctor=self.doctor).count(), 4)
+
+    def test_duplicate_start_is_skipped_not_raised(self):
+        # Слот с тем же началом, вставленный в обход блокировки врача
+        AvailableSlot.objects.create(
+            doctor=self.doctor, start_datetime=self.at(10), end_datetime=self.at(10, 15)
+        )
+        slots = [
+            AvailableSlot(doctor=self.doctor, start_datetime=self.at(10), end_datetime=self.at(10, 30)),
+            AvailableSlot(doctor=self.doctor, start_datetime=self.at(11), end_datetime=self.at(11, 15)),
+        ]
+        self.assertEqual(_insert(slots), slots[1:])
+        self.assertEqual(AvailableSlot.objects.count(), 2)
+
+    def post_slots(self, query=''):
+        return self.client.post(f'/api/slots/create/{query}', {"slots": [
+            {"start_datetime": self.at(10).isoformat(),
+             "end_datetime": self.at(10, 15).isoformat()},
+            {"start_datetime": self.at(10, 15).isoformat(),
+             "end_datetime": self.at(10, 30).isoformat()},
+        ]}, format='json', HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+
+    def test_view_keeps_list_response(self):
+        self.create_slots(self.at(10), 1)
+        response = self.post_slots()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [slot["start_datetime"] for slot in response.json()],
+            ["%sT10:15:00Z" % self.day],
+        )
+
+    def test_view_reports_results(self):
+        self.create_slots(self.at(10), 1)
+        response = self.post_slots('?report=1')
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data["created"], data["skipped"]), (1, 1))
+        self.assertEqual(
+            [(r["status"], r["start_datetime"]) for r in data["results"]],
+            [("skipped", "%sT10:00:00Z" % self.day), ("created", "%sT10:15:00Z" % self.day)],
+        )
+
+
+class ScheduleTemplateTests(BookingTestCase):
+
+    def post_template(self, **data):
+        return self.client.post('/api/schedule-templates/', {
+            "weekdays": [self.day.weekday()],
+            "shift_start": "09:00",
+            "shift_end": "10:00",
+            "slot_minutes": 20,
+            "valid_from": str(self.day),
+            **data,
+        }, format='json', HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+
+    def expand(self, template_id, until):
+        return self.client.post(
+            f'/api/schedule-templates/{template_id}/expand/', {"until": str(until)},
+            format='json', HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id),
+        )
+
+    def slot_starts(self):
+        return [
+            timezone.localtime(start)
+            for start in AvailableSlot.objects.values_list('start_datetime', flat=True)
+        ]
+
+    def test_expand_creates_slots_on_template_weekdays(self):
+        template_id = self.post_template().json()["id"]
+        week_later = self.day + timedelta(days=7)
+
+        response = self.expand(template_id, week_later + timedelta(days=3))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 6)
+        self.assertEqual(self.slot_starts(), [
+            self.at(hour, minute, day)
+            for day in (self.day, week_later)
+            for hour, minute in ((9, 0), (9, 20), (9, 40))
+        ])
+
+        # Повторное раскрытие не создаёт слоты заново
+        response = self.expand(template_id, week_later + timedelta(days=3))
+        self.assertEqual(response.json()["created"], 0)
+
+    def test_expansion_is_incremental_and_skips_existing_slots(self):
+        template_id = self.post_template(slot_minutes=30).json()["id"]
+        self.create_slots(self.at(9, 15), 1)
+
+        response = self.expand(template_id, self.day)
+        self.assertEqual(
+            (response.json()["created"], response.json()["skipped"]), (1, 1)
+        )
+        self.assertEqual(response.json()["expanded_until"], str(self.day))
+
+        self.assertEqual(expand_due_templates(horizon_days=8), 2)
+        self.assertEqual(len(self.slot_starts()), 4)
+
+    def test_valid_to_limits_expansion(self):
+        template_id = self.post_template(valid_to=str(self.day + timedelta(days=1))).json()["id"]
+        self.expand(template_id, self.day + timedelta(days=30))
+        self.assertEqual({start.date() for start in self.slot_starts()}, {self.day})
+
+    def test_generate_cuts_shift_into_slots(self):
+        response = self.client.post('/api/slots/generate/', {
+            "date": str(self.day), "start_time": "09:00", "end_time": "10:10",
+            "slot_minutes": 30,
+        }, format='json', HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+        self.assertEqual(response.json(), {"created": 2, "skipped": 0})
+        self.assertEqual(self.slot_starts(), [self.at(9), self.at(9, 30)])
+
+
+class DoubleBookingTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_slots(self.at(10), 4)
+
+    def test_same_slot_is_booked_once(self):
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        self.assertEqual(self.book(self.at(10)).status_code, 400)
+        self.assertEqual(Appointment.objects.filter(status='active').count(), 1)
+
+    def test_overlapping_service_is_rejected(self):
+        self.assertEqual(self.book(self.at(10, 15)).status_code, 201)
+        long_service = Service.objects.create(
+            doctor=self.doctor, name="Долгий приём", duration_minutes=60
+        )
+        self.assertEqual(self.book(self.at(10), long_service).status_code, 400)
+        self.assertEqual(AvailableSlot.objects.filter(is_booked=True).count(), 2)
+
+    def test_slot_taken_after_validation_rolls_back(self):
+        serializer = AppointmentCreateSerializer(data={
+            "doctor_id": self.doctor.id, "service_id": self.service.id,
+            "start_datetime": self.at(10).isoformat(),
+            "telegram_id": self.patient.telegram_id,
+        })
+        self.assertTrue(serializer.is_valid())
+        # Второй слот цепочки заняли между проверкой и бронью
+        AvailableSlot.objects.filter(start_datetime=self.at(10, 15)).update(is_booked=True)
+
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertFalse(Appointment.objects.exists())
+        self.assertFalse(AvailableSlot.objects.get(start_datetime=self.at(10)).is_booked)
+
+
+class CancellationTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_slots(self.at(10), 6)
+
+    def booked_starts(self):
+        return list(
+            AvailableSlot.objects.filter(is_booked=True)
+            .values_list('start_datetime', flat=True)
+        )
+
+    def test_booking_links_slots(self):
+        appointment_id = self.book(self.at(10, 15)).json()["id"]
+        self.assertEqual(
+            list(AvailableSlot.objects.filter(appointment_id=appointment_id)
+                 .values_list('start_datetime', flat=True)),
+            [self.at(10, 15), self.at(10, 30)],
+        )
+
+    def test_cancel_frees_only_its_slots(self):
+        first = self.book(self.at(10)).json()["id"]
+        second = self.book(self.at(10, 30)).json()["id"]
+        third = self.book(self.at(11)).json()["id"]
+
+        self.assertEqual(self.cancel(second).status_code, 200)
+        self.assertEqual(
+            self.booked_starts(),
+            [self.at(10), self.at(10, 15), self.at(11), self.at(11, 15)],
+        )
+        self.assertFalse(AvailableSlot.objects.filter(appointment_id=second).exists())
+        self.assertEqual(
+            dict(Appointment.objects.values_list('id', 'status')),
+            {first: 'active', second: 'cancelled', third: 'active'},
+        )
+
+        # Освобождённое время снова можно забронировать
+        self.assertEqual(self.book(self.at(10, 30)).status_code, 201)
+
+    def test_cancel_someone_elses_appointment_is_rejected(self):
+        appointment_id = self.book(self.at(10)).json()["id"]
+        User.objects.create(username='other', telegram_id=1003)
+        response = self.client.post(
+            '/api/appointments/cancel/', {"appointment_ids": [appointment_id]},
+            format='json', HTTP_X_TELEGRAM_ID='1003',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.booked_starts()), 2)
+
+
+class HotQueryTests(BookingTestCase):
+
+    def test_day_list_is_half_open(self):
+        # Последний слот дня и первый слот следующего
+        self.create_slots(self.at(23, 45), 2)
+        response = self.client.get(
+            '/api/slots/', {"date": str(self.day)},
+            HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id),
+        )
+        self.assertEqual(
+            [slot["id"] for slot in response.json()],
+            [AvailableSlot.objects.get(start_datetime=self.at(23, 45)).id],
+        )
+
+    def test_partial_indexes_exist(self):
+        with connection.cursor() as cursor:
+            names = set(connection.introspection.get_constraints(
+                cursor, AvailableSlot._meta.db_table
+            )) | set(connection.introspection.get_constraints(
+                cursor, Appointment._meta.db_table
+            ))
+        self.assertLessEqual({
+            'slot_doctor_free_start_idx',
+            'appt_doctor_active_start_idx',
+            'appt_patient_active_start_idx',
+        }, names)
+
+    def test_explain_hot_queries_rolls_back(self):
+        out = io.StringIO()
+        call_command('explain_hot_queries', seed=1, doctors=2, stdout=out, stderr=io.StringIO())
+        self.assertIn("Слоты врача за день (SlotsListView)", out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='bench_').exists())
+
+    def test_doctors_must_be_positive(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_hot_queries', '--doctors', '0')
+
+
+class DateAggregationTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.next_day = self.day + timedelta(days=1)
+        self.create_slots(self.at(10), 3)
+        self.create_slots(self.at(9, day=self.next_day), 2)
+        # Второй день занят полностью
+        self.assertEqual(self.book(self.at(9, day=self.next_day)).status_code, 201)
+
+    def doctor_get(self, path, **params):
+        return self.client.get(path, params, HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+
+    def test_slot_dates_count_free_and_booked(self):
+        self.assertEqual(self.doctor_get('/api/slots/dates/').json(), [
+            {"date": str(self.day), "total": 3, "free": 3},
+            {"date": str(self.next_day), "total": 2, "free": 0},
+        ])
+        self.assertEqual(
+            [row["date"] for row in self.doctor_get('/api/slots/dates/', only_free=1).json()],
+            [str(self.day)],
+        )
+        self.assertEqual(
+            [row["date"] for row in self.doctor_get('/api/slots/dates/', **{"from": str(self.next_day)}).json()],
+            [str(self.next_day)],
+        )
+
+    def test_free_dates_without_service_keep_booked_days(self):
+        self.assertEqual(self.free_dates(), [str(self.day), str(self.next_day)])
+        self.assertEqual(self.free_dates(service_id=self.service.id), [str(self.day)])
+
+    def test_appointment_dates(self):
+        self.assertEqual(self.doctor_get('/api/appointments/dates/').json(), [str(self.next_day)])
+        self.assertEqual(
+            self.doctor_get('/api/appointments/dates/', counts=1).json(),
+            [{"date": str(self.next_day), "count": 1}],
+        )
+
+
+class ListingParamsTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.next_day = self.day + timedelta(days=1)
+        self.create_slots(self.at(10), 5)
+        self.create_slots(self.at(10, day=self.next_day), 3)
+
+    def slots(self, **params):
+        return self.client.get(
+            '/api/slots/all/', params, HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id)
+        ).json()
+
+    def test_date_filters(self):
+        self.assertEqual(len(self.slots()), 8)
+        self.assertEqual(len(self.slots(date=str(self.next_day))), 3)
+        self.assertEqual(len(self.slots(date_from=str(self.next_day))), 3)
+        self.assertEqual(len(self.slots(date_to=str(self.day))), 5)
+        response = self.client.get(
+            '/api/slots/all/', {"date": "31.12.2025"},
+            HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id),
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_fields(self):
+        data = self.slots(date=str(self.day), fields="id,start_datetime")
+        self.assertEqual(set(data[0]), {"id", "start_datetime"})
+        self.assertEqual(data[0]["start_datetime"], "%sT10:00:00Z" % self.day)
+
+    def test_cursor_walks_all_slots_once(self):
+        page = self.slots(page_size=3, fields="id")
+        self.assertEqual(set(page), {"next", "previous", "results"})
+
+        ids = []
+        while True:
+            ids.extend(item["id"] for item in page["results"])
+            if not page["next"]:
+                break
+            page = self.client.get(
+                page["next"], HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id)
+            ).json()
+        self.assertEqual(
+            ids, list(AvailableSlot.objects.order_by('start_datetime').values_list('id', flat=True))
+        )
+
+    def test_appointments_filtered_by_date(self):
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        self.assertEqual(self.book(self.at(10, day=self.next_day)).status_code, 201)
+        response = self.client.get(
+            '/api/appointments/', {"date": str(self.next_day), "fields": "id,start_datetime"},
+            HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id),
+        )
+        self.assertEqual(
+            response.json(),
+            [{"id": Appointment.objects.get(start_datetime=self.at(10, day=self.next_day)).id,
+              "start_datetime": "%sT10:00:00Z" % self.next_day}],
+        )
+
+
+class IdentityCacheTests(BookingTestCase):
+
+    def test_repeated_lookup_hits_cache(self):
+        self.assertEqual(identity.resolve_user(1001), self.doctor)
+        with self.assertNumQueries(0):
+            self.assertEqual(identity.resolve_doctor("1001"), self.doctor)
+
+    def test_save_invalidates(self):
+        identity.resolve_user(1001)
+        self.doctor.full_name = "Новое имя"
+        self.doctor.save()
+        self.assertEqual(identity.resolve_user(1001).full_name, "Новое имя")
+
+    def test_changed_telegram_id(self):
+        identity.resolve_user(1001)
+        self.doctor.telegram_id = 2001
+        self.doctor.save()
+        self.assertIsNone(identity.resolve_user(1001))
+        self.assertEqual(identity.resolve_user(2001), self.doctor)
+
+    def test_unknown_id_is_not_cached(self):
+        self.assertIsNone(identity.resolve_user(3001))
+        user = User.objects.create(username='new', telegram_id=3001)
+        self.assertEqual(identity.resolve_user(3001), user)
+
+
+class CatalogCacheTests(BookingTestCase):
+
+    def doctor_names(self):
+        return [d["full_name"] for d in self.client.get('/api/doctors/').json()]
+
+    def test_doctor_list_follows_doctor_changes(self):
+        self.assertEqual(self.doctor_names(), ["Врач"])
+
+        self.doctor.full_name = "Другой врач"
+        self.doctor.save()
+        self.assertEqual(self.doctor_names(), ["Другой врач"])
+
+        self.doctor.is_doctor_approved = False
+        self.doctor.save()
+        self.assertEqual(self.doctor_names(), [])
+
+    def test_patient_changes_keep_doctor_list_cached(self):
+        self.doctor_names()
+        self.patient.phone_number = '2'
+        self.patient.save()
+        with self.assertNumQueries(0):
+            self.doctor_names()
+
+    def test_service_changes_invalidate(self):
+        url = '/api/services/doctor/?doctor_id=%s' % self.doctor.id
+        self.assertEqual(len(self.client.get(url).json()), 1)
+        Service.objects.create(doctor=self.doctor, name="Ещё", duration_minutes=60, price='10.00')
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_etag(self):
+        etag = self.client.get('/api/doctors/')['ETag']
+        response = self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class AvailabilityCacheTests(BookingTestCase):
+
+    def available(self):
+        response = self.client.get('/api/slots/available/', {
+            "doctor_id": self.doctor.id, "service_id": self.service.id,
+        })
+        return [slot["start_datetime"] for slot in response.json()]
+
+    def test_cached_until_slots_change(self):
+        self.create_slots(self.at(10), 4)
+        version = availability_version(self.doctor.id)
+        self.assertEqual(len(self.available()), 3)
+        with self.assertNumQueries(2):
+            # Услуга и версия; сами слоты берутся из кэша
+            self.assertEqual(len(self.available()), 3)
+
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        self.assertGreater(availability_version(self.doctor.id), version)
+        self.assertEqual(self.available(), ["%sT10:30:00Z" % self.day])
+
+    def test_version_row_created_once(self):
+        self.create_slots(self.at(10), 1)
+        self.create_slots(self.at(12), 1)
+        self.assertEqual(AvailabilityVersion.objects.filter(doctor=self.doctor).count(), 1)
+
+
+class DeleteSlotsTests(BookingTestCase):
+
+    def delete(self, slot_ids, query=''):
+        return self.client.delete(
+            '/api/slots/delete/' + query, {"slot_ids": slot_ids}, format='json',
+            HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id),
+        )
+
+    def test_empty_204_by_default(self):
+        self.create_slots(self.at(10), 2)
+        response = self.delete(list(AvailableSlot.objects.values_list('id', flat=True)))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.content, b'')
+        self.assertFalse(AvailableSlot.objects.exists())
+
+    def test_report_counts_only_free_slots(self):
+        self.create_slots(self.at(10), 3)
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        response = self.delete(list(AvailableSlot.objects.values_list('id', flat=True)), '?report=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"deleted": 1})
+        self.assertEqual(AvailableSlot.objects.filter(is_booked=True).count(), 2)
+
+
+class BookingContextTests(BookingTestCase):
+
+    def context(self, **params):
+        params = {"doctor_id": self.doctor.id, **params}
+        return self.client.get('/api/booking/context/', params).json()
+
+    def start_times(self, day=None):
+        data = self.context(service_id=self.service.id, date=str(day or self.day))
+        return [slot["start_datetime"] for slot in data["slots"]]
+
+    def test_slots_only_for_the_requested_day(self):
+        next_day = self.day + timedelta(days=1)
+        self.create_slots(self.at(10), 2)
+        self.create_slots(self.at(12, day=next_day), 3)
+        self.assertEqual(self.start_times(), ["%sT10:00:00Z" % self.day])
+        self.assertEqual(
+            self.start_times(next_day),
+            ["%sT12:00:00Z" % next_day, "%sT12:15:00Z" % next_day],
+        )
+
+    def test_follows_bookings(self):
+        self.create_slots(self.at(10), 2)
+        self.assertEqual(len(self.start_times()), 1)
+        self.assertEqual(self.context()["services"][0]["free_dates"], [str(self.day)])
+
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        self.assertEqual(self.start_times(), [])
+        self.assertEqual(self.context()["services"][0]["free_dates"], [])
+
+
+class AsyncViewsTests(BookingTestCase):
+    """Асинхронные копии отвечают так же, как синхронные эндпоинты."""
+
+    def assert_same(self, path, params):
+        sync = self.client.get('/api/' + path, params)
+        self.assertEqual(sync.status_code, 200)
+        self.assertEqual(sync.json(), self.client.get('/api/async/' + path, params).json())
+
+    def test_same_responses(self):
+        self.create_slots(self.at(10), 4)
+        self.create_slots(self.at(10, day=self.day + timedelta(days=1)), 2)
+        self.assertEqual(self.book(self.at(10, day=self.day + timedelta(days=1))).status_code, 201)
+
+        self.assert_same('doctors/', {})
+        self.assert_same('services/doctor/', {"doctor_id": self.doctor.id})
+        self.assert_same('slots/available/', {"doctor_id": self.doctor.id, "service_id": self.service.id})
+        self.assert_same('slots/free_dates/', {"doctor_id": self.doctor.id, "service_id": self.service.id})
+        # Без услуги — все даты со слотами, включая полностью занятые
+        self.assert_same('slots/free_dates/', {"doctor_id": self.doctor.id})
+
+
+class ListQueryCountTests(BookingTestCase):
+    """Число запросов списков не зависит от числа слотов и записей."""
+
+    N = 4
+    MAX_QUERIES = 5
+
+    def seed(self, count, offset):
+        """count слотов и записей по 5 минут, начиная с 8:00 + offset шагов."""
+        step = timedelta(minutes=5)
+        start = self.at(8) + step * offset
+        AvailableSlot.objects.bulk_create(
+            AvailableSlot(
+                doctor=self.doctor,
+                start_datetime=start + step * n,
+                end_datetime=start + step * (n + 1),
+            )
+            for n in range(count)
+        )
+        Appointment.objects.bulk_create(
+            Appointment(
+                doctor=self.doctor, patient=self.patient, service=self.service,
+                start_datetime=start + step * n, end_datetime=start + step * (n + 1),
+            )
+            for n in range(count)
+        )
+
+    def count_queries(self, request, expected_items):
+        with assert_max_queries(self.MAX_QUERIES) as context:
+            response = request()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        items = data["results"] if isinstance(data, dict) else data
+        self.assertEqual(len(items), expected_items)
+        return len(context)
+
+    def assert_constant_queries(self, request):
+        # Первый запрос прогревает кэш пользователей
+        self.seed(self.N, offset=0)
+        request()
+        small = self.count_queries(request, self.N)
+
+        self.seed(9 * self.N, offset=self.N)
+        large = self.count_queries(request, 10 * self.N)
+        self.assertEqual(small, large)
+
+    def doctor_get(self, path, **params):
+        return lambda: self.client.get(
+            path, params, HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id)
+        )
+
+    def test_doctor_slots(self):
+        self.assert_constant_queries(self.doctor_get('/api/slots/all/'))
+
+    def test_doctor_slots_page(self):
+        self.assert_constant_queries(self.doctor_get('/api/slots/all/', page_size=500))
+
+    def test_slots_by_date(self):
+        self.assert_constant_queries(self.doctor_get('/api/slots/', date=str(self.day)))
+
+    def test_doctor_appointments(self):
+        self.assert_constant_queries(self.doctor_get('/api/appointments/'))
+
+    def test_patient_appointments(self):
+        self.assert_constant_queries(lambda: self.client.post(
+            '/api/appointments/by-patient/',
+            {"telegram_id": self.patient.telegram_id}, format='json',
+        ))
+
+    def test_assert_max_queries_fails_above_limit(self):
+        with self.assertRaises(AssertionError):
+            with assert_max_queries(1):
+                list(User.objects.all())
+                list(Service.objects.all())
+
+
+@override_settings(DEBUG=True)
+class QueryCountMiddlewareTests(BookingTestCase):
+
+    def test_sync_header(self):
+        response = self.client.get('/api/doctors/')
+        self.assertEqual(response['X-Query-Count'], '1')
+        # Второй раз список берётся из кэша
+        self.assertEqual(self.client.get('/api/doctors/')['X-Query-Count'], '0')
+
+    async def test_async_header(self):
+        response = await self.async_client.get(
+            '/api/async/services/doctor/', {"doctor_id": self.doctor.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Query-Count'], '1')
+
+    def test_async_chain_is_not_adapted(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(QueryCountMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(QueryCountMiddleware(lambda request: None)))
+
+    @override_settings(DEBUG=False)
+    def test_no_header_without_debug(self):
+        self.assertNotIn('X-Query-Count', self.client.get('/api/doctors/'))
+
+
+@override_settings(FAST_SERIALIZERS=False)
+class ModelSerializerQueryCountTests(ListQueryCountTests):
+    """То же для ModelSerializer DRF: связанные объекты берутся через select_related."""
+
+
+class FastSerializerTests(BookingTestCase):
+    """Лёгкие сериализаторы дают те же байты, что и ModelSerializer."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_slots(self.at(10), 4)
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        # Пустые строки тоже должны совпасть
+        self.patient.phone_number = ''
+        self.patient.save()
+
+    def assert_same_bytes(self, fast, drf, instance, **kwargs):
+        self.assertEqual(
+            JSONRenderer().render(fast(instance, **kwargs).data),
+            JSONRenderer().render(drf(instance, **kwargs).data),
+        )
+
+    def test_slots(self):
+        slots = AvailableSlot.objects.select_related('doctor').order_by('start_datetime')
+        self.assert_same_bytes(FastSlotSerializer, SlotSerializer, slots, many=True)
+        self.assert_same_bytes(FastSlotSerializer, SlotSerializer, list(slots), many=True)
+        self.assert_same_bytes(FastSlotSerializer, SlotSerializer, slots[0])
+        self.assert_same_bytes(
+            FastSlotSerializer, SlotSerializer, slots, many=True,
+            fields=['start_datetime', 'id'],
+        )
+
+    def test_appointments(self):
+        appointments = Appointment.objects.select_related('doctor', 'patient', 'service')
+        self.assert_same_bytes(FastAppointmentSerializer, AppointmentSerializer, appointments, many=True)
+        self.assert_same_bytes(
+            FastAppointmentSerializer, AppointmentSerializer, list(appointments), many=True
+        )
+        self.assert_same_bytes(FastAppointmentSerializer, AppointmentSerializer, appointments[0])
+        self.assert_same_bytes(
+            FastAppointmentSerializer, AppointmentSerializer, appointments, many=True,
+            fields=['id', 'service', 'start_datetime'],
+        )
+
+    def test_fields_limit_columns(self):
+        serializer = FastAppointmentSerializer(
+            Appointment.objects.all(), many=True, fields=['id', 'doctor']
+        )
+        self.assertEqual(serializer.columns, ['id', 'doctor__id', 'doctor__full_name', 'doctor__telegram_id'])
+
+    def test_views_match_model_serializer(self):
+        for path in ('/api/slots/all/', '/api/appointments/'):
+            fast = self.client.get(path, HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+            with self.settings(FAST_SERIALIZERS=False):
+                drf = self.client.get(path, HTTP_X_TELEGRAM_ID=str(self.doctor.telegram_id))
+            self.assertEqual(fast.content, drf.content)
+
+
+@skipUnless(find_spec('orjson'), "нужен пакет orjson")
+class ORJSONTests(BookingTestCase):
+    """Рендерер и парсер на orjson совпадают с JSONRenderer/JSONParser DRF."""
+
+    def assert_same_bytes(self, data, media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type),
+        )
+
+    def test_values(self):
+        moscow = dt_timezone(timedelta(hours=3))
+        self.assert_same_bytes({
+            "utc": datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            "moscow": datetime(2025, 1, 2, 3, 4, 5, tzinfo=moscow),
+            "naive": datetime(2025, 1, 2, 3, 4, 5, 120000),
+            "date": self.day,
+            "time": time(3, 4, 5, 123456),
+            "price": Decimal('10.50'),
+            "duration": timedelta(minutes=30),
+            "uuid": uuid.UUID(int=1),
+            "text": 'Врач "Иванов" </script> \u2028 \u2029',
+            "big": 2 ** 70,
+            "nested": {1: [None, True, 1.5]},
+        })
+
+    def test_indent_falls_back(self):
+        self.assert_same_bytes({"a": [1, 2]}, 'application/json; indent=4')
+
+    def test_api_payloads(self):
+        self.create_slots(self.at(10), 4)
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        appointments = Appointment.objects.select_related('doctor', 'patient', 'service')
+        slots = AvailableSlot.objects.select_related('doctor')
+        self.assert_same_bytes(AppointmentSerializer(appointments, many=True).data)
+        self.assert_same_bytes(SlotSerializer(slots, many=True).data)
+
+    def test_parser(self):
+        body = '{"имя":"Врач","ids":[1,2],"x":1.5}'.encode()
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"x": NaN}'))
+
+
+class CompactFormatTests(BookingTestCase):
+
+    def test_wants_compact(self):
+        self.assertTrue(wants_compact({"compact": "1"}))
+        self.assertTrue(wants_compact({"compact": "true"}))
+        self.assertFalse(wants_compact({"compact": "0"}))
+        self.assertTrue(wants_compact({}, 'text/html, application/json; availability=compact'))
+        self.assertFalse(wants_compact({}, 'application/json; indent=4'))
+        self.assertFalse(wants_compact({}))
+
+    def test_compact_availability(self):
+        next_day = self.day + timedelta(days=1)
+        slots = [
+            (self.at(9), {"id": 17}),
+            (self.at(9, 15), {"id": 18}),
+            (self.at(23, 45, day=next_day), {"id": 30}),
+        ]
+        self.assertEqual(compact_availability(slots), {
+            "timezone": "UTC",
+            "dates": {
+                str(self.day): {"minutes": [540, 555], "ids": [17, 18]},
+                str(next_day): {"minutes": [1425], "ids": [30]},
+            },
+        })
+
+    def test_views(self):
+        self.create_slots(self.at(10), 3)
+        ids = list(AvailableSlot.objects.order_by('start_datetime').values_list('id', flat=True))
+        expected = {
+            "timezone": "UTC",
+            "dates": {str(self.day): {"minutes": [600, 615], "ids": ids[:2]}},
+        }
+        params = {"doctor_id": self.doctor.id, "service_id": self.service.id}
+
+        for path in ('/api/slots/available/', '/api/async/slots/available/'):
+            self.assertEqual(self.client.get(path, {**params, "compact": 1}).json(), expected)
+            self.assertEqual(
+                self.client.get(
+                    path, params, HTTP_ACCEPT='application/json; availability=compact'
+                ).json(),
+                expected,
+            )
+            self.assertEqual(len(self.client.get(path, params).json()), 2)
+
+        context = self.client.get(
+            '/api/booking/context/', {**params, "date": str(self.day), "compact": 1}
+        ).json()
+        self.assertEqual(context["slots"], expected)
+
+
+@override_settings(AVAILABILITY_EVENTS={
+    'RETENTION_HOURS': 48, 'POLL_TIMEOUT': 1, 'POLL_INTERVAL': 0.02,
+    'OVERLAP_SECONDS': 30, 'LIMIT': 1000,
+})
+class AvailabilityFeedTests(BookingTestCase):
+
+    def feed(self, **params):
+        response = self.client.get('/api/async/availability/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_resume_by_last_id(self):
+        start = self.feed()
+        self.assertEqual(start["events"], [])
+
+        self.create_slots(self.at(10), 2)
+        data = self.feed(since=start["last_id"], timeout=0)
+        self.assertGreater(data["last_id"], start["last_id"])
+        self.assertEqual(
+            [(doctor, day) for _, doctor, day in data["events"]],
+            [(self.doctor.id, str(self.day))],
+        )
+
+        self.assertEqual(self.book(self.at(10)).status_code, 201)
+        resumed = self.feed(since=data["last_id"], timeout=0)
+        new = [event for event in resumed["events"] if event[0] > data["last_id"]]
+        self.assertEqual(len(new), 1)
+        self.assertEqual(resumed["last_id"], new[0][0])
+        # Уже отданные недавние события повторяются для перечитывания
+        self.assertEqual(resumed["events"][0], data["events"][0])
+
+        idle = self.feed(since=resumed["last_id"], timeout=0)
+        self.assertEqual(idle["last_id"], resumed["last_id"])
+        self.assertTrue(all(event[0] <= resumed["last_id"] for event in idle["events"]))
+
+    def test_late_event_is_not_skipped(self):
+        AvailabilityEvent.objects.create(id=10, doctor=self.doctor, date=self.day)
+        AvailabilityEvent.objects.create(id=12, doctor=self.doctor, date=self.day)
+        seen = self.feed(since=9, timeout=0)
+        self.assertEqual(seen["last_id"], 12)
+
+        # Транзакция взяла id 11 раньше, а зафиксировалась после ответа
+        AvailabilityEvent.objects.create(id=11, doctor=self.doctor, date=self.day)
+        # Старое событие вне окна перечитывания не повторяется
+        AvailabilityEvent.objects.filter(id=10).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+        resumed = self.feed(since=seen["last_id"], timeout=0)
+        self.assertEqual([event[0] for event in resumed["events"]], [11, 12])
+        self.assertEqual(resumed["last_id"], 12)
+
+    def test_doctor_filter(self):
+        other = User.objects.create(username='other', telegram_id=1003, is_doctor=True)
+        AvailabilityEvent.objects.create(doctor=other, date=self.day)
+        data = self.feed(since=0, doctor_id=self.doctor.id, timeout=0)
+        self.assertEqual(data, {"last_id": 0, "events": []})
+
+    async def test_waiters_share_one_poller(self):
+        await sync_to_async(AvailabilityEvent.objects.create)(doctor=self.doctor, date=self.day)
+        since = await AvailabilityEvent.objects.values_list('id', flat=True).alast()
+
+        with mock.patch(
+            'booking.availability_events.alast_event_id', wraps=alast_event_id
+        ) as spy:
+            waiters = [asyncio.create_task(await_changes(since, timeout=1)) for _ in range(10)]
+            await asyncio.sleep(0.1)
+            await sync_to_async(AvailabilityEvent.objects.create)(
+                doctor=self.doctor, date=self.day + timedelta(days=1)
+            )
+            results = await asyncio.gather(*waiters)
+
+        for last_id, events in results:
+            self.assertEqual(last_id, since + 1)
+            self.assertEqual(events[-1][1:], [self.doctor.id, str(self.day + timedelta(days=1))])
+        # Десять ожидающих, но база опрашивается одним циклом раз в POLL_INTERVAL
+        self.assertLess(spy.call_count, 15)
+        self.assertIs(event_poller(), event_poller())
+
+    async def test_poller_times_out(self):
+        poller = EventPoller()
+        self.assertFalse(await poller.wait_newer(10 ** 9, 0.05))
+        self.assertEqual(poller.waiters, 0)
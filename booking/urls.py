@@ -31,9 +31,27 @@ urlpatterns = [
         views.DeleteSlotsView.as_view(),
         name='delete-slots'
     ),
+    path(
+        'slots/generate/',
+        views.GenerateSlotsView.as_view(),
+        name='generate-slots'
+    ),
     path("slots/all/", DoctorSlotsView.as_view(), name="doctor-all-slots"),
     path("slots/free_dates/", SlotFreeDatesView.as_view(), name="slots-free-dates"),
+    path("slots/dates/", views.SlotDatesView.as_view(), name="slots-dates"),
+    path("booking/context/", views.BookingContextView.as_view(), name="booking-context"),
 
+    # Шаблоны смен
+    path(
+        'schedule-templates/',
+        views.ScheduleTemplateListView.as_view(),
+        name='schedule-templates'
+    ),
+    path(
+        'schedule-templates/<int:pk>/expand/',
+        views.ScheduleTemplateExpandView.as_view(),
+        name='schedule-template-expand'
+    ),
 
     # Записи
     path(
@@ -1,16 +1,28 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import generics, status
+from rest_framework import generics, serializers, status
 from rest_framework.permissions import AllowAny
+from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from datetime import timedelta, datetime, date
-from collections import defaultdict
+from datetime import datetime, date, timedelta
 from booking.permissions import IsTelegramDoctor
 from rest_framework.generics import RetrieveAPIView
 import logging
 
-from .models import Service, AvailableSlot, Appointment
+from .aggregates import appointment_date_counts, slot_date_counts
+from .availability_cache import availability_version
+from .availability_format import compact_availability, wants_compact
+from .availability_queries import free_dates, start_slots
+from .day_summary import day_range
+from .fast_serializers import appointment_serializer, slot_serializer
+from .identity import resolve_doctor, resolve_user
+from .listing import filter_by_dates, list_response
+from .models import Service, AvailableSlot, Appointment, ScheduleTemplate
+from .response_cache import CachedJSONResponseMixin
+from .schedule_templates import expand_template, shift_intervals
+from .slot_changes import slots_changed
+from .slots import bulk_create_slots
 from .serializers import (
     ServiceSerializer,
     SlotSerializer,
@@ -18,30 +30,40 @@ from .serializers import (
     AppointmentCreateSerializer,
     AppointmentCancelSerializer,
     DoctorShortSerializer, TelegramAuthSerializer,
+    ScheduleTemplateSerializer,
+    ShiftSerializer,
 )
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-class DoctorListView(APIView):
+class DoctorListView(CachedJSONResponseMixin, APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
+        return self.cached_response(request, self.build_data)
+
+    def build_data(self):
         doctors = User.objects.filter(is_doctor=True, is_doctor_approved=True)
         serializer = DoctorShortSerializer(doctors, many=True)
         logger.info(f"Возвращено {len(doctors)} докторов")
-        return Response(serializer.data)
+        return serializer.data
 
 
-class ServiceListView(generics.ListAPIView):
+class ServiceListView(CachedJSONResponseMixin, generics.ListAPIView):
     """Список всех услуг"""
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
     permission_classes = [IsTelegramDoctor]
 
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, lambda: super(ServiceListView, self).list(request).data
+        )
+
 
-class DoctorServicesView(APIView):
+class DoctorServicesView(CachedJSONResponseMixin, APIView):
     """Получение списка услуг конкретного доктора по его ID."""
     permission_classes = [AllowAny] # ПОЗЖЕ ПОПРАВИТЬ
 
@@ -50,13 +72,16 @@ class DoctorServicesView(APIView):
         if not doctor_id:
             return Response({"error": "doctor_id is requiered"}, status=400)
 
-        services = Service.objects.filter(doctor_id=doctor_id)
-        serializer = ServiceSerializer(services, many=True)
-        return Response(serializer.data)
+        return self.cached_response(
+            request,
+            lambda: ServiceSerializer(
+                Service.objects.filter(doctor_id=doctor_id), many=True
+            ).data
+        )
 
 
 class AvailableSlotsView(APIView):
-    """Получение свободных слотов для услуги (учитывая длительность)"""
+    """Получение свободных слотов для услуги (учитывая длительность); ?compact=1 — компактный формат"""
     permission_classes = [AllowAny]
 
     def get(self, request):
@@ -73,38 +98,10 @@ class AvailableSlotsView(APIView):
         except Service.DoesNotExist:
             return Response({"error": "Услуга не найдена"}, status=404)
 
-        duration = timedelta(minutes=service.duration_minutes)
-        now = timezone.now()
-
-        all_slots = AvailableSlot.objects.filter(
-            doctor_id=doctor_id,
-            is_booked=False,
-            start_datetime__gte=now
-        ).order_by('start_datetime')
-
-        # Группируем слоты по дате
-        slots_by_day = defaultdict(list)
-        for slot in all_slots:
-            date = slot.start_datetime.date()
-            slots_by_day[date].append(slot)
-
-        result = []
-        for day, slots in slots_by_day.items():
-            i = 0
-            while i <= len(slots) - 1:
-                start_slot = slots[i]
-                end_time = start_slot.start_datetime + duration
-                combined = [start_slot]
-                j = i + 1
-                while j < len(slots) and slots[j].start_datetime == combined[-1].end_datetime:
-                    combined.append(slots[j])
-                    if combined[-1].end_datetime == end_time:
-                        result.append(SlotSerializer(start_slot).data)
-                        break
-                    j += 1
-                i += 1
-
-        return Response(result)
+        slots = start_slots(doctor_id, service.duration_minutes)
+        if wants_compact(request.query_params, request.headers.get('Accept', '')):
+            return Response(compact_availability(slots))
+        return Response([data for _, data in slots])
 
 
 class AppointmentCreateView(APIView):
@@ -130,9 +127,8 @@ class AppointmentCancelView(APIView):
         if not telegram_id:
             return Response({"error": "Отсутствует Telegram ID"}, status=400)
 
-        try:
-            user = User.objects.get(telegram_id=telegram_id)
-        except User.DoesNotExist:
+        user = resolve_user(telegram_id)
+        if user is None:
             return Response({"error": "Пользователь не найден"}, status=404)
 
         serializer = AppointmentCancelSerializer(
@@ -162,23 +158,25 @@ class SlotsListView(APIView):
         except ValueError:
             return Response({"error": "Неверный формат даты"}, status=400)
 
+        day_begin, day_end = day_range(date_obj)
         slots = AvailableSlot.objects.filter(
             doctor=request.user,
-            start_datetime__date=date_obj,
+            start_datetime__gte=day_begin,
+            start_datetime__lt=day_end,
             # is_booked=False
-        ).order_by("start_datetime")
+        ).select_related("doctor").order_by("start_datetime")
 
-        return Response(SlotSerializer(slots, many=True).data)
+        return Response(slot_serializer()(slots, many=True).data)
 
 
 class SlotDetailAPIView(RetrieveAPIView):
-    queryset = AvailableSlot.objects.all()
+    queryset = AvailableSlot.objects.select_related('doctor')
     serializer_class = SlotSerializer
     permission_classes = [AllowAny]
 
 
 class CreateSlotsView(APIView):
-    """Создание слотов на основе переданных start/end_datetime"""
+    """Создание слотов на основе переданных start/end_datetime (пачкой); ?report=1 — итог по каждому слоту"""
     permission_classes = [IsTelegramDoctor]
 
     def post(self, request):
@@ -189,37 +187,112 @@ class CreateSlotsView(APIView):
         if not slots or not isinstance(slots, list):
             return Response({"error": "Ожидался список слотов"}, status=400)
 
-        created = []
+        intervals = []
         for slot_data in slots:
             try:
                 start = datetime.fromisoformat(slot_data["start_datetime"])
                 end = datetime.fromisoformat(slot_data["end_datetime"])
-            except (KeyError, ValueError):
+            except (KeyError, TypeError, ValueError):
                 return Response({"error": "Неверный формат времени в слоте"}, status=400)
+            intervals.append((start, end))
 
-            if start >= end:
-                continue  # Пропускаем некорректные интервалы
-
-            conflict = AvailableSlot.objects.filter(
-                doctor=request.user,
-                start_datetime__lt=end,
-                end_datetime__gt=start
-            ).exists()
-
-            if not conflict:
-                slot = AvailableSlot.objects.create(
-                    doctor=request.user,
-                    start_datetime=start,
-                    end_datetime=end,
-                    is_booked=False
-                )
-                created.append(slot)
+        # Конфликты ищутся одним запросом на всю пачку, вставка — bulk_create
+        results = bulk_create_slots(request.user, intervals)
+
+        created = [r for r in results if r["status"] == "created"]
+        if not request.query_params.get("report"):
+            # Прежний ответ для существующих клиентов: список созданных слотов
+            return Response(
+                SlotSerializer([r["slot"] for r in created], many=True).data, status=201
+            )
 
-        return Response(SlotSerializer(created, many=True).data, status=201)
+        # ?report=1 — счётчики и результат по каждому слоту в порядке запроса;
+        # время в том же формате, что и в SlotSerializer
+        to_representation = serializers.DateTimeField().to_representation
+        return Response({
+            "created": len(created),
+            "skipped": len(results) - len(created),
+            "results": [
+                {
+                    "id": r["slot"].id if r["status"] == "created" else None,
+                    "start_datetime": to_representation(r["start_datetime"]),
+                    "end_datetime": to_representation(r["end_datetime"]),
+                    "status": r["status"],
+                    "reason": r.get("reason"),
+                }
+                for r in results
+            ],
+        }, status=201)
+
+
+class GenerateSlotsView(APIView):
+    """Создание слотов по разовой смене (нарезка на стороне сервера)"""
+    permission_classes = [IsTelegramDoctor]
+
+    def post(self, request):
+        serializer = ShiftSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+
+        shift = serializer.validated_data
+        results = bulk_create_slots(request.user, shift_intervals(
+            shift['date'], shift['start_time'], shift['end_time'], shift['slot_minutes']
+        ))
+        created = sum(1 for r in results if r["status"] == "created")
+        return Response(
+            {"created": created, "skipped": len(results) - created},
+            status=201
+        )
+
+
+class ScheduleTemplateListView(APIView):
+    """Список и создание шаблонов смен врача"""
+    permission_classes = [IsTelegramDoctor]
+
+    def get(self, request):
+        templates = ScheduleTemplate.objects.filter(doctor=request.user)
+        return Response(ScheduleTemplateSerializer(templates, many=True).data)
+
+    def post(self, request):
+        serializer = ScheduleTemplateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        template = serializer.save(doctor=request.user)
+        return Response(ScheduleTemplateSerializer(template).data, status=201)
+
+
+class ScheduleTemplateExpandView(APIView):
+    """Генерация слотов по шаблону до указанной даты"""
+    permission_classes = [IsTelegramDoctor]
+
+    def post(self, request, pk):
+        try:
+            template = ScheduleTemplate.objects.get(pk=pk, doctor=request.user)
+        except ScheduleTemplate.DoesNotExist:
+            return Response({"error": "Шаблон не найден"}, status=404)
+
+        until = request.data.get("until")
+        if until:
+            try:
+                until = date.fromisoformat(until)
+            except (TypeError, ValueError):
+                return Response({"error": "Неверный формат даты"}, status=400)
+        else:
+            until = timezone.localdate() + timedelta(
+                days=settings.SCHEDULE_TEMPLATE_HORIZON_DAYS
+            )
+
+        results = expand_template(template, until)
+        created = sum(1 for r in results if r["status"] == "created")
+        return Response({
+            "created": created,
+            "skipped": len(results) - created,
+            "expanded_until": template.expanded_until,
+        })
 
 
 class DoctorAppointmentsView(APIView):
-    """Получение всех записей врача"""
+    """Получение записей врача (фильтр по датам, пагинация, выбор полей)"""
     permission_classes = [IsTelegramDoctor]
 
     def get(self, request):
@@ -229,9 +302,12 @@ class DoctorAppointmentsView(APIView):
         appointments = Appointment.objects.filter(
             doctor=request.user,
             status='active'
-        ).order_by('start_datetime')
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        ).select_related('doctor', 'patient', 'service').order_by('start_datetime')
+        try:
+            appointments = filter_by_dates(appointments, request.query_params)
+        except ValueError:
+            return Response({"error": "Неверный формат даты"}, status=400)
+        return list_response(request, self, appointments, appointment_serializer())
 
 
 class AppointmentDatesView(APIView):
@@ -242,13 +318,39 @@ class AppointmentDatesView(APIView):
         if not request.user.is_doctor:
             return Response({"error": "Доступ запрещён"}, status=403)
 
-        dates = (
-            Appointment.objects
-            .filter(doctor=request.user, status='active')
-            .values_list('start_datetime__date', flat=True)
-            .distinct()
+        counts = appointment_date_counts(request.user.id)
+        if request.query_params.get("counts"):
+            return Response([
+                {"date": str(row["date"]), "count": row["count"]}
+                for row in counts
+            ])
+        return Response([str(row["date"]) for row in counts])
+
+
+class SlotDatesView(APIView):
+    """Даты слотов врача с количеством слотов на каждую дату"""
+    permission_classes = [IsTelegramDoctor]
+
+    def get(self, request):
+        if not request.user.is_doctor:
+            return Response({"error": "Доступ запрещён"}, status=403)
+
+        since = request.query_params.get("from")
+        if since:
+            try:
+                since = date.fromisoformat(since)
+            except ValueError:
+                return Response({"error": "Неверный формат даты"}, status=400)
+
+        counts = slot_date_counts(
+            request.user.id,
+            since=since,
+            only_free=bool(request.query_params.get("only_free")),
         )
-        return Response(sorted(set(str(date) for date in dates)))
+        return Response([
+            {"date": str(row["date"]), "total": row["total"], "free": row["free"]}
+            for row in counts
+        ])
 
 
 class SlotFreeDatesView(APIView):
@@ -264,54 +366,85 @@ class SlotFreeDatesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        slots = AvailableSlot.objects.filter(
-            doctor_id=doctor_id,
-            start_datetime__date__gte=date.today(),
-            # is_booked=False
-        ).order_by("start_datetime")
-
         if not service_id:
             # Просто вернуть уникальные даты, где есть хотя бы один слот
-            dates = sorted(
-                set(slot.start_datetime.date() for slot in slots))
+            # (и занятый тоже). Сводки хранят только дни со свободными
+            # слотами, поэтому здесь они не годятся
+            counts = slot_date_counts(doctor_id, since=timezone.localdate())
+            dates = [row["date"] for row in counts]
             return Response({"dates": [str(d) for d in dates]})
 
         # Ниже — логика для пациента (фильтрация по длительности услуги)
         try:
             service = Service.objects.get(pk=service_id)
-            duration = service.duration
         except Service.DoesNotExist:
             return Response(
                 {"error": "Service not found."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Группировка по дате
-        grouped = {}
-        for slot in slots:
-            slot_date = slot.start_datetime.date()
-            grouped.setdefault(slot_date, []).append(slot)
-
-        valid_dates = []
-        needed = duration // 15
-        for slot_date, slot_list in grouped.items():
-            slot_list = sorted(slot_list, key=lambda s: s.start_datetime)
-            for i in range(len(slot_list) - needed + 1):
-                chunk = slot_list[i:i + needed]
-                ok = all(
-                    (chunk[j + 1].start_datetime - chunk[
-                        j].start_datetime).total_seconds() == 15 * 60
-                    for j in range(len(chunk) - 1)
-                )
-                if ok:
-                    valid_dates.append(str(slot_date))
-                    break
+        valid_dates = free_dates(doctor_id, service.duration_minutes)
+        return Response({"dates": [str(d) for d in valid_dates]})
 
-        return Response({"dates": sorted(valid_dates)})
+
+class BookingContextView(APIView):
+    """
+    Всё для экранов записи одним запросом: услуги врача со свободными
+    датами под длительность каждой и, если переданы service_id и date,
+    стартовые слоты на эту дату (с ?compact=1 — в компактном формате
+    booking.availability_format).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        doctor_id = request.query_params.get("doctor_id")
+        service_id = request.query_params.get("service_id")
+        date_str = request.query_params.get("date")
+
+        if not doctor_id:
+            return Response({"error": "doctor_id обязателен"}, status=400)
+        try:
+            doctor_id = int(doctor_id)
+            service_id = int(service_id) if service_id else None
+            selected_date = date.fromisoformat(date_str) if date_str else None
+        except ValueError:
+            return Response({"error": "Неверный формат параметров"}, status=400)
+
+        services = list(Service.objects.filter(doctor_id=doctor_id))
+        selected = next((s for s in services if s.id == service_id), None)
+        if service_id and selected is None:
+            return Response({"error": "Услуга не найдена"}, status=404)
+
+        version = availability_version(doctor_id)
+        dates_by_duration = {
+            minutes: [str(d) for d in free_dates(doctor_id, minutes, version)]
+            for minutes in {s.duration_minutes for s in services}
+        }
+        data = {
+            "doctor_id": doctor_id,
+            "services": [
+                {**item, "free_dates": dates_by_duration[service.duration_minutes]}
+                for service, item in zip(
+                    services, ServiceSerializer(services, many=True).data
+                )
+            ],
+        }
+
+        if selected and selected_date:
+            data["service_id"] = selected.id
+            data["date"] = str(selected_date)
+            slots = start_slots(
+                doctor_id, selected.duration_minutes, version, selected_date
+            )
+            if wants_compact(request.query_params, request.headers.get('Accept', '')):
+                data["slots"] = compact_availability(slots)
+            else:
+                data["slots"] = [item for _, item in slots]
+        return Response(data)
 
 
 class DoctorSlotsView(APIView):
-    """Получение всех слотов врача"""
+    """Получение свободных слотов врача (фильтр по датам, пагинация, выбор полей)"""
     permission_classes = [IsTelegramDoctor]
 
     def get(self, request):
@@ -321,12 +454,16 @@ class DoctorSlotsView(APIView):
         slots = AvailableSlot.objects.filter(
             doctor=request.user,
             is_booked=False
-        ).order_by('start_datetime')
-        serializer = SlotSerializer(slots, many=True)
-        return Response(serializer.data)
+        ).select_related('doctor').order_by('start_datetime')
+        try:
+            slots = filter_by_dates(slots, request.query_params)
+        except ValueError:
+            return Response({"error": "Неверный формат даты"}, status=400)
+        return list_response(request, self, slots, slot_serializer())
 
 
 class DeleteSlotsView(APIView):
+    """Удаление свободных слотов врача; ?report=1 — ответ 200 с числом удалённых"""
     permission_classes = [IsTelegramDoctor]
 
     def delete(self, request):
@@ -336,10 +473,14 @@ class DeleteSlotsView(APIView):
 
         # Удаляем только слоты, которые принадлежат текущему врачу и ещё не заняты
         slots = AvailableSlot.objects.filter(id__in=slot_ids, doctor=request.user, is_booked=False)
-        deleted_count = slots.count()
+        starts = list(slots.values_list('start_datetime', flat=True))
         slots.delete()
+        slots_changed(request.user.id, starts)
 
-        return Response({"deleted": deleted_count}, status=204)
+        if request.query_params.get("report"):
+            return Response({"deleted": len(starts)})
+        # Ответ 204 не может иметь тела: иначе ломается keep-alive соединение клиента
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class PatientAppointmentsView(APIView):
@@ -351,14 +492,16 @@ class PatientAppointmentsView(APIView):
         if not telegram_id:
             return Response({"error": "Telegram ID обязателен"}, status=400)
 
-        try:
-            user = User.objects.get(telegram_id=telegram_id)
-        except User.DoesNotExist:
+        user = resolve_user(telegram_id)
+        if user is None:
             return Response({"error": "Пользователь не найден"}, status=404)
 
-        appointments = Appointment.objects.filter(patient=user, status="active").select_related("doctor", "service")
-        serializer = AppointmentSerializer(appointments, many=True)
-        return Response(serializer.data)
+        appointments = Appointment.objects.filter(patient=user, status="active").select_related("doctor", "patient", "service")
+        try:
+            appointments = filter_by_dates(appointments, request.query_params)
+        except ValueError:
+            return Response({"error": "Неверный формат даты"}, status=400)
+        return list_response(request, self, appointments, appointment_serializer())
 
 
 class TelegrammAuthView(APIView):
@@ -373,7 +516,7 @@ class TelegrammAuthView(APIView):
 
 class CheckUserExistsView(APIView):
     def get(self, request, telegram_id):
-        exists = User.objects.filter(telegram_id=telegram_id).exists()
+        exists = resolve_user(telegram_id) is not None
         return Response(
             {"exists": exists},
             status=status.HTTP_200_OK if exists else status.HTTP_404_NOT_FOUND
@@ -382,7 +525,7 @@ class CheckUserExistsView(APIView):
 
 class CheckIsDoctorView(APIView):
     def get(self, request, telegram_id):
-        is_doctor = User.objects.filter(telegram_id=telegram_id, is_doctor=True).exists()
+        is_doctor = resolve_doctor(telegram_id) is not None
         return Response(
             {"is_doctor": is_doctor},
             status=status.HTTP_200_OK if is_doctor else status.HTTP_404_NOT_FOUND
@@ -396,9 +539,8 @@ class DoctorByTelegramIDAPIView(APIView):
         if not telegram_id:
             return Response({"detail": "Missing X-Telegram-ID header."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            doctor = User.objects.get(telegram_id=telegram_id, is_doctor=True)
-        except User.DoesNotExist:
+        doctor = resolve_doctor(telegram_id)
+        if doctor is None:
             return Response({"detail": "Doctor not found."}, status=status.HTTP_404_NOT_FOUND)
 
         return Response(DoctorShortSerializer(doctor).data)
\ No newline at end of file
@@ -1,39 +1,83 @@
-import os
-from importlib.metadata import requires
-import aiohttp
+from patient_bot.utils.api import API_BASE_URL, ApiClient, ApiError
+from doctor_bot.logger import logger
 
-from dotenv import load_dotenv
 
-from .utils import generate_slots
+class DoctorApiClient(ApiClient):
+    """
+    Клиент API бота врача.
 
-load_dotenv()
+    Пул соединений, таймауты и повторы — общие с ботом пациента;
+    здесь только запросы врача. GET-методы возвращают None при ошибке.
+    """
 
-API_URL = os.getenv("API_BASE_URL")
-DOCTOR_TOKEN = os.getenv("DOCTOR_JWT_ACCESS")
+    async def _get_or_none(self, name: str, telegram_id: int, path: str, **kwargs):
+        try:
+            return await self._json("GET", path, telegram_id=telegram_id, **kwargs)
+        except ApiError as e:
+            logger.error(f"[{name}] Doctor {telegram_id}: {e}")
+            return None
 
-def get_auth_headers():
-    return {"Authorization": f"Bearer {DOCTOR_TOKEN}"}
+    async def check_doctor(self, telegram_id: int) -> bool:
+        status, _ = await self.request("GET", f"/users/doctor_check/{telegram_id}/")
+        return status == 200
 
-def create_slots(date_str, start_time_str, end_time_str):
-    slots = generate_slots(date_str, start_time_str, end_time_str)
-    data = {"slots": slots}
+    async def get_doctor(self, telegram_id: int):
+        return await self._get_or_none("get_doctor", telegram_id, "/doctors/by_telegram/")
 
-    response = requires.post(
-        f"{API_URL}/slots/create",
-        json=data,
-        headers=get_auth_headers(),
-    )
-    return response.status_code == 201
+    async def generate_slots(self, telegram_id: int, date: str, start_time: str, end_time: str):
+        """Нарезка смены на слоты на сервере; возвращает (статус, JSON)."""
+        return await self.request(
+            "POST", "/slots/generate/",
+            telegram_id=telegram_id,
+            json={"date": date, "start_time": start_time, "end_time": end_time},
+        )
 
-async def get_doctor_slots(token: str, only_free: bool = False):
-    url = f'{API_URL}/slots'
-    params = {}
-    if only_free:
-        params["is_booked"] = "False"
+    async def get_doctor_free_dates(self, telegram_id: int, doctor_id: int):
+        data = await self._get_or_none(
+            "get_doctor_free_dates", telegram_id, "/slots/free_dates/",
+            params={"doctor_id": doctor_id}
+        )
+        return None if data is None else data.get("dates", [])
 
-    headers = {"Authorization": f"Bearer {token}"}
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url, headers=headers, params=params) as response:
-            if response.status == 200:
-                return await response.json()
-        return []
+    async def get_slots(self, telegram_id: int, date: str):
+        return await self._get_or_none(
+            "get_slots", telegram_id, "/slots/", params={"date": date}
+        )
+
+    async def get_slot_dates(self, telegram_id: int, only_free: bool = False):
+        params = {"only_free": 1} if only_free else {}
+        return await self._get_or_none(
+            "get_slot_dates", telegram_id, "/slots/dates/", params=params
+        )
+
+    async def get_doctor_slots(self, telegram_id: int, date: str, fields: str = None):
+        params = {"date": date}
+        if fields:
+            params["fields"] = fields
+        return await self._get_or_none(
+            "get_doctor_slots", telegram_id, "/slots/all/", params=params
+        )
+
+    async def delete_slots(self, telegram_id: int, slot_ids: list) -> bool:
+        try:
+            status, _ = await self.request(
+                "DELETE", "/slots/delete/",
+                telegram_id=telegram_id, json={"slot_ids": slot_ids}
+            )
+            return status == 204
+        except ApiError as e:
+            logger.error(f"[delete_slots] Doctor {telegram_id}: {e}")
+            return False
+
+    async def get_appointment_dates(self, telegram_id: int):
+        return await self._get_or_none(
+            "get_appointment_dates", telegram_id, "/appointments/dates/"
+        )
+
+    async def get_appointments(self, telegram_id: int, date: str, fields: str = None):
+        params = {"date": date}
+        if fields:
+            params["fields"] = fields
+        return await self._get_or_none(
+            "get_appointments", telegram_id, "/appointments/", params=params
+        )
@@ -2,9 +2,9 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from datetime import datetime, timedelta
-import requests
+from datetime import datetime
 
+from doctor_bot.api import DoctorApiClient
 from doctor_bot.keyboards.main import main_menu_keyboard, back_to_menu_button
 
 router = Router()
@@ -50,7 +50,7 @@ async def receive_start_time(message: Message, state: FSMContext):
 
 
 @router.message(CreateSlotStates.waiting_for_end_time)
-async def receive_end_time(message: Message, state: FSMContext):
+async def receive_end_time(message: Message, state: FSMContext, api: DoctorApiClient):
     # Сначала только парсинг времени
     try:
         time_end = datetime.strptime(message.text.strip(), "%H:%M").time()
@@ -69,36 +69,26 @@ async def receive_end_time(message: Message, state: FSMContext):
         await message.answer("❗ Время окончания должно быть позже времени начала.", reply_markup=back_to_menu_button())
         return
 
-    # Формируем слоты по 15 минут
-    slots = []
-    current = start_dt
-    while current + timedelta(minutes=15) <= end_dt:
-        slots.append({
-            "start_datetime": current.isoformat(),
-            "end_datetime": (current + timedelta(minutes=15)).isoformat()
-        })
-        current += timedelta(minutes=15)
-
-    if not slots:
-        await message.answer("❗ Нет доступных слотов в этом диапазоне.", reply_markup=back_to_menu_button())
-        return
-
-    # Отправка POST-запроса на API
-    headers = {"X-Telegram-ID": str(message.from_user.id)}
+    # Нарезка смены на слоты выполняется на сервере
     try:
-        response = requests.post(
-            "http://127.0.0.1:8000/api/slots/create/",
-            json={"slots": slots},
-            headers=headers
+        status, result = await api.generate_slots(
+            message.from_user.id,
+            date=data["date"],
+            start_time=data["start_time"],
+            end_time=time_end.strftime("%H:%M"),
         )
     except Exception as e:
         await message.answer(f"❌ Ошибка при отправке запроса: {e}", reply_markup=main_menu_keyboard())
         await state.clear()
         return
 
-    if response.status_code == 201:
-        await message.answer("✅ Слоты успешно созданы!", reply_markup=main_menu_keyboard())
+    if status == 201:
+        created = result.get("created", 0)
+        if created:
+            await message.answer(f"✅ Слоты успешно созданы: {created}", reply_markup=main_menu_keyboard())
+        else:
+            await message.answer("❗ Нет доступных слотов в этом диапазоне.", reply_markup=main_menu_keyboard())
     else:
-        await message.answer(f"❌ Ошибка при создании слотов: {response.text}", reply_markup=main_menu_keyboard())
+        await message.answer(f"❌ Ошибка при создании слотов: {result}", reply_markup=main_menu_keyboard())
 
     await state.clear()
\ No newline at end of file
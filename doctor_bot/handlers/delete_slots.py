@@ -1,16 +1,11 @@
-import os
 from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from doctor_bot.api import DoctorApiClient
+from patient_bot.utils.fsm_cache import cached
 from doctor_bot.keyboards.main import main_menu_keyboard, back_to_menu_button
-import requests
-from dotenv import load_dotenv
-
-load_dotenv()
-
-BASE_API_URL = os.getenv("API_BASE_URL")
 
 router = Router()
 
@@ -21,33 +16,22 @@ class DeleteSlotsFSM(StatesGroup):
     confirming_deletion = State()
 
 @router.callback_query(F.data == "Удалить слоты")
-async def delete_slots_start(callback: CallbackQuery, state: FSMContext):
+async def delete_slots_start(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     telegram_id = callback.from_user.id
-    headers = {"X-Telegram-ID": str(telegram_id)}
 
     # Получаем информацию о враче (если API позволяет)
-    try:
-        doctor_resp = requests.get(f"{BASE_API_URL}/doctors/by_telegram/", headers=headers)
-        doctor_resp.raise_for_status()
-        doctor = doctor_resp.json()
-        doctor_id = doctor["id"]
-    except Exception as e:
+    doctor = await api.get_doctor(telegram_id)
+    if doctor is None:
         await callback.message.answer("Ошибка авторизации врача.", reply_markup=back_to_menu_button())
         return
 
     # Получаем свободные даты с учетом doctor_id
-    try:
-        response = requests.get(
-            f"{BASE_API_URL}/slots/free_dates/",
-            headers=headers,
-            params={"doctor_id": doctor_id}
-        )
-        response.raise_for_status()
-    except Exception as e:
+    free_dates = await api.get_doctor_free_dates(telegram_id, doctor["id"])
+    if free_dates is None:
         await callback.message.answer("Ошибка получения слотов.", reply_markup=back_to_menu_button())
         return
 
-    dates = sorted(set(response.json().get("dates", [])))
+    dates = sorted(set(free_dates))
     if not dates:
         await callback.message.edit_text("Нет доступных слотов для удаления.", reply_markup=back_to_menu_button())
         return
@@ -66,13 +50,13 @@ async def delete_slots_start(callback: CallbackQuery, state: FSMContext):
     await state.set_state(DeleteSlotsFSM.selected_date)
 
 @router.callback_query(F.data.startswith("del_date:"))
-async def choose_slots_to_delete(callback: CallbackQuery, state: FSMContext):
+async def choose_slots_to_delete(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     date = callback.data.split(":")[1]
     await state.update_data(date=date, selected_slots=[])
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.get(f"{BASE_API_URL}/slots/?date={date}", headers=headers)
-    if response.status_code == 200:
-        slots = response.json()
+    slots = await cached(
+        state, f"slots:{date}", lambda: api.get_slots(callback.from_user.id, date)
+    )
+    if slots is not None:
         if not slots:
             await callback.message.answer("На эту дату нет свободных слотов.", reply_markup=back_to_menu_button())
             return
@@ -90,7 +74,7 @@ async def choose_slots_to_delete(callback: CallbackQuery, state: FSMContext):
         await callback.message.edit_text("Ошибка загрузки слотов.", reply_markup=back_to_menu_button())
 
 @router.callback_query(F.data.startswith("toggle_slot:"))
-async def toggle_slot_selection(callback: CallbackQuery, state: FSMContext):
+async def toggle_slot_selection(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     slot_id = int(callback.data.split(":")[1])
     data = await state.get_data()
     selected = data.get("selected_slots", [])
@@ -103,16 +87,15 @@ async def toggle_slot_selection(callback: CallbackQuery, state: FSMContext):
         selected.append(slot_id)
     await state.update_data(selected_slots=selected)
 
-    # Загружаем все слоты на эту дату
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.get(f"{BASE_API_URL}/slots/?date={date}", headers=headers)
+    # Слоты на дату берём из кэша диалога, к API — только если он истёк
+    slots = await cached(
+        state, f"slots:{date}", lambda: api.get_slots(callback.from_user.id, date)
+    )
 
-    if response.status_code != 200:
+    if slots is None:
         await callback.message.edit_text("Ошибка загрузки слотов.", reply_markup=back_to_menu_button())
         return
 
-    slots = response.json()
-
     # Формируем клавиатуру со статусами ✅
     keyboard = []
     for slot in slots:
@@ -132,16 +115,14 @@ async def toggle_slot_selection(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "confirm_delete")
-async def confirm_delete_slots(callback: CallbackQuery, state: FSMContext):
+async def confirm_delete_slots(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     data = await state.get_data()
     slot_ids = data.get("selected_slots", [])
     if not slot_ids:
         await callback.answer("Выберите хотя бы один слот.")
         return
 
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.delete(f"{BASE_API_URL}/slots/delete/", json={"slot_ids": slot_ids}, headers=headers)
-    if response.status_code == 204:
+    if await api.delete_slots(callback.from_user.id, slot_ids):
         await callback.message.edit_text("Слоты удалены ✅", reply_markup=InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]]
         ))
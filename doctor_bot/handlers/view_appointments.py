@@ -1,17 +1,11 @@
-import os
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
-import requests
 from datetime import datetime
-from dotenv import load_dotenv
+from doctor_bot.api import DoctorApiClient
 from doctor_bot.keyboards.main import back_to_menu_button, main_menu_keyboard
 
-load_dotenv()
-
-BASE_API_URL = os.getenv("API_BASE_URL")
-
 router = Router()
 
 class ViewAppointmentsFSM(StatesGroup):
@@ -19,12 +13,11 @@ class ViewAppointmentsFSM(StatesGroup):
     selecting_to_cancel = State()
 
 @router.callback_query(F.data == "Записи")
-async def show_appointment_dates(callback: CallbackQuery, state: FSMContext):
+async def show_appointment_dates(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     await callback.answer()
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.get(f"{BASE_API_URL}/appointments/dates/", headers=headers)
-    if response.status_code == 200:
-        dates = sorted(response.json())
+    dates = await api.get_appointment_dates(callback.from_user.id)
+    if dates is not None:
+        dates = sorted(dates)
         if not dates:
             await callback.message.edit_text("Записей нет.", reply_markup=back_to_menu_button())
             return
@@ -39,13 +32,13 @@ async def show_appointment_dates(callback: CallbackQuery, state: FSMContext):
         await state.set_state(ViewAppointmentsFSM.selecting_date)
 
 @router.callback_query(F.data.startswith("view_appts:"))
-async def list_appointments(callback: CallbackQuery, state: FSMContext):
+async def list_appointments(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     date = callback.data.split(":")[1]
     await state.update_data(date=date, cancel_list=[])
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.get(f"{BASE_API_URL}/appointments/?date={date}", headers=headers)
-    if response.status_code == 200:
-        appointments = response.json()
+    appointments = await api.get_appointments(
+        callback.from_user.id, date, fields="id,start_datetime,patient,service"
+    )
+    if appointments is not None:
         if not appointments:
             await callback.message.edit_text("На эту дату нет записей.", reply_markup=back_to_menu_button())
             return
@@ -108,16 +101,14 @@ async def toggle_cancel_appointment(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 @router.callback_query(F.data == "confirm_cancellation")
-async def confirm_cancel_appointments(callback: CallbackQuery, state: FSMContext):
+async def confirm_cancel_appointments(callback: CallbackQuery, state: FSMContext, api: DoctorApiClient):
     data = await state.get_data()
     cancel_ids = data.get("cancel_list", [])
     if not cancel_ids:
         await callback.answer("Не выбраны записи.")
         return
 
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.post(f"{BASE_API_URL}/appointments/cancel/", json={"appointment_ids": cancel_ids}, headers=headers)
-    if response.status_code == 200:
+    if await api.cancel_appointments(callback.from_user.id, cancel_ids):
         await callback.message.edit_text("Выбранные записи отменены ✅", reply_markup=InlineKeyboardMarkup(
             inline_keyboard=[[InlineKeyboardButton(text="🔙 Главное меню", callback_data="main_menu")]]
         ))
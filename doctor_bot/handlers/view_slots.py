@@ -2,11 +2,11 @@
 
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-import requests
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
 
+from doctor_bot.api import DoctorApiClient
 from doctor_bot.keyboards.main import main_menu_keyboard, back_to_menu_button
 
 load_dotenv()
@@ -14,23 +14,25 @@ load_dotenv()
 router = Router()
 
 @router.callback_query(F.data == "Просмотреть слоты")
-async def handle_view_slots(callback: CallbackQuery):
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
-    response = requests.get("http://127.0.0.1:8000/api/slots/all/", headers=headers)
+async def handle_view_slots(callback: CallbackQuery, api: DoctorApiClient):
+    # Сервер возвращает даты всех слотов врача (и полностью занятых)
+    # с количеством свободных
+    dates = await api.get_slot_dates(callback.from_user.id)
 
-    if response.status_code != 200:
+    if dates is None:
         await callback.message.edit_text("Не удалось получить список слотов ❌", reply_markup=back_to_menu_button())
         return
 
-    slots = response.json()
-    unique_dates = sorted(set(slot["start_datetime"][:10] for slot in slots))
-    if not unique_dates:
+    if not dates:
         await callback.message.edit_text("Нет доступных слотов.", reply_markup=back_to_menu_button())
         return
 
     keyboard = [
-        [InlineKeyboardButton(text=datetime.strptime(d, "%Y-%m-%d").strftime("%d.%m.%Y"), callback_data=f"view_slots:{d}")]
-        for d in unique_dates
+        [InlineKeyboardButton(
+            text=f"{datetime.strptime(d['date'], '%Y-%m-%d').strftime('%d.%m.%Y')} ({d['free']})",
+            callback_data=f"view_slots:{d['date']}"
+        )]
+        for d in dates
     ]
     keyboard.append([InlineKeyboardButton(text="🔙 В меню", callback_data="main_menu")])
     markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
@@ -38,23 +40,17 @@ async def handle_view_slots(callback: CallbackQuery):
     await callback.message.edit_text("Выберите дату для просмотра слотов:", reply_markup=markup)
 
 @router.callback_query(F.data.startswith("view_slots:"))
-async def handle_date_slots(callback: CallbackQuery):
+async def handle_date_slots(callback: CallbackQuery, api: DoctorApiClient):
     date_str = callback.data.split(":")[1]  # e.g., "2025-07-25"
-    headers = {"X-Telegram-ID": str(callback.from_user.id)}
 
-    try:
-        # ВАЖНО: меняем на запрос всех слотов
-        response = requests.get("http://127.0.0.1:8000/api/slots/all/", headers=headers)
-        slots = response.json()
-    except Exception as e:
-        await callback.message.answer(f"❌ Ошибка при получении слотов: {e}")
+    # Сервер сам отбирает слоты на дату и отдаёт только нужные поля
+    slots_on_date = await api.get_doctor_slots(
+        callback.from_user.id, date_str, fields="id,start_datetime,end_datetime"
+    )
+    if slots_on_date is None:
+        await callback.message.answer("❌ Ошибка при получении слотов.")
         return
 
-    # Фильтруем слоты по дате
-    slots_on_date = [
-        slot for slot in slots if slot["start_datetime"].startswith(date_str)
-    ]
-
     if not slots_on_date:
         await callback.message.answer("❗ На эту дату нет доступных слотов.")
         return
@@ -1,7 +1,6 @@
 import os
 from aiogram import Bot, Dispatcher, F
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, CallbackQuery
 from aiogram.client.default import DefaultBotProperties
 from doctor_bot.handlers.create_slots import router as create_router
@@ -11,9 +10,9 @@ from doctor_bot.handlers.view_appointments import router as appt_router
 from doctor_bot.keyboards.main import main_menu_keyboard
 from dotenv import load_dotenv
 import asyncio
-import requests
 
-from patient_bot.utils.api import API_BASE_URL
+from doctor_bot.api import API_BASE_URL, DoctorApiClient
+from patient_bot.utils.storage import build_events_isolation, build_storage
 
 load_dotenv()
 
@@ -23,14 +22,22 @@ bot = Bot(
     token=TELEGRAM_DOCTOR_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
-dp = Dispatcher(storage=MemoryStorage())
+# Один HTTP-клиент на весь бот, хендлеры получают его аргументом api
+api = DoctorApiClient(API_BASE_URL)
+storage = build_storage()
+dp = Dispatcher(
+    storage=storage,
+    events_isolation=build_events_isolation(storage),
+    api=api,
+)
+dp.startup.register(api.start)
+dp.shutdown.register(api.close)
 dp.include_routers(create_router, view_router, delete_router, appt_router)
 
 
 @dp.message(F.text == "/start")
-async def on_start(message: Message):
-    response = requests.get(f"{API_BASE_URL}/users/doctor_check/{message.from_user.id}")
-    if response.status_code == 200:
+async def on_start(message: Message, api: DoctorApiClient):
+    if await api.check_doctor(message.from_user.id):
         await message.answer("Добро пожаловать!", reply_markup=main_menu_keyboard())
     else:
         await message.answer("Отказано в доступе.")
@@ -1,7 +1,7 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
-from patient_bot.utils.api import get_user_appointments, cancel_appointments
+from patient_bot.utils.api import ApiClient
 from patient_bot.utils.logger import setup_logger
 from patient_bot.states import AppointmentFSM
 from .view_appointments import show_appointments
@@ -24,11 +24,12 @@ async def toggle_cancel(callback: CallbackQuery, state: FSMContext):
     else:
         selected_ids.add(appointment_id)
 
-    await state.update_data(selected_ids=selected_ids)
+    # В FSM только JSON-совместимые значения
+    await state.update_data(selected_ids=sorted(selected_ids))
     await show_appointments(callback, state)
 
 @router.callback_query(AppointmentFSM.viewing_appointments, F.data == "confirm_cancel")
-async def confirm_cancel(callback: CallbackQuery, state: FSMContext):
+async def confirm_cancel(callback: CallbackQuery, state: FSMContext, api: ApiClient):
     data = await state.get_data()
     selected_ids = list(data["selected_ids"])
     telegram_id = callback.from_user.id
@@ -37,7 +38,7 @@ async def confirm_cancel(callback: CallbackQuery, state: FSMContext):
         await callback.message.edit_text("Вы не выбрали записи.", reply_markup=main_menu_button())
         return
 
-    success = cancel_appointments(telegram_id, selected_ids)
+    success = await api.cancel_appointments(telegram_id, selected_ids)
 
     if success:
         await callback.message.edit_text("✅ Записи отменены.", reply_markup=main_menu_button())
@@ -4,7 +4,8 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import AppointmentFSM
-from patient_bot.utils.api import get_free_dates, get_available_slots
+from patient_bot.utils.api import ApiClient, service_free_dates
+from patient_bot.utils.availability_feed import AvailabilityFeed, cached_context, cached_date_slots
 from patient_bot.keyboards.inline import make_dates_keyboard, back_main_menu_keyboard, make_times_keyboard
 from patient_bot.utils.logger import setup_logger
 
@@ -13,21 +14,24 @@ logger = setup_logger(__name__)
 
 
 @router.callback_query(F.data == "choose_date")
-async def choose_date(callback: CallbackQuery, state: FSMContext):
+async def choose_date(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                      feed: AvailabilityFeed):
     await callback.answer()
     data = await state.get_data()
     doctor_id = data.get("doctor_id")
+    service_id = data.get("service_id")
     telegram_id = callback.from_user.id
 
-    if not doctor_id:
-        logger.warning(f"User {telegram_id}: doctor_id missing.")
+    if not (doctor_id and service_id):
+        logger.warning(f"User {telegram_id}: doctor_id or service_id missing.")
         await callback.message.edit_text(
-            "Ошибка: не выбран врач.",
+            "Ошибка: не выбран врач или услуга.",
             reply_markup=back_main_menu_keyboard("start_booking")
         )
         return
 
-    free_dates = get_free_dates(telegram_id, doctor_id)
+    context = await cached_context(state, api, feed, telegram_id, doctor_id)
+    free_dates = service_free_dates(context, service_id)
     if not free_dates:
         logger.info(f"User {telegram_id}: No free dates for doctor {doctor_id}.")
         await callback.message.edit_text(
@@ -41,10 +45,12 @@ async def choose_date(callback: CallbackQuery, state: FSMContext):
         "Выберите дату:",
         reply_markup=make_dates_keyboard(free_dates)
     )
+    await state.set_state(AppointmentFSM.choosing_date)
 
 
 @router.callback_query(AppointmentFSM.choosing_date)
-async def date_selected(callback: CallbackQuery, state: FSMContext):
+async def date_selected(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                        feed: AvailabilityFeed):
     await callback.answer()
     selected_date = callback.data.split(":")[-1]
     telegram_id = callback.from_user.id
@@ -56,14 +62,10 @@ async def date_selected(callback: CallbackQuery, state: FSMContext):
 
     logger.info(f"User {telegram_id}: Selected date {selected_date}")
 
-    # Получаем все подходящие слоты
-    all_slots = get_available_slots(telegram_id, doctor_id, service_id)
-
-    # Фильтруем по выбранной дате
-    free_slots = [
-        slot for slot in all_slots
-        if slot["start_datetime"].startswith(selected_date)
-    ]
+    # Сервер сразу отдаёт стартовые слоты на выбранную дату, повторные тапы — из кэша
+    free_slots = await cached_date_slots(
+        state, api, feed, telegram_id, doctor_id, service_id, selected_date
+    )
 
     if not free_slots:
         await callback.message.edit_text(
@@ -4,7 +4,7 @@ from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMar
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import AppointmentFSM
 from patient_bot.keyboards.inline import back_main_menu_keyboard
-from patient_bot.utils.api import get_doctors
+from patient_bot.utils.api import ApiClient
 from patient_bot.utils.logger import setup_logger
 from patient_bot.handlers.choose_service import choose_service
 
@@ -12,12 +12,12 @@ router = Router()
 logger = setup_logger(__name__)
 
 @router.callback_query(F.data == "start_booking")
-async def handle_start_booking(callback: CallbackQuery, state: FSMContext):
+async def handle_start_booking(callback: CallbackQuery, state: FSMContext, api: ApiClient):
     logger.info(f"👤 {callback.from_user.id} начал процесс записи.")
     await state.set_state(AppointmentFSM.choosing_doctor)
 
     try:
-        doctors = get_doctors(callback.from_user.id)
+        doctors = await api.get_doctors(callback.from_user.id)
         if not doctors:
             logger.warning("Список врачей пуст.")
             await callback.message.edit_text(
@@ -44,7 +44,7 @@ async def handle_start_booking(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data.startswith("doctor:"))
-async def doctor_selected(callback: CallbackQuery, state: FSMContext):
+async def doctor_selected(callback: CallbackQuery, state: FSMContext, api: ApiClient):
     await callback.answer()
     telegram_id = callback.from_user.id
 
@@ -72,4 +72,4 @@ async def doctor_selected(callback: CallbackQuery, state: FSMContext):
     logger.info(f"User {telegram_id}: выбрал врача {doctor_id} ({doctor_name})")
 
     # Переход к выбору услуги
-    await choose_service(callback, state)
\ No newline at end of file
+    await choose_service(callback, state, api)
\ No newline at end of file
@@ -4,7 +4,8 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import AppointmentFSM
-from patient_bot.utils.api import get_services, get_free_dates
+from patient_bot.utils.api import ApiClient, service_free_dates
+from patient_bot.utils.availability_feed import AvailabilityFeed, cached_context
 from patient_bot.keyboards.inline import back_main_menu_keyboard, make_services_keyboard, make_dates_keyboard
 from patient_bot.utils.logger import setup_logger
 
@@ -14,7 +15,8 @@ logger = setup_logger(__name__)
 
 
 @router.callback_query(F.data == "choose_service")
-async def choose_service(callback: CallbackQuery, state: FSMContext):
+async def choose_service(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                         feed: AvailabilityFeed):
     await callback.answer()
 
     data = await state.get_data()
@@ -29,7 +31,9 @@ async def choose_service(callback: CallbackQuery, state: FSMContext):
         )
         return
 
-    services = get_services(telegram_id, doctor_id)
+    # Услуги сразу со свободными датами под длительность каждой
+    context = await cached_context(state, api, feed, telegram_id, doctor_id)
+    services = context["services"] if context else []
 
     if not services:
         logger.info(f"User {telegram_id}: No services found for doctor {doctor_id}.")
@@ -48,7 +52,8 @@ async def choose_service(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(AppointmentFSM.choosing_service)
-async def service_selected(callback: CallbackQuery, state: FSMContext):
+async def service_selected(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                           feed: AvailabilityFeed):
     await callback.answer()
     telegram_id = callback.from_user.id
     service_id = int(callback.data.split(":")[-1])
@@ -60,8 +65,9 @@ async def service_selected(callback: CallbackQuery, state: FSMContext):
     logger.info(f"User {telegram_id}: Selected service ID {service_id}.")
 
     try:
-        # ✅ Получаем доступные даты от API
-        dates = get_free_dates(telegram_id, doctor_id)
+        # ✅ Даты, на которые помещается выбранная услуга, — из уже загруженного контекста
+        context = await cached_context(state, api, feed, telegram_id, doctor_id)
+        dates = service_free_dates(context, service_id)
 
         if not dates:
             await callback.message.edit_text(
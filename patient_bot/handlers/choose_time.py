@@ -4,17 +4,19 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import AppointmentFSM
-from patient_bot.utils.api import get_available_slots, get_service_details, find_continuous_slots, get_slot_by_id
+from patient_bot.utils.api import ApiClient, slot_times
+from patient_bot.utils.availability_feed import AvailabilityFeed, cached_date_slots
 from patient_bot.keyboards.inline import make_times_keyboard, back_main_menu_keyboard, confirm_appointment_keyboard
 from patient_bot.utils.logger import setup_logger
-from datetime import datetime, timedelta
+from datetime import datetime
 
 router = Router()
 logger = setup_logger(__name__)
 
 
 @router.callback_query(F.data == "choose_time")
-async def choose_time(callback: CallbackQuery, state: FSMContext):
+async def choose_time(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                      feed: AvailabilityFeed):
     await callback.answer()
     data = await state.get_data()
     telegram_id = callback.from_user.id
@@ -31,27 +33,10 @@ async def choose_time(callback: CallbackQuery, state: FSMContext):
         )
         return
 
-    service = get_service_details(telegram_id, service_id)
-    if not service:
-        await callback.message.edit_text(
-            "Ошибка при загрузке услуги.",
-            reply_markup=back_main_menu_keyboard("choose_service")
-        )
-        return
-
-    duration_minutes = service["duration_minutes"]
-    required_slots = duration_minutes // 15
-
-    all_slots = get_available_slots(telegram_id, doctor_id, date)
-    if not all_slots:
-        await callback.message.edit_text(
-            "Нет доступного времени на эту дату.",
-            reply_markup=back_main_menu_keyboard("choose_date")
-        )
-        return
-
-    # Отфильтруем доступные окна
-    available_times = find_continuous_slots(all_slots, required_slots)
+    # Сервер сразу отдаёт стартовые слоты под услугу на выбранную дату
+    available_times = await cached_date_slots(
+        state, api, feed, telegram_id, doctor_id, service_id, date
+    )
 
     if not available_times:
         await callback.message.edit_text(
@@ -65,30 +50,45 @@ async def choose_time(callback: CallbackQuery, state: FSMContext):
         f"Выберите время:",
         reply_markup=make_times_keyboard(available_times)
     )
-    await state.set_state(AppointmentFSM.confirming)
+    await state.set_state(AppointmentFSM.choosing_time)
+
+
+async def show_taken_time(callback: CallbackQuery, slots):
+    """Выбранное время уже заняли: показываем актуальный список."""
+    if not slots:
+        await callback.message.edit_text(
+            "Это время уже заняли, а других свободных слотов на дату нет.",
+            reply_markup=back_main_menu_keyboard("choose_date")
+        )
+        return
+    await callback.message.edit_text(
+        "Это время уже заняли, выберите другое:",
+        reply_markup=make_times_keyboard(slots)
+    )
 
 
 @router.callback_query(AppointmentFSM.choosing_time, F.data.startswith("select_time:"))
-async def time_selected(callback: CallbackQuery, state: FSMContext):
+async def time_selected(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                        feed: AvailabilityFeed):
     await callback.answer()
     telegram_id = callback.from_user.id
     slot_id = int(callback.data.split(":")[-1])
 
     logger.info(f"User {telegram_id}: Selected slot ID {slot_id}")
 
-    # Получим информацию о выбранном слоте (опционально, если нужно время отобразить)
-    slot = get_slot_by_id(telegram_id, slot_id)
-    if not slot:
-        await callback.message.edit_text(
-            "Произошла ошибка при получении слота.",
-            reply_markup=confirm_appointment_keyboard()
-        )
+    # Время берём из уже показанного списка; если по ленте изменений
+    # на эту дату что-то поменялось, список загрузится заново
+    data = await state.get_data()
+    selected_date = data.get("selected_date")
+    shown = await cached_date_slots(
+        state, api, feed, telegram_id,
+        data.get("doctor_id"), data.get("service_id"), selected_date
+    )
+    start_time = dict(slot_times(shown)).get(slot_id)
+    if start_time is None:
+        await show_taken_time(callback, shown)
         return
 
-    # Можно показать пользователю подтверждение:
-    start_time = slot["start_datetime"][11:16]  # только время
-    selected_date = slot["start_datetime"][:10]  # только дата
-
     # Сохраняем slot_id в состояние
     await state.update_data(
         slot_id=slot_id,
@@ -4,8 +4,11 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import AppointmentFSM
-from patient_bot.utils.api import create_appointment, get_service_details
+from patient_bot.utils.api import ApiClient, slot_times
+from patient_bot.utils.availability_feed import AvailabilityFeed, cached_date_slots
+from patient_bot.utils.fsm_cache import cache_invalidate
 from patient_bot.keyboards.inline import confirm_appointment_keyboard, back_main_menu_keyboard
+from patient_bot.handlers.choose_time import show_taken_time
 from patient_bot.utils.logger import setup_logger
 from datetime import datetime
 
@@ -14,7 +17,8 @@ logger = setup_logger(__name__)
 
 
 @router.callback_query(AppointmentFSM.confirming, F.data == "confirm")
-async def confirm_appointment(callback: CallbackQuery, state: FSMContext):
+async def confirm_appointment(callback: CallbackQuery, state: FSMContext, api: ApiClient,
+                              feed: AvailabilityFeed):
     await callback.answer()
     data = await state.get_data()
     telegram_id = callback.from_user.id
@@ -32,10 +36,21 @@ async def confirm_appointment(callback: CallbackQuery, state: FSMContext):
         )
         return
 
+    # Пока пользователь подтверждал, время могли занять: список слотов из кэша,
+    # а если по ленте изменений дата менялась — свежий из API
+    slots = await cached_date_slots(
+        state, api, feed, telegram_id, doctor_id, service_id, date
+    )
+    if slots and data.get("slot_id") not in dict(slot_times(slots)):
+        logger.info(f"User {telegram_id}: Slot {data.get('slot_id')} was taken before confirmation")
+        await show_taken_time(callback, slots)
+        await state.set_state(AppointmentFSM.choosing_time)
+        return
+
     logger.info(f"User {telegram_id}: Trying to book {date} at {start_time}")
 
     # Запрос к API на создание записи
-    appointment = create_appointment(
+    appointment = await api.create_appointment(
         telegram_id=telegram_id,
         doctor_id=doctor_id,
         service_id=service_id,
@@ -54,6 +69,8 @@ async def confirm_appointment(callback: CallbackQuery, state: FSMContext):
         )
         await state.clear()
     else:
+        # Время могли занять: следующий показ дат и слотов пойдёт в API
+        await cache_invalidate(state)
         await callback.message.edit_text(
             "Ошибка при создании записи. Попробуйте позже.",
             reply_markup=back_main_menu_keyboard("choose_time")
@@ -2,7 +2,7 @@ from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import RegistrationFSM
-from patient_bot.utils.api import register_user, check_user_exists
+from patient_bot.utils.api import ApiClient
 from patient_bot.keyboards.inline import back_main_menu_keyboard, main_menu_keyboard
 from patient_bot.handlers.main import start_handler
 from patient_bot.utils.logger import setup_logger
@@ -13,11 +13,11 @@ logger = setup_logger(__name__)
 
 
 @router.message(F.text == "/start")
-async def start_registration(message: Message, state: FSMContext):
+async def start_registration(message: Message, state: FSMContext, api: ApiClient):
     telegram_id = message.from_user.id
     logger.info(f"User {telegram_id} started bot")
 
-    if check_user_exists(telegram_id):
+    if await api.check_user_exists(telegram_id):
         logger.info(f"User {telegram_id} already registered")
         await start_handler(message, state)  # ✅ Добавили state
         return
@@ -36,7 +36,7 @@ async def get_full_name(message: Message, state: FSMContext):
 
 
 @router.message(RegistrationFSM.waiting_for_phone)
-async def get_phone(message: Message, state: FSMContext):
+async def get_phone(message: Message, state: FSMContext, api: ApiClient):
     phone_number = message.text.strip()
     data = await state.get_data()
     full_name = data.get("full_name")
@@ -44,7 +44,7 @@ async def get_phone(message: Message, state: FSMContext):
 
     logger.info(f"Registering user {telegram_id} with name '{full_name}' and phone '{phone_number}'")
 
-    success = register_user(telegram_id, full_name, phone_number)
+    success = await api.register_user(telegram_id, full_name, phone_number)
 
     if success:
         logger.info(f"User {telegram_id} successfully registered")
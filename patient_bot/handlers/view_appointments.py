@@ -2,7 +2,7 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from patient_bot.keyboards.inline import build_cancel_selection_keyboard, \
     main_menu_button
-from patient_bot.utils.api import get_user_appointments
+from patient_bot.utils.api import ApiClient
 from patient_bot.utils.logger import setup_logger
 from aiogram.fsm.context import FSMContext
 from patient_bot.states import AppointmentFSM
@@ -13,16 +13,16 @@ logger = setup_logger(__name__)
 
 
 @router.callback_query(F.data == "view_appointments")
-async def view_appointments(callback: CallbackQuery, state: FSMContext):
+async def view_appointments(callback: CallbackQuery, state: FSMContext, api: ApiClient):
     telegram_id = callback.from_user.id
-    appointments = get_user_appointments(telegram_id)
+    appointments = await api.get_user_appointments(telegram_id)
 
     if not appointments:
         await callback.message.edit_text("У вас пока нет записей.", reply_markup=main_menu_button())
         return
 
     await state.set_state(AppointmentFSM.viewing_appointments)
-    await state.update_data(appointments=appointments, selected_ids=set())
+    await state.update_data(appointments=appointments, selected_ids=[])
 
     await show_appointments(callback, state)
 
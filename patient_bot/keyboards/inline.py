@@ -1,5 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import datetime
+from patient_bot.utils.api import slot_times
 
 def main_menu_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -62,10 +63,10 @@ def format_time(iso_string):
     return dt.strftime("%H:%M")
 
 def make_times_keyboard(slots):
+    # slots — компактный ответ API или список полных слотов
     buttons = []
-    for slot in slots:
-        time = slot["start_datetime"][11:16]
-        callback_data = f"select_time:{slot['id']}"
+    for slot_id, time in slot_times(slots):
+        callback_data = f"select_time:{slot_id}"
         buttons.append(InlineKeyboardButton(text=time, callback_data=callback_data))
 
     # группируем по 2 кнопки в ряд
@@ -5,10 +5,12 @@ import os
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from dotenv import load_dotenv
 # from patient_bot.config import TELEGRAM_PATIENT_BOT_TOKEN
 # from patient_bot.middlewares import TelegramIDAuthMiddleware
+from patient_bot.utils.api import API_BASE_URL, ApiClient
+from patient_bot.utils.availability_feed import AvailabilityFeed
+from patient_bot.utils.storage import build_events_isolation, build_storage
 from patient_bot.handlers import (
     registration,
     main,
@@ -30,10 +32,27 @@ logger = logging.getLogger(__name__)
 
 TELEGRAM_PATIENT_BOT_TOKEN = os.getenv("USER_TELEGRAM_TOKEN")
 
-# Запуск бота
-async def main_runner():
-    bot = Bot(token=TELEGRAM_PATIENT_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(storage=MemoryStorage())
+def create_bot() -> Bot:
+    return Bot(token=TELEGRAM_PATIENT_BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+def create_dispatcher() -> Dispatcher:
+    """Диспетчер со всеми хендлерами; общий для polling и webhook-режима."""
+    # Один HTTP-клиент на весь бот, хендлеры получают его аргументом api
+    api = ApiClient(API_BASE_URL)
+    # Лента изменений доступности (AVAILABILITY_FEED=1): по ней версионируется кэш слотов
+    feed = AvailabilityFeed(api)
+    storage = build_storage()
+    dp = Dispatcher(
+        storage=storage,
+        events_isolation=build_events_isolation(storage),
+        api=api,
+        feed=feed,
+    )
+    dp.startup.register(api.start)
+    dp.startup.register(feed.start)
+    dp.shutdown.register(feed.stop)
+    dp.shutdown.register(api.close)
 
     # Подключение middlewares
     # dp.update.middleware(TelegramIDAuthMiddleware())
@@ -50,6 +69,13 @@ async def main_runner():
         view_appointments.router,
         cancel_appointments.router,
     )
+    return dp
+
+
+# Запуск бота
+async def main_runner():
+    bot = create_bot()
+    dp = create_dispatcher()
 
     logger.info("Patient bot started")
     await dp.start_polling(bot)
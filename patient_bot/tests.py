@@ -0,0 +1,273 @@
+import asyncio
+import os
+import tempfile
+import time
+from importlib.util import find_spec
+from unittest import IsolatedAsyncioTestCase, TestCase, mock, skipUnless
+
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from patient_bot.utils.api import ApiClient, ApiError, service_free_dates, slot_times
+from patient_bot.utils.availability_feed import FEED_TTL, POLL_TIMEOUT, AvailabilityFeed
+from patient_bot.utils.fsm_cache import CACHE_KEY, cache_get, cache_invalidate, cache_set, cached
+from patient_bot.utils.storage import SQLiteStorage, build_storage
+
+
+API_LOGGER = "patient_bot.utils.api"
+
+
+class ApiClientTests(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.hits = []
+        app = web.Application()
+        app.router.add_route("*", "/{name}/", self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.api = ApiClient(str(self.server.make_url("/")), backoff=0)
+
+    async def asyncTearDown(self):
+        await self.api.close()
+        await self.server.close()
+
+    async def handle(self, request):
+        name = request.match_info["name"]
+        self.hits.append((request.method, request.headers.get("X-Telegram-ID")))
+        # flaky отвечает 502 на первые два запроса, down — всегда 503
+        if name == "flaky" and len(self.hits) < 3 or name == "down":
+            return web.Response(status=502 if name == "flaky" else 503)
+        return web.json_response({"ok": True})
+
+    async def test_get_is_retried_after_5xx(self):
+        with self.assertLogs(API_LOGGER, "WARNING"):
+            response = await self.api.request("GET", "/flaky/", telegram_id=10)
+        self.assertEqual(response, (200, {"ok": True}))
+        self.assertEqual(self.hits, [("GET", "10")] * 3)
+
+    async def test_retries_are_bounded(self):
+        with self.assertLogs(API_LOGGER, "WARNING"):
+            self.assertEqual(await self.api.request("GET", "/down/"), (503, None))
+        self.assertEqual(len(self.hits), self.api.retries + 1)
+
+    async def test_post_is_not_retried(self):
+        self.assertEqual(await self.api.request("POST", "/down/"), (503, None))
+        self.assertEqual(len(self.hits), 1)
+
+    async def test_session_is_shared(self):
+        await self.api.request("GET", "/ok/")
+        session = self.api._session
+        await self.api.request("GET", "/ok/")
+        self.assertIs(self.api._session, session)
+
+    async def test_connection_error_raises(self):
+        api = ApiClient("http://127.0.0.1:1", retries=1, backoff=0)
+        with self.assertLogs(API_LOGGER, "WARNING"), self.assertRaises(ApiError):
+            await api.request("GET", "/doctors/")
+        await api.close()
+
+class FsmCacheTests(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.state = FSMContext(MemoryStorage(), StorageKey(bot_id=1, chat_id=10, user_id=10))
+
+    async def test_cached_fetches_once(self):
+        fetch = mock.AsyncMock(return_value=["2030-01-01"])
+        for _ in range(2):
+            self.assertEqual(await cached(self.state, "dates", fetch), ["2030-01-01"])
+        fetch.assert_awaited_once()
+
+    async def test_empty_result_is_not_cached(self):
+        fetch = mock.AsyncMock(return_value=[])
+        await cached(self.state, "dates", fetch)
+        await cached(self.state, "dates", fetch)
+        self.assertEqual(fetch.await_count, 2)
+
+    async def test_expired_entry_is_dropped(self):
+        await cache_set(self.state, "dates", ["2030-01-01"], ttl=-1)
+        self.assertIsNone(await cache_get(self.state, "dates"))
+
+    async def test_invalidate_by_prefix(self):
+        for key in ("slots:1", "slots:2", "context:1"):
+            await cache_set(self.state, key, [key])
+        await cache_invalidate(self.state, "slots:")
+        self.assertEqual(list((await self.state.get_data())[CACHE_KEY]), ["context:1"])
+
+        # Данные диалога кэш не трогает
+        await self.state.update_data(doctor_id=5)
+        await cache_invalidate(self.state)
+        self.assertEqual(await self.state.get_data(), {"doctor_id": 5, CACHE_KEY: {}})
+
+    def test_service_free_dates(self):
+        context = {"services": [{"id": 3, "free_dates": ["2030-01-01"]}]}
+        self.assertEqual(service_free_dates(context, 3), ["2030-01-01"])
+        self.assertEqual(service_free_dates(context, 4), [])
+        self.assertEqual(service_free_dates(None, 3), [])
+
+
+class Booking(StatesGroup):
+    choosing_date = State()
+
+
+class SQLiteStorageTests(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "fsm.sqlite3")
+        self.storage = SQLiteStorage(self.path, ttl=60)
+        self.key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+
+    async def test_round_trip(self):
+        data = {"doctor_name": "Иванов", "selected_ids": [3, 5], "page": 2}
+        await self.storage.set_state(self.key, Booking.choosing_date)
+        await self.storage.set_data(self.key, data)
+
+        self.assertEqual(await self.storage.get_state(self.key), Booking.choosing_date.state)
+        self.assertEqual(await self.storage.get_data(self.key), data)
+
+        # Переживает переоткрытие файла, то есть рестарт бота
+        await self.storage.close()
+        self.storage = SQLiteStorage(self.path, ttl=60)
+        self.assertEqual(await self.storage.get_state(self.key), Booking.choosing_date.state)
+        self.assertEqual(await self.storage.get_data(self.key), data)
+
+    async def test_compact_json(self):
+        await self.storage.set_data(self.key, {"name": "Иванов", "ids": [1, 2]})
+        raw = self.storage._db.execute("SELECT data FROM fsm").fetchone()[0]
+        self.assertEqual(raw, '{"name":"Иванов","ids":[1,2]}')
+
+    async def test_clear(self):
+        await self.storage.set_state(self.key, Booking.choosing_date)
+        await self.storage.set_data(self.key, {"page": 1})
+        await self.storage.set_state(self.key, None)
+        await self.storage.set_data(self.key, {})
+
+        self.assertIsNone(await self.storage.get_state(self.key))
+        self.assertEqual(await self.storage.get_data(self.key), {})
+
+    async def test_keys_are_separate_per_bot_and_chat(self):
+        other_bot = StorageKey(bot_id=2, chat_id=10, user_id=10)
+        other_chat = StorageKey(bot_id=1, chat_id=11, user_id=11)
+        await self.storage.set_data(self.key, {"page": 1})
+
+        self.assertEqual(await self.storage.get_data(other_bot), {})
+        self.assertEqual(await self.storage.get_data(other_chat), {})
+
+    async def test_idle_conversation_expires(self):
+        await self.storage.set_state(self.key, Booking.choosing_date)
+        self.storage._db.execute("UPDATE fsm SET updated_at = ?", (time.time() - 120,))
+
+        self.assertIsNone(await self.storage.get_state(self.key))
+        self.assertEqual(await self.storage.get_data(self.key), {})
+
+
+class BuildStorageTests(IsolatedAsyncioTestCase):
+
+    def test_memory_by_default(self):
+        with mock.patch.dict(os.environ, {}, clear=True):
+            self.assertIsInstance(build_storage(), MemoryStorage)
+
+    async def test_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {"FSM_STORAGE": "sqlite", "FSM_SQLITE_PATH": os.path.join(directory, "fsm.db")}
+            with mock.patch.dict(os.environ, env, clear=True):
+                storage = build_storage()
+            self.assertIsInstance(storage, SQLiteStorage)
+            self.assertEqual(storage.ttl, 86400)
+            await storage.close()
+
+    @skipUnless(find_spec("redis"), "нужен пакет redis")
+    async def test_redis_keys_include_bot_id(self):
+        env = {"FSM_STORAGE": "redis", "FSM_REDIS_URL": "redis://localhost:6379/0"}
+        with mock.patch.dict(os.environ, env, clear=True):
+            storage = build_storage()
+        key = StorageKey(bot_id=1, chat_id=10, user_id=10)
+        self.assertIn("1", storage.key_builder.build(key).split(":"))
+        await storage.close()
+
+
+class SlotTimesTests(TestCase):
+
+    def test_compact(self):
+        self.assertEqual(
+            slot_times({"minutes": [540, 1425], "ids": [17, 30]}),
+            [(17, "09:00"), (30, "23:45")],
+        )
+
+    def test_full_slots(self):
+        self.assertEqual(
+            slot_times([{"id": 17, "start_datetime": "2025-07-30T09:00:00Z"}]),
+            [(17, "09:00")],
+        )
+        self.assertEqual(slot_times(None), [])
+
+
+class FakeFeedApi:
+    """Отдаёт заранее заданные ответы ленты, потом висит, как long-poll."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def request(self, method, path, params=None, timeout=None):
+        self.calls.append(dict(params))
+        if self.responses:
+            return 200, self.responses.pop(0)
+        await asyncio.Event().wait()
+
+
+class AvailabilityFeedTests(IsolatedAsyncioTestCase):
+
+    async def run_feed(self, responses):
+        api = FakeFeedApi(responses)
+        feed = AvailabilityFeed(api, enabled=True)
+        snapshots = []
+        apply = feed._apply
+
+        def record(data):
+            apply(data)
+            snapshots.append((
+                feed.slots_key(1, 5, "2030-01-01"),
+                feed.slots_key(1, 5, "2030-01-03"),
+                feed.context_key(1),
+            ))
+
+        feed._apply = record
+        await feed.start()
+        for _ in range(100):
+            if len(api.calls) > len(responses):
+                break
+            await asyncio.sleep(0)
+        self.addAsyncCleanup(feed.stop)
+        return feed, api.calls, snapshots
+
+    async def test_resumes_from_last_id_and_skips_seen_events(self):
+        feed, calls, snapshots = await self.run_feed([
+            {"last_id": 12, "events": []},
+            {"last_id": 13, "events": [[12, 1, "2030-01-01"], [13, 1, "2030-01-02"]]},
+            # 11 зафиксировался поздно; 12 и 13 повторены из окна перечитывания
+            {"last_id": 13, "events": [[11, 1, "2030-01-03"], [12, 1, "2030-01-01"],
+                                       [13, 1, "2030-01-02"]]},
+            {"last_id": 13, "events": [[11, 1, "2030-01-03"], [13, 1, "2030-01-02"]]},
+        ])
+
+        self.assertEqual(
+            [call.get("since") for call in calls], [None, 12, 13, 13, 13]
+        )
+        self.assertTrue(all(call["timeout"] == POLL_TIMEOUT for call in calls))
+        self.assertEqual(feed.ttl, FEED_TTL)
+
+        _, (date1, date3, context), (date1_late, date3_late, context_late), last = snapshots
+        # Повтор 12 не сбрасывает кэш даты, позднее 11 — сбрасывает
+        self.assertEqual(date1_late, date1)
+        self.assertNotEqual(date3_late, date3)
+        self.assertNotEqual(context_late, context)
+        self.assertEqual(last, (date1_late, date3_late, context_late))
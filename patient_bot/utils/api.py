@@ -1,160 +1,281 @@
 # patient_bot/utils/api.py
-import requests
+import asyncio
+import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
+
+import aiohttp
 from dotenv import load_dotenv
 from patient_bot.utils.logger import setup_logger
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 API_BASE_URL = os.getenv("API_BASE_URL")
 logger = setup_logger(__name__)
 
-def get_doctors(telegram_id: int):
-    url = f"{API_BASE_URL}/doctors/"
-    headers = {"X-Telegram-ID": str(telegram_id)}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json()
-    return []
+# Методы, которые можно безопасно повторить после ответа 5xx или обрыва
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# API отдаёт JSON через orjson (booking.renderers); им же и разбираем,
+# если пакет установлен
+json_loads = orjson.loads if orjson else json.loads
+
 
-def get_services(telegram_id: int, doctor_id: int):
-    url = f"{API_BASE_URL}/services/doctor/"
-    headers = {"X-Telegram-ID": str(telegram_id)}
-    params = {"doctor_id": doctor_id}
-    response = requests.get(url, headers=headers, params=params)
-    if response.status_code == 200:
-        return response.json()
+def json_serialize(data) -> str:
+    """Тело запроса для aiohttp (json=...)."""
+    if orjson:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False)
+
+
+def service_free_dates(context: dict, service_id: int):
+    """Свободные даты услуги из ответа get_booking_context."""
+    for service in (context or {}).get("services", []):
+        if service["id"] == service_id:
+            return service["free_dates"]
     return []
 
-def get_free_dates(telegram_id: int, doctor_id: int):
-    url = f"{API_BASE_URL}/slots/free_dates/"
-    try:
-        response = requests.get(url, params={"doctor_id": doctor_id})
-        response.raise_for_status()
-        return response.json().get("dates", [])
-    except Exception as e:
-        logger.error(f"[get_free_dates] User {telegram_id}: {e}")
+
+def slot_times(slots) -> list:
+    """
+    Пары (id слота, "ЧЧ:ММ") из ответа слотов: компактного
+    ({"minutes": [...], "ids": [...]}) или списка полных слотов.
+    """
+    if isinstance(slots, dict):
+        return [
+            (slot_id, f"{minutes // 60:02d}:{minutes % 60:02d}")
+            for minutes, slot_id in zip(slots.get("minutes", []), slots.get("ids", []))
+        ]
+    return [(slot["id"], slot["start_datetime"][11:16]) for slot in slots or []]
+
+
+class ApiError(Exception):
+    """Запрос к API не удался после всех повторов."""
+
+
+class ApiClient:
+    """
+    Асинхронный клиент API бота.
+
+    Все запросы идут через одну aiohttp-сессию: соединения переиспользуются
+    (keep-alive), их число ограничено, у каждого запроса есть таймаут.
+    Сетевые ошибки и ответы 5xx повторяются с экспоненциальной задержкой;
+    неидемпотентные запросы повторяются, только если соединение
+    не удалось установить.
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, *, limit: int = 100,
+                 limit_per_host: int = 50, timeout: float = 10,
+                 retries: int = 3, backoff: float = 0.3):
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=30,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout,
+                json_serialize=json_serialize,
+            )
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def request(self, method: str, path: str, *, telegram_id: int = None,
+                      headers: dict = None, **kwargs):
+        """Выполняет запрос и возвращает пару (статус, JSON или None)."""
+        if self._session is None:
+            await self.start()
+        headers = dict(headers or {})
+        if telegram_id is not None:
+            headers["X-Telegram-ID"] = str(telegram_id)
+        url = f"{self.base_url}{path}"
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                async with self._session.request(
+                    method, url, headers=headers, **kwargs
+                ) as response:
+                    if response.status >= 500 and idempotent and not last_attempt:
+                        logger.warning(f"[api] {method} {path}: {response.status}, повтор")
+                    else:
+                        data = None
+                        if response.content_type == "application/json":
+                            body = await response.read()
+                            data = json_loads(body) if body.strip() else None
+                        return response.status, data
+            except aiohttp.ClientConnectorError as e:
+                # Соединение не установлено — запрос точно не дошёл до сервера
+                if last_attempt:
+                    raise ApiError(f"{method} {path}: {e}") from e
+                logger.warning(f"[api] {method} {path}: {e}, повтор")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not idempotent or last_attempt:
+                    raise ApiError(f"{method} {path}: {e!r}") from e
+                logger.warning(f"[api] {method} {path}: {e!r}, повтор")
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def _json(self, method: str, path: str, **kwargs):
+        """JSON успешного ответа; при 4xx/5xx бросает ApiError."""
+        status, data = await self.request(method, path, **kwargs)
+        if status >= 400:
+            raise ApiError(f"{method} {path}: {status}")
+        return data
+
+    async def get_doctors(self, telegram_id: int):
+        status, data = await self.request("GET", "/doctors/", telegram_id=telegram_id)
+        if status == 200:
+            return data
         return []
 
-def get_service_details(telegram_id: int, service_id: int):
-    url = f"{API_BASE_URL}/services/{service_id}/"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"[get_service_details] User {telegram_id}: {e}")
-        return None
-
-def get_available_slots(telegram_id: int, doctor_id: int, service_id: int):
-    url = f"{API_BASE_URL}/slots/available/"
-    try:
-        response = requests.get(
-            url, params={
-                "doctor_id": doctor_id,
-                # "date": date,
-                "service_id": service_id
-            }
+    async def get_services(self, telegram_id: int, doctor_id: int):
+        status, data = await self.request(
+            "GET", "/services/doctor/",
+            telegram_id=telegram_id, params={"doctor_id": doctor_id}
         )
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"[get_available_slots] User {telegram_id}: {e}")
+        if status == 200:
+            return data
         return []
 
-def find_continuous_slots(slots: list, required_count: int):
-    slots_sorted = sorted(slots)
-    result = []
+    async def get_free_dates(self, telegram_id: int, doctor_id: int):
+        try:
+            data = await self._json(
+                "GET", "/slots/free_dates/", params={"doctor_id": doctor_id}
+            )
+            return data.get("dates", [])
+        except Exception as e:
+            logger.error(f"[get_free_dates] User {telegram_id}: {e}")
+            return []
 
-    def time_diff(t1, t2):
-        fmt = "%H:%M"
-        return (datetime.strptime(t2, fmt) - datetime.strptime(t1, fmt)) == timedelta(minutes=15)
+    async def get_booking_context(self, telegram_id: int, doctor_id: int,
+                                  service_id: int = None, date: str = None):
+        """
+        Услуги врача со свободными датами и, при date, слоты на эту дату
+        в компактном формате.
+        """
+        params = {"doctor_id": doctor_id}
+        if service_id:
+            params["service_id"] = service_id
+        if date:
+            params["date"] = date
+            params["compact"] = 1
+        try:
+            return await self._json("GET", "/booking/context/", params=params)
+        except Exception as e:
+            logger.error(f"[get_booking_context] User {telegram_id}: {e}")
+            return None
 
-    for i in range(len(slots_sorted) - required_count + 1):
-        window = slots_sorted[i:i + required_count]
-        valid = all(
-            time_diff(window[j], window[j + 1])
-            for j in range(len(window) - 1)
-        )
-        if valid:
-            result.append(window[0])
-    return result
-
-def create_appointment(telegram_id: int, doctor_id: int, service_id: int,
-                       date: str, start_time: str):
-    url = f"{API_BASE_URL}/appointments/create/"
-
-    # Собираем ISO-дату: "2025-07-30T14:00:00"
-    try:
-        start_datetime_str = f"{date} {start_time}"
-        start_datetime = datetime.strptime(start_datetime_str, "%Y-%m-%d %H:%M")
-        iso_datetime = start_datetime.isoformat()
-    except ValueError as e:
-        logger.error(f"[create_appointment] Invalid datetime format: {e}")
-        return None
-
-    payload = {
-        "telegram_id": telegram_id,
-        "doctor_id": doctor_id,
-        "service_id": service_id,
-        "start_datetime": iso_datetime
-    }
-
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"[create_appointment] User {telegram_id}: {e}")
-        return None
-
-
-def get_user_appointments(telegram_id: int):
-    url = f"{API_BASE_URL}/appointments/by-patient/"
-    try:
-        response = requests.post(url, json={"telegram_id": telegram_id})
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"[get_user_appointments] User {telegram_id}: {e}")
-        return []
+    async def get_date_slots(self, telegram_id: int, doctor_id: int,
+                             service_id: int, date: str):
+        """
+        Стартовые слоты под услугу на выбранную дату:
+        {"minutes": [...], "ids": [...]}, пустой словарь, если слотов нет.
+        """
+        context = await self.get_booking_context(telegram_id, doctor_id, service_id, date)
+        if not context:
+            return {}
+        return context.get("slots", {}).get("dates", {}).get(date, {})
 
-def cancel_appointments(telegram_id: int, appointment_ids: list):
-    url = f"{API_BASE_URL}/appointments/cancel/"
-    headers = {"X-Telegram-ID": str(telegram_id)}
-    try:
-        response = requests.post(
-            url,
-            json={
-                "appointment_ids": appointment_ids
-            },
-            headers=headers
-        )
-        response.raise_for_status()
-        return response.status_code == 200
-    except Exception as e:
-        logger.error(f"[cancel_appointments] User {telegram_id}: {e}")
-        return False
-
-def check_user_exists(telegram_id: int) -> bool:
-    response = requests.get(f"{API_BASE_URL}/users/check/{telegram_id}/")
-    return response.status_code == 200
-
-def register_user(telegram_id: int, full_name: str, phone_number: str) -> bool:
-    payload = {
-        "telegram_id": telegram_id,
-        "full_name": full_name,
-        "phone_number": phone_number
-    }
-    response = requests.post(f"{API_BASE_URL}/users/register", json=payload)
-    return response.status_code in [200, 201]
-
-def get_slot_by_id(telegram_id: int, slot_id: int):
-    url = f"{API_BASE_URL}/slots/{slot_id}/"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        logger.error(f"[get_slot_by_id] User {telegram_id}: {e}")
-        return None
+    async def get_service_details(self, telegram_id: int, service_id: int):
+        try:
+            return await self._json("GET", f"/services/{service_id}/")
+        except Exception as e:
+            logger.error(f"[get_service_details] User {telegram_id}: {e}")
+            return None
+
+    async def get_available_slots(self, telegram_id: int, doctor_id: int, service_id: int):
+        try:
+            return await self._json(
+                "GET", "/slots/available/",
+                params={"doctor_id": doctor_id, "service_id": service_id}
+            )
+        except Exception as e:
+            logger.error(f"[get_available_slots] User {telegram_id}: {e}")
+            return []
+
+    async def create_appointment(self, telegram_id: int, doctor_id: int,
+                                 service_id: int, date: str, start_time: str):
+        # Собираем ISO-дату: "2025-07-30T14:00:00"
+        try:
+            start_datetime_str = f"{date} {start_time}"
+            start_datetime = datetime.strptime(start_datetime_str, "%Y-%m-%d %H:%M")
+            iso_datetime = start_datetime.isoformat()
+        except ValueError as e:
+            logger.error(f"[create_appointment] Invalid datetime format: {e}")
+            return None
+
+        payload = {
+            "telegram_id": telegram_id,
+            "doctor_id": doctor_id,
+            "service_id": service_id,
+            "start_datetime": iso_datetime
+        }
+
+        try:
+            return await self._json("POST", "/appointments/create/", json=payload)
+        except Exception as e:
+            logger.error(f"[create_appointment] User {telegram_id}: {e}")
+            return None
+
+    async def get_user_appointments(self, telegram_id: int):
+        try:
+            return await self._json(
+                "POST", "/appointments/by-patient/", json={"telegram_id": telegram_id}
+            )
+        except Exception as e:
+            logger.error(f"[get_user_appointments] User {telegram_id}: {e}")
+            return []
+
+    async def cancel_appointments(self, telegram_id: int, appointment_ids: list):
+        try:
+            status, _ = await self.request(
+                "POST", "/appointments/cancel/",
+                telegram_id=telegram_id, json={"appointment_ids": appointment_ids}
+            )
+            return status == 200
+        except Exception as e:
+            logger.error(f"[cancel_appointments] User {telegram_id}: {e}")
+            return False
+
+    async def check_user_exists(self, telegram_id: int) -> bool:
+        status, _ = await self.request("GET", f"/users/check/{telegram_id}/")
+        return status == 200
+
+    async def register_user(self, telegram_id: int, full_name: str, phone_number: str) -> bool:
+        payload = {
+            "telegram_id": telegram_id,
+            "full_name": full_name,
+            "phone_number": phone_number
+        }
+        status, _ = await self.request("POST", "/users/register", json=payload)
+        return status in [200, 201]
+
+    async def get_slot_by_id(self, telegram_id: int, slot_id: int):
+        try:
+            return await self._json("GET", f"/slots/{slot_id}/")
+        except Exception as e:
+            logger.error(f"[get_slot_by_id] User {telegram_id}: {e}")
+            return None
@@ -0,0 +1,151 @@
+# patient_bot/utils/availability_feed.py
+"""
+Лента изменений доступности на стороне бота.
+
+Фоновая задача держит long-poll запрос к /async/availability/changes/
+(нужен ASGI-сервер API) и запоминает, у каких врачей и на какие даты
+менялись слоты. Номер последнего изменения входит в ключи кэша FSM:
+после изменения следующий показ сразу идёт в API. Если лента выключена
+(AVAILABILITY_FEED != 1) или недоступна, ключи не версионируются
+и кэш живёт обычные fsm_cache.DEFAULT_TTL секунд.
+
+Каждый ответ ленты повторяет и недавние, уже отданные события: так
+доходят изменения транзакций, зафиксированных позже, чем взят их id.
+Повторы отбрасываются по id.
+"""
+import asyncio
+import os
+from datetime import date as date_type
+
+import aiohttp
+from aiogram.fsm.context import FSMContext
+
+from patient_bot.utils.api import ApiClient, ApiError
+from patient_bot.utils.fsm_cache import DEFAULT_TTL, cached
+from patient_bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FEED_PATH = "/async/availability/changes/"
+POLL_TIMEOUT = 25
+# Срок жизни кэша, пока лента работает. Событие поздно зафиксированной
+# транзакции приходит не позже следующего ответа ленты, то есть примерно
+# через POLL_TIMEOUT, поэтому дольше держать кэш нельзя
+FEED_TTL = POLL_TIMEOUT + 5
+RETRY_DELAY = 5
+
+
+class AvailabilityFeed:
+    """Номера последних изменений доступности по врачам и датам из ленты API."""
+
+    def __init__(self, api: ApiClient, enabled: bool = None):
+        self.api = api
+        self.enabled = os.getenv("AVAILABILITY_FEED") == "1" if enabled is None else enabled
+        self.epoch = None
+        self.last_id = None
+        self.connected = False
+        self.doctors = {}  # doctor_id -> id последнего изменения
+        self.dates = {}    # (doctor_id, "YYYY-MM-DD") -> id последнего изменения
+        self._seen = set()  # id событий прошлого ответа
+        self._pruned_on = None
+        self._task = None
+
+    @property
+    def ttl(self) -> int:
+        return FEED_TTL if self.connected else DEFAULT_TTL
+
+    def _version(self, changed_id) -> str:
+        # epoch отличает запуски бота: id, увиденные до него, неизвестны
+        return f"{self.epoch}.{changed_id}" if self.connected else "0"
+
+    def context_key(self, doctor_id: int) -> str:
+        return f"context:{doctor_id}:{self._version(self.doctors.get(doctor_id, 0))}"
+
+    def slots_key(self, doctor_id: int, service_id: int, date: str) -> str:
+        version = self._version(self.dates.get((doctor_id, date), 0))
+        return f"slots:{doctor_id}:{service_id}:{date}:{version}"
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.connected = False
+
+    def _apply(self, data: dict):
+        events = data["events"]
+        for event_id, doctor_id, date in events:
+            if event_id in self._seen:
+                continue
+            # Событие с меньшим id, пришедшее позже, всё равно даёт ключу
+            # новую версию: этот id к нему ещё не применялся
+            self.doctors[doctor_id] = event_id
+            self.dates[(doctor_id, date)] = event_id
+        # Сервер повторяет события, пока они в окне перечитывания; выпавшие
+        # из ответа больше не придут, их можно забыть
+        self._seen = {event[0] for event in events}
+        self.last_id = data["last_id"]
+
+        # Раз в день забываем прошедшие даты
+        today = date_type.today().isoformat()
+        if self._pruned_on != today:
+            self.dates = {key: value for key, value in self.dates.items() if key[1] >= today}
+            self._pruned_on = today
+
+    async def _poll(self):
+        params = {"timeout": POLL_TIMEOUT}
+        if self.last_id is not None:
+            params["since"] = self.last_id
+        return await self.api.request(
+            "GET", FEED_PATH, params=params,
+            timeout=aiohttp.ClientTimeout(total=POLL_TIMEOUT + 10),
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                status, data = await self._poll()
+            except ApiError as e:
+                self.connected = False
+                logger.warning(f"[availability_feed] {e}, повтор через {RETRY_DELAY} с")
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            if status == 404:
+                logger.warning("[availability_feed] API без ленты изменений, лента выключена")
+                self.connected = False
+                return
+            if status != 200 or not data:
+                self.connected = False
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+
+            if self.epoch is None:
+                self.epoch = data["last_id"]
+                logger.info(f"[availability_feed] Подключена, last_id={self.epoch}")
+            self._apply(data)
+            self.connected = True
+
+
+async def cached_context(state: FSMContext, api: ApiClient, feed: AvailabilityFeed,
+                         telegram_id: int, doctor_id: int):
+    """Контекст записи врача (услуги со свободными датами) через кэш FSM."""
+    return await cached(
+        state, feed.context_key(doctor_id),
+        lambda: api.get_booking_context(telegram_id, doctor_id),
+        feed.ttl,
+    )
+
+
+async def cached_date_slots(state: FSMContext, api: ApiClient, feed: AvailabilityFeed,
+                            telegram_id: int, doctor_id: int, service_id: int, date: str):
+    """Стартовые слоты под услугу на дату через кэш FSM."""
+    return await cached(
+        state, feed.slots_key(doctor_id, service_id, date),
+        lambda: api.get_date_slots(telegram_id, doctor_id, service_id, date),
+        feed.ttl,
+    )
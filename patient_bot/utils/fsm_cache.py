@@ -0,0 +1,59 @@
+# patient_bot/utils/fsm_cache.py
+"""
+Кэш ответов API в данных FSM конкретного диалога.
+
+Записи хранятся под ключом _cache рядом с остальными данными состояния,
+поэтому живут ровно столько, сколько диалог, и очищаются вместе
+с state.clear(). Значения должны сериализоваться в JSON, срок жизни
+считается по времени Unix, чтобы переживать хранение вне процесса.
+"""
+import time
+
+from aiogram.fsm.context import FSMContext
+
+CACHE_KEY = "_cache"
+DEFAULT_TTL = 60
+
+
+async def cache_get(state: FSMContext, key: str):
+    """Значение из кэша или None, если записи нет или она устарела."""
+    data = await state.get_data()
+    entry = data.get(CACHE_KEY, {}).get(key)
+    if entry and entry["expires"] > time.time():
+        return entry["value"]
+    return None
+
+
+async def cache_set(state: FSMContext, key: str, value, ttl: int = DEFAULT_TTL):
+    data = await state.get_data()
+    now = time.time()
+    cache = {
+        k: entry for k, entry in data.get(CACHE_KEY, {}).items()
+        if entry["expires"] > now
+    }
+    cache[key] = {"value": value, "expires": now + ttl}
+    await state.update_data({CACHE_KEY: cache})
+
+
+async def cached(state: FSMContext, key: str, fetch, ttl: int = DEFAULT_TTL):
+    """
+    Значение из кэша, а при промахе — результат await fetch().
+
+    Пустые результаты не кэшируются: клиент API возвращает их и при ошибке.
+    """
+    value = await cache_get(state, key)
+    if value is None:
+        value = await fetch()
+        if value:
+            await cache_set(state, key, value, ttl)
+    return value
+
+
+async def cache_invalidate(state: FSMContext, prefix: str = ""):
+    """Удаляет записи, ключ которых начинается с prefix (по умолчанию все)."""
+    data = await state.get_data()
+    cache = {
+        k: entry for k, entry in data.get(CACHE_KEY, {}).items()
+        if not k.startswith(prefix)
+    }
+    await state.update_data({CACHE_KEY: cache})
@@ -0,0 +1,119 @@
+# patient_bot/utils/storage.py
+"""
+Хранилище FSM для ботов.
+
+Бэкенд выбирается переменной окружения FSM_STORAGE:
+  memory — MemoryStorage aiogram (по умолчанию, состояние теряется при рестарте);
+  redis  — RedisStorage aiogram по адресу FSM_REDIS_URL, нужен пакет redis;
+  sqlite — SQLiteStorage ниже, файл FSM_SQLITE_PATH; для локального запуска и тестов.
+FSM_TTL — через сколько секунд без активности диалог забывается (0 — никогда).
+Данные сериализуются в компактный JSON, поэтому в FSM кладём только
+JSON-совместимые значения (списки вместо множеств).
+"""
+import json
+import os
+import sqlite3
+import time
+from functools import partial
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+# Без пробелов и \uXXXX-экранирования кириллицы
+json_dumps = partial(json.dumps, ensure_ascii=False, separators=(",", ":"))
+json_loads = json.loads
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище в файле SQLite.
+
+    Запросы синхронные и выполняются прямо в цикле событий: хранилище
+    рассчитано на один процесс и локальный диск.
+    """
+
+    def __init__(self, path: str, ttl: int = None):
+        self.ttl = ttl or None
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._purged_at = 0.0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY, state TEXT, data TEXT, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _row(self, key: StorageKey):
+        row = self._db.execute(
+            "SELECT state, data, updated_at FROM fsm WHERE key = ?",
+            (self.key_builder.build(key),)
+        ).fetchone()
+        if row and self.ttl and row[2] < time.time() - self.ttl:
+            return None
+        return row
+
+    def _write(self, key: StorageKey, column: str, value):
+        now = time.time()
+        self._db.execute(
+            f"INSERT INTO fsm (key, {column}, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, "
+            f"updated_at = excluded.updated_at",
+            (self.key_builder.build(key), value, now)
+        )
+        # Забытые диалоги чистим не чаще раза в минуту
+        if self.ttl and now - self._purged_at > 60:
+            self._db.execute("DELETE FROM fsm WHERE updated_at < ?", (now - self.ttl,))
+            self._purged_at = now
+        self._db.commit()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._write(key, "state", state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        row = self._row(key)
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        self._write(key, "data", json_dumps(dict(data)) if data else None)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        row = self._row(key)
+        return json_loads(row[1]) if row and row[1] else {}
+
+    async def close(self) -> None:
+        self._db.close()
+
+
+def build_storage() -> BaseStorage:
+    """FSM-хранилище по настройкам окружения."""
+    backend = os.getenv("FSM_STORAGE", "memory")
+    ttl = int(os.getenv("FSM_TTL", "86400")) or None
+
+    if backend == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        # bot_id в ключе: оба бота по умолчанию пишут в один Redis,
+        # и состояния одного пользователя в них не должны пересекаться
+        return RedisStorage.from_url(
+            os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0"),
+            key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            state_ttl=ttl,
+            data_ttl=ttl,
+            json_dumps=json_dumps,
+            json_loads=json_loads,
+        )
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("FSM_SQLITE_PATH", "fsm.sqlite3"), ttl=ttl)
+    return MemoryStorage()
+
+
+def build_events_isolation(storage: BaseStorage):
+    """
+    Блокировки апдейтов одного пользователя между процессами (для Redis).
+
+    Для остальных хранилищ возвращает None — aiogram обходится без них.
+    """
+    create_isolation = getattr(storage, "create_isolation", None)
+    return create_isolation() if create_isolation else None
@@ -21,7 +21,11 @@ TOKEN = os.getenv("DOCTOR_TELEGRAM_TOKEN")
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "Schedule.settings")
 django.setup()
 
-from booking.models import User, AvailableSlot, Appointment
+from booking.models import User, AvailableSlot, Appointment, DoctorDaySummary
+from booking.aggregates import appointment_date_counts
+from booking.day_summary import day_range
+from booking.slot_changes import slots_changed
+from booking.slots import bulk_create_slots
 
 # ——— Логирование
 logging.basicConfig(
@@ -37,37 +41,34 @@ def get_doctor_by_telegram_id(tg_id):
 
 @sync_to_async
 def get_free_slot_dates(doctor):
-    # Получаем все слоты
-    slots = AvailableSlot.objects.filter(
-        doctor=doctor, is_booked=False
-    ).order_by("start_datetime")
-
-    # Извлекаем только уникальные даты
-    unique_dates = sorted({slot.start_datetime.date() for slot in slots})
-    return list(unique_dates)
+    # Даты со свободными слотами берём из сводок по дням
+    return list(
+        DoctorDaySummary.objects.filter(doctor=doctor, free_slots__gt=0)
+        .order_by("date")
+        .values_list("date", flat=True)
+    )
 
 @sync_to_async
 def get_free_slots_by_date(doctor, date):
+    day_begin, day_end = day_range(date)
     return list(
         AvailableSlot.objects.filter(
-            doctor=doctor, is_booked=False, start_datetime__date=date
+            doctor=doctor, is_booked=False,
+            start_datetime__gte=day_begin, start_datetime__lt=day_end
         ).order_by("start_datetime")
     )
 
 @sync_to_async
 def get_active_appointments_dates(doctor):
-    return list(
-        Appointment.objects.filter(doctor=doctor, status="active")
-        .order_by("start_datetime")
-        .values_list("start_datetime__date", flat=True)
-        .distinct()
-    )
+    return [row["date"] for row in appointment_date_counts(doctor.id)]
 
 @sync_to_async
 def get_appointments_by_date(doctor, date):
+    day_begin, day_end = day_range(date)
     return list(
         Appointment.objects.filter(
-            doctor=doctor, status="active", start_datetime__date=date
+            doctor=doctor, status="active",
+            start_datetime__gte=day_begin, start_datetime__lt=day_end
         ).select_related("patient", "service")
     )
 
@@ -177,16 +178,25 @@ def get_slot_by_id(slot_id):
 
 @sync_to_async
 def get_slot_ids_by_date(doctor, date):
+    day_begin, day_end = day_range(date)
     return list(
         AvailableSlot.objects.filter(
-            doctor=doctor, is_booked=False, start_datetime__date=date
+            doctor=doctor, is_booked=False,
+            start_datetime__gte=day_begin, start_datetime__lt=day_end
         ).order_by("start_datetime").values_list("id", "start_datetime")
     )
 
 
 @sync_to_async
 def delete_slots_by_ids(ids):
-    return AvailableSlot.objects.filter(id__in=ids).delete()
+    slots = AvailableSlot.objects.filter(id__in=ids)
+    changed = {}
+    for doctor_id, start in slots.values_list("doctor_id", "start_datetime"):
+        changed.setdefault(doctor_id, []).append(start)
+    result = slots.delete()
+    for doctor_id, starts in changed.items():
+        slots_changed(doctor_id, starts)
+    return result
 
 
 async def handle_delete_slots(update: Update,
@@ -331,26 +341,14 @@ async def handle_fsm_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ——— Логика создания слотов в БД
 @sync_to_async
 def create_slots_for_doctor(doctor, start_dt, end_dt, interval_minutes=15):
-    count = 0
+    intervals = []
     current = start_dt
     while current + timedelta(minutes=interval_minutes) <= end_dt:
-        slot_start = current
-        slot_end = current + timedelta(minutes=interval_minutes)
-
-        exists = AvailableSlot.objects.filter(
-            doctor=doctor,
-            start_datetime=slot_start
-        ).exists()
-
-        if not exists:
-            AvailableSlot.objects.create(
-                doctor=doctor,
-                start_datetime=slot_start,
-                end_datetime=slot_end
-            )
-            count += 1
-        current = slot_end
-    return count
+        intervals.append((current, current + timedelta(minutes=interval_minutes)))
+        current += timedelta(minutes=interval_minutes)
+
+    results = bulk_create_slots(doctor, intervals)
+    return sum(1 for r in results if r["status"] == "created")
 
 
 # ——— Основной запуск